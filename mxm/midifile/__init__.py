@@ -2,8 +2,15 @@ from mxm.midifile.src.midi_infile import MidiInFile
 from mxm.midifile.src.midi_outfile import MidiOutFile
 from mxm.midifile.src.midi_to_code import MidiToCode
 from mxm.midifile.src.midi_events import MidiEvents
+from mxm.midifile.src.timed_events import TimedMidiEvents
+from mxm.midifile.src.midi_to_arrays import MidiToArrays
+from mxm.midifile.src.midi_sequence import MidiSequence
 
 from mxm.midifile.src.raw_instream_file import RawInstreamFile
 from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.corpus_parser import parse_corpus
+from mxm.midifile.src.parallel_parser import map_tracks
+from mxm.midifile.src.event_iterator import iter_events
+from mxm.midifile.src.stream_parser import MidiStreamParser
 from mxm.midifile.src import constants
 from mxm.midifile.src.helpers import testdir, exampledir
\ No newline at end of file
@@ -0,0 +1,192 @@
+"""
+Benchmarks the parser. Prints events/sec for parsing 'midi-in/bach_847.mid'
+and a synthetic dense file with lots of notes and controllers.
+
+    python -m mxm.midifile.examples.benchmark_parser
+"""
+
+import io, time
+
+from mxm.midifile import MidiInFile, MidiOutFile, MidiEvents
+from mxm.midifile import exampledir
+from mxm.midifile.src.timed_events import TimedMidiEvents, TimedEventDispatcher
+from mxm.midifile.src.event_dispatcher import EventDispatcher
+from mxm.midifile.src.parallel_parser import EventRecorder
+from mxm.midifile.src.midi_to_arrays import MidiToArrays, np
+if np is not None:
+    from mxm.midifile.src.array_transforms import transpose, write_table
+
+
+class EventCounter(MidiEvents):
+
+    "Counts the events in a file. Only used to find the number of events."
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.events = 0
+
+    def update_time(self, new_time=0, relative=1):
+        self.events += 1
+
+
+class NoteCounter(MidiEvents):
+
+    "Counts the notes. All other events are skipped by the dispatcher."
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.notes = 0
+
+    def note_on(self, channel, note, velocity, use_running_status=False):
+        self.notes += 1
+
+
+class Transposer(MidiOutFile):
+
+    "Transposes the notes an octave up. The other events are copied as they are."
+
+    def note_on(self, channel, note, velocity, use_running_status=False):
+        MidiOutFile.note_on(self, channel, note + 12, velocity, use_running_status)
+
+    def note_off(self, channel, note, velocity, use_running_status=False):
+        MidiOutFile.note_off(self, channel, note + 12, velocity, use_running_status)
+
+
+class AllEventsDispatcher(EventDispatcher):
+
+    "Dispatches all the events, even those the handler does not use"
+
+    skip_unused_events = False
+
+
+class AllTimedEventsDispatcher(TimedEventDispatcher):
+
+    skip_unused_events = False
+
+
+def dense_midi_file(n_bars=500, division=480):
+    "A format 0 file with notes, controllers and pitch bends on 16 channels"
+    midi = MidiOutFile(io.BytesIO())
+    midi.header(format=0, nTracks=1, division=division)
+    midi.start_of_track()
+    midi.tempo_bpm(120)
+    step = division // 8
+    for bar in range(n_bars):
+        for i in range(32):
+            for ch in range(16):
+                note = 36 + (bar + i + ch) % 60
+                midi.update_time(0)
+                midi.note_on(ch, note, 100)
+                midi.continuous_controller(ch, 1, (i * 4) % 128)
+                midi.continuous_controller(ch, 1, (i * 4 + 1) % 128, use_running_status=True)
+                midi.pitch_bend(ch, (i * 512) % 16384)
+            midi.update_time(step)
+            for ch in range(16):
+                note = 36 + (bar + i + ch) % 60
+                midi.note_off(ch, note, 0)
+                midi.update_time(0)
+    midi.end_of_track()
+    data = midi.read_all()
+    midi.close()
+    return data
+
+
+def count_events(data):
+    counter = EventCounter()
+    MidiInFile(counter, data).read()
+    return counter.events
+
+
+def benchmark(name, data, handler_factory=MidiEvents, repeat=5, dispatcher=None, filters=None, **read_kw):
+    "Returns the best events/sec of 'repeat' runs. filters are include/exclude for the dispatcher."
+    n_events = count_events(data)
+    best = None
+    for i in range(repeat):
+        handler = handler_factory()
+        midi_in = MidiInFile(handler, data)
+        if dispatcher is not None:
+            midi_in.parser.dispatch = dispatcher(handler)
+        if filters is not None:
+            midi_in.parser.dispatch.filter_events(**filters)
+        start = time.perf_counter()
+        midi_in.read(**read_kw)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-24s %9d events %8.3f s %12.0f events/sec' % (name, n_events, best, n_events / best))
+    return n_events / best
+
+
+def benchmark_copy(name, data, repeat=3, midi_outfile=MidiOutFile, **out_kw):
+    "Returns the best events/sec of copying the file through a MidiOutFile"
+    n_events = count_events(data)
+    best = None
+    for i in range(repeat):
+        midi_out = midi_outfile(io.BytesIO(), **out_kw)
+        midi_in = MidiInFile(midi_out, data)
+        start = time.perf_counter()
+        midi_in.read()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-24s %9d events %8.3f s %12.0f events/sec' % (name, n_events, best, n_events / best))
+    return n_events / best
+
+
+def benchmark_write(name, n_notes=100000, repeat=3, **out_kw):
+    "Returns the best events/sec of writing notes directly to a MidiOutFile"
+    n_events = 2 * n_notes
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        midi_out = MidiOutFile(io.BytesIO(), **out_kw)
+        midi_out.header(format=0, nTracks=1, division=96)
+        midi_out.start_of_track()
+        for j in range(n_notes):
+            note = 36 + j % 48
+            midi_out.note_on(j % 16, note, 100)
+            midi_out.update_time(48)
+            midi_out.note_off(j % 16, note, 0)
+        midi_out.update_time(0)
+        midi_out.end_of_track()
+        midi_out.eof()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-24s %9d events %8.3f s %12.0f events/sec' % (name, n_events, best, n_events / best))
+    return n_events / best
+
+
+def benchmark_array_transpose(name, data, repeat=3):
+    "Returns the best events/sec of transposing the file with numpy"
+    n_events = count_events(data)
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        arrays = MidiToArrays()
+        MidiInFile(arrays, data).read()
+        table = transpose(arrays.table, 12)
+        write_table(MidiOutFile(io.BytesIO()), table, arrays.payload, division=arrays.division)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print('%-24s %9d events %8.3f s %12.0f events/sec' % (name, n_events, best, n_events / best))
+    return n_events / best
+
+
+if __name__ == '__main__':
+
+    with open(exampledir('midi-in/bach_847.mid'), 'rb') as f:
+        bach = f.read()
+    dense = dense_midi_file()
+    benchmark('bach_847.mid', bach, repeat=20, dispatcher=AllEventsDispatcher)
+    benchmark('synthetic dense', dense, dispatcher=AllEventsDispatcher)
+    benchmark('synthetic dense, timed', dense, handler_factory=TimedMidiEvents, dispatcher=AllTimedEventsDispatcher)
+    benchmark('dense, notes, all events', dense, handler_factory=NoteCounter, dispatcher=AllEventsDispatcher)
+    benchmark('dense, notes, skipping', dense, handler_factory=NoteCounter)
+    benchmark('dense, recorder', dense, handler_factory=EventRecorder, repeat=3)
+    benchmark('dense, recorder, tempo', dense, handler_factory=EventRecorder, filters=dict(include=['tempo']))
+    if np is not None:
+        benchmark('dense, arrays', dense, handler_factory=MidiToArrays, repeat=3)
+    benchmark_copy('dense, copy', dense)
+    benchmark_write('write, checked')
+    benchmark_write('write, trusted', trusted=True)
+    benchmark_copy('dense, transpose', dense, midi_outfile=Transposer)
+    if np is not None:
+        benchmark_array_transpose('dense, transpose, arrays', dense)
@@ -0,0 +1,17 @@
+"""
+Rewrites midi files with running status, to make them smaller. The files
+are written next to the originals, with '-compressed' added to the name.
+
+    python -m mxm.midifile.examples.example_recompress file.mid [file.mid ...]
+"""
+
+import os, sys
+
+from mxm.midifile.src.recompress import recompress
+
+
+for in_file in sys.argv[1:]:
+    root, ext = os.path.splitext(in_file)
+    out_file = '%s-compressed%s' % (root, ext)
+    recompress(in_file, out_file)
+    print('%s: %s -> %s bytes' % (in_file, os.path.getsize(in_file), os.path.getsize(out_file)))
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+
+"""
+Vectorized transformations of the event tables made by MidiToArrays. They
+do the same as event handlers that override events, like the Transposer
+example, but on all the events at once with numpy, instead of a python call
+per event. The transformations returns a new table, and leaves the original
+alone. The meta and sysex data in the payload is shared, and not changed.
+
+write_table() writes a table back to a midi file through a MidiOutFile.
+The tracks are encoded in bulk with numpy too.
+
+>>> from mxm.midifile import MidiInFile, MidiOutFile, MidiToArrays, testdir
+>>> arrays = MidiToArrays()
+>>> MidiInFile(arrays, testdir('midifiles/minimal.mid')).read()
+>>> table = transpose(arrays.table, 12)
+>>> table = scale_velocity(table, 0.5)
+>>> notes = table[note_events(table)]
+>>> notes[['tick', 'data1', 'data2']].tolist()
+[(0, 48, 64), (61440, 48, 0)]
+
+>>> midi_out = MidiOutFile()
+>>> write_table(midi_out, table, arrays.payload, division=arrays.division)
+>>> copy = MidiToArrays()
+>>> MidiInFile(copy, midi_out.read_all()).read()
+>>> bool((copy.table == table).all())
+True
+"""
+
+# optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# custom import
+from mxm.midifile.src import constants as c
+from mxm.midifile.src.event_dispatcher import DATA_SIZES
+from mxm.midifile.src.data_type_converters import writeVar, varLenArray, putVarArray
+from mxm.midifile.src.midi_to_arrays import EVENT_DTYPE
+
+
+# masks for the kinds of events
+
+def channel_events(table):
+    "Mask of the channel events"
+    status = table['status']
+    return (status >= 0x80) & (status < 0xF0)
+
+
+def note_events(table):
+    "Mask of the note_on and note_off events"
+    kind = table['status'] & 0xF0
+    return (kind == 0x80) | (kind == 0x90)
+
+
+def events_of_kind(table, *kinds):
+    """
+    Mask of the channel events with the kinds given as the high nibble of
+    the status, like c.PATCH_CHANGE
+    """
+    kind = table['status'] & 0xF0
+    mask = np.zeros(len(table), dtype=bool)
+    for k in kinds:
+        mask |= kind == k << 4
+    return mask
+
+
+def meta_events(table, meta_type=None):
+    "Mask of the meta events, or of the meta events of meta_type"
+    mask = table['status'] == c.META_EVENT
+    if meta_type is not None:
+        mask &= table['data1'] == meta_type
+    return mask
+
+
+# transformations
+
+def select_events(table, mask):
+    "Returns the events in table where mask is true"
+    return table[mask]
+
+
+def sort_events(table):
+    """
+    Returns the events sorted by track and tick. Events at the same time
+    keep their order.
+    """
+    return table[np.lexsort((table['tick'], table['track']))]
+
+
+def transpose(table, semitones, exclude_channels=(9,), clamp=True):
+    """
+    Transposes the notes, and the polyphonic aftertouch, except on the
+    channels in exclude_channels. The drums are on channel 9 (10 when
+    counting from 1). With clamp the notes are kept within 0-127, otherwise
+    notes that would end outside that range are not transposed.
+    >>> table = np.zeros(4, dtype=EVENT_DTYPE)
+    >>> table['status'] = [0x90, 0x99, 0x90, 0xB0]
+    >>> table['channel'] = table['status'] & 0x0F
+    >>> table['data1'] = [60, 36, 120, 7]
+    >>> transpose(table, 12)['data1'].tolist()
+    [72, 36, 127, 7]
+    >>> transpose(table, 12, clamp=False)['data1'].tolist()
+    [72, 36, 120, 7]
+    """
+    table = table.copy()
+    mask = events_of_kind(table, c.NOTE_OFF, c.NOTE_ON, c.AFTERTOUCH)
+    mask &= ~np.isin(table['channel'], exclude_channels)
+    notes = table['data1'][mask].astype(np.int16) + semitones
+    if clamp:
+        notes = np.clip(notes, 0, 127)
+    else:
+        outside = (notes < 0) | (notes > 127)
+        notes[outside] -= semitones
+    table['data1'][mask] = notes
+    return table
+
+
+def scale_velocity(table, factor=1.0, curve=1.0, low=1, high=127):
+    """
+    Scales the velocity of the note_on events. The velocity is first shaped
+    by curve, as 127 * (velocity / 127) ** curve, then multiplied by factor
+    and kept within low and high. A curve below 1 makes soft notes louder,
+    above 1 softer. A velocity of 0 is a note_off, and is left alone.
+    >>> table = np.zeros(3, dtype=EVENT_DTYPE)
+    >>> table['status'] = 0x90
+    >>> table['data2'] = [100, 0, 20]
+    >>> scale_velocity(table, 1.5)['data2'].tolist()
+    [127, 0, 30]
+    >>> scale_velocity(table, curve=0.5)['data2'].tolist()
+    [113, 0, 50]
+    """
+    table = table.copy()
+    mask = events_of_kind(table, c.NOTE_ON) & (table['data2'] > 0)
+    velocity = table['data2'][mask] / 127.0
+    velocity = 127.0 * velocity ** curve * factor
+    table['data2'][mask] = np.clip(np.rint(velocity), low, high)
+    return table
+
+
+def quantize(table, grid, strength=1.0, mask=None):
+    """
+    Moves the events towards the nearest multiple of grid ticks. strength
+    is how far they are moved, from 0 to 1. mask selects the events, and
+    defaults to the notes. The table is sorted again, as events can move
+    past each other.
+    >>> table = np.zeros(3, dtype=EVENT_DTYPE)
+    >>> table['status'] = [0x90, 0x80, 0xB0]
+    >>> table['tick'] = [10, 110, 130]
+    >>> quantize(table, 120)['tick'].tolist()
+    [0, 120, 130]
+    >>> quantize(table, 120, strength=0.5)['tick'].tolist()
+    [5, 115, 130]
+    """
+    table = table.copy()
+    if mask is None:
+        mask = note_events(table)
+    ticks = table['tick'][mask]
+    snapped = np.rint(ticks / grid) * grid
+    table['tick'][mask] = np.rint(ticks + (snapped - ticks) * strength)
+    return sort_events(table)
+
+
+def stretch(table, factor):
+    """
+    Multiplies the time of all the events by factor. The tempo events
+    are not changed, so a factor of 2 plays twice as long.
+    >>> table = np.zeros(2, dtype=EVENT_DTYPE)
+    >>> table['tick'] = [96, 97]
+    >>> stretch(table, 1.5)['tick'].tolist()
+    [144, 146]
+    """
+    table = table.copy()
+    table['tick'] = np.rint(table['tick'] * factor)
+    return table
+
+
+def remap_channels(table, mapping):
+    """
+    Moves the channel events to other channels. mapping is a dict of
+    {from_channel: to_channel}, or a sequence of the new channel for
+    each of the 16 channels.
+    >>> table = np.zeros(3, dtype=EVENT_DTYPE)
+    >>> table['status'] = [0x90, 0xC1, 0xFF]
+    >>> table['channel'] = [0, 1, 0]
+    >>> remapped = remap_channels(table, {0: 3})
+    >>> [hex(s) for s in remapped['status']], remapped['channel'].tolist()
+    (['0x93', '0xc1', '0xff'], [3, 1, 0])
+    """
+    if isinstance(mapping, dict):
+        channels = np.arange(16, dtype=np.uint8)
+        for old, new in mapping.items():
+            channels[old] = new
+    else:
+        channels = np.asarray(mapping, dtype=np.uint8)
+    table = table.copy()
+    mask = channel_events(table)
+    new_channels = channels[table['channel'][mask]]
+    table['channel'][mask] = new_channels
+    table['status'][mask] = (table['status'][mask] & 0xF0) | new_channels
+    return table
+
+
+# writing
+
+# the number of data bytes after the status byte of the fixed size events
+_FIXED_SIZES = [size or 0 for size in DATA_SIZES]
+
+
+def encode_track(table, payload):
+    """
+    Encodes the events of a single track as the data of a track chunk,
+    ending with an end of track event. The events must be sorted by tick.
+    Any end of track events in the table are replaced by one at the end.
+    >>> table = np.zeros(3, dtype=EVENT_DTYPE)
+    >>> table['status'] = [0x90, 0x80, 0xFF]
+    >>> table['tick'] = [0, 200, 200]
+    >>> table['data1'] = [64, 64, c.END_OF_TRACK]
+    >>> table['data2'] = [100, 0, 0]
+    >>> list(encode_track(table, b''))
+    [0, 144, 64, 100, 129, 72, 128, 64, 0, 0, 255, 47, 0]
+    """
+    status = table['status'].astype(np.int64)
+    end_of_track = (status == c.META_EVENT) & (table['data1'] == c.END_OF_TRACK)
+    end_tick = int(table['tick'].max()) if len(table) else 0
+    table = table[~end_of_track]
+    status = status[~end_of_track]
+    ticks = table['tick']
+    delta = np.diff(ticks, prepend=0)
+    if len(delta) and delta.min() < 0:
+        raise ValueError('The events of a track must be sorted by tick')
+    delta_sizes = varLenArray(delta)
+    is_meta = status == c.META_EVENT
+    is_sysex = (status == c.SYSTEM_EXCLUSIVE) | (status == c.END_OFF_EXCLUSIVE)
+    has_payload = is_meta | is_sysex
+    # the sysex data is as it was in the file, with any terminating 0xF7
+    length = table['length'].astype(np.int64)
+    length_sizes = np.where(has_payload, varLenArray(length), 0)
+    # the size of the event after the delta time
+    event_sizes = np.where(is_meta, 2 + length_sizes + length,
+                  np.where(is_sysex, 1 + length_sizes + length,
+                           1 + np.array(_FIXED_SIZES)[status]))
+    sizes = delta_sizes + event_sizes
+    starts = np.cumsum(sizes) - sizes
+    out = np.zeros(int(sizes.sum()), dtype=np.uint8)
+    putVarArray(out, starts, delta, delta_sizes)
+    # status, or 0xFF/0xF0/0xF7 for meta and sysex
+    position = starts + delta_sizes
+    out[position] = status
+    fixed_sizes = np.where(has_payload, 0, event_sizes - 1)
+    data1 = (fixed_sizes >= 1) | is_meta
+    out[position[data1] + 1] = table['data1'][data1]
+    data2 = fixed_sizes >= 2
+    out[position[data2] + 2] = table['data2'][data2]
+    # varlen data length and the payload
+    length_position = position + np.where(is_meta, 2, 1)
+    putVarArray(out, length_position[has_payload], length[has_payload],
+                length_sizes[has_payload])
+    payload_start = (length_position + length_sizes)[has_payload]
+    payload_length = length[has_payload]
+    if payload_length.sum():
+        total = int(payload_length.sum())
+        within = np.arange(total) - np.repeat(np.cumsum(payload_length) - payload_length, payload_length)
+        source = np.frombuffer(payload, dtype=np.uint8)
+        offset = table['offset'][has_payload].astype(np.int64)
+        out[np.repeat(payload_start, payload_length) + within] = source[np.repeat(offset, payload_length) + within]
+    # the end of track
+    last_tick = int(ticks[-1]) if len(ticks) else 0
+    end_delta = bytes(writeVar(end_tick - last_tick))
+    return out.tobytes() + end_delta + bytes([c.META_EVENT, c.END_OF_TRACK, 0])
+
+
+def write_table(midi_out, table, payload, format=None, division=96):
+    """
+    Writes the events in table to midi_out, a MidiOutFile, as a whole
+    file with a header. The tracks are numbered as in the table, and a
+    track number that has no events is written as an empty track.
+    format defaults to 0 for a single track and 1 otherwise.
+    """
+    n_tracks = int(table['track'].max()) + 1 if len(table) else 1
+    if format is None:
+        format = 0 if n_tracks == 1 else 1
+    midi_out.header(format=format, nTracks=n_tracks, division=division)
+    table = sort_events(table)
+    tracks = table['track']
+    bounds = np.searchsorted(tracks, np.arange(n_tracks + 1))
+    for track in range(n_tracks):
+        midi_out.write_track_chunk(encode_track(table[bounds[track]:bounds[track+1]], payload))
+    midi_out.eof()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+"""
+Splits the events of a file by channel, in a single parse. The channel
+events go to a track for each channel, and the meta, sysex and system
+events go to the conductor track, track 0. The result is written as a
+format 1 file, and optionally as a file for each channel too.
+
+>>> from mxm.midifile import MidiInFile, MidiOutFile, iter_events
+>>> source = MidiOutFile()
+>>> source.header(format=0, nTracks=1, division=96)
+>>> source.start_of_track()
+>>> source.tempo(500000)
+>>> source.note_on(0, 60, 100)
+>>> source.update_time(96)
+>>> source.note_on(9, 36, 100)
+>>> source.update_time(0)
+>>> source.note_off(0, 60, 0)
+>>> source.end_of_track()
+
+>>> splitter = ChannelSplitter()
+>>> MidiInFile(splitter, source.read_all()).read()
+>>> for event in iter_events(splitter.read_all()):
+...     print(event)
+(0, 0, 'tempo', (500000,))
+(0, 96, 'end_of_track', ())
+(1, 0, 'note_on', (0, 60, 100))
+(1, 96, 'note_off', (0, 60, 0))
+(1, 96, 'end_of_track', ())
+(2, 96, 'note_on', (9, 36, 100))
+(2, 96, 'end_of_track', ())
+>>> splitter.channels
+[0, 9]
+"""
+
+# custom import
+from mxm.midifile.src.midi_events import MidiEvents
+from mxm.midifile.src.midi_outfile import MidiOutFile
+from mxm.midifile.src.midi_infile import MidiInFile
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.event_iterator import EventCollector
+from mxm.midifile.src.track_merger import merge_events, track_streams
+
+
+# the track key of the conductor track. Channel n is in track key n + 1
+CONDUCTOR = 0
+
+
+class ChannelSplitter(MidiOutFile):
+
+    """
+    An event handler that writes the events it gets into a track for each
+    channel, and a conductor track. The tracks are all open at the same
+    time, with select_track, and written at eof, with the channel tracks
+    in channel order. Channels without events get no track.
+
+    channel_files is called with each channel at eof, and returns a path
+    or a file object. Then a format 1 file with the conductor track and
+    the track of the channel is written there too.
+
+    The events must come in time order, so a format 1 file must have its
+    tracks merged first. split_channels does that.
+    """
+
+    def __init__(self, f='', channel_files=None, trusted=True, validate=False):
+        MidiOutFile.__init__(self, f, trusted=trusted, validate=validate)
+        self.channel_files = channel_files
+        self.division = 96
+        self.channels = []
+        # the time in the source, as the tracks has their own time
+        self._time = 0
+        self._end_time = 0
+
+
+    # the events from the source
+
+    def header(self, format=0, nTracks=1, division=96):
+        "The header is written at eof, when the number of tracks is known"
+        self.division = division
+        self.select_track(CONDUCTOR)
+
+    def start_of_track(self, n_track=0):
+        self._time = 0
+
+    def end_of_track(self):
+        self._end_time = max(self._end_time, self._time)
+
+    def update_time(self, new_time=0, relative=1):
+        if relative:
+            self._time += new_time
+        else:
+            self._time = new_time
+
+    def reset_time(self):
+        self._time = 0
+
+    def raw_event(self, status, data, use_running_status=False):
+        # the events of a running status can end up in different tracks
+        MidiOutFile.raw_event(self, status, data)
+
+
+    def _trusted_event(self, data):
+        "Writes the event to the track of its channel, at the source time"
+        status = data[0]
+        if status < 0x80:
+            raise ValueError('Events can not use running status when splitting by channel')
+        track = (status & 0x0F) + 1 if status < 0xF0 else CONDUCTOR
+        if track != self._selected_track:
+            self.select_track(track)
+        time = self._time
+        delta = time - self._absolute_time
+        if delta < 0:
+            raise ValueError('The events must be in time order. Merge the tracks of a format 1 file first')
+        self._absolute_time = time
+        self._relative_time = delta
+        MidiOutFile._trusted_event(self, data)
+
+
+    def eof(self):
+        "Writes the tracks"
+        self.select_track(CONDUCTOR)
+        keys = sorted(list(self._open_tracks) + [CONDUCTOR])
+        self.channels = [key - 1 for key in keys if key != CONDUCTOR]
+        chunks = []
+        for key in keys:
+            self.select_track(key)
+            MidiEvents.update_time(self, max(self._end_time, self._time), relative=0)
+            chunks.append(self._end_track())
+        MidiOutFile.header(self, format=1, nTracks=len(chunks), division=self.division)
+        for chunk in chunks:
+            self.write_track_chunk(chunk)
+        if self.channel_files is not None:
+            for channel, chunk in zip(self.channels, chunks[1:]):
+                self._write_channel_file(self.channel_files(channel), chunks[0], chunk)
+
+
+    def _write_channel_file(self, f, conductor, chunk):
+        midi_out = MidiOutFile(f)
+        midi_out.header(format=1, nTracks=2, division=self.division)
+        midi_out.write_track_chunk(conductor)
+        midi_out.write_track_chunk(chunk)
+        if isinstance(f, str):
+            midi_out.close()
+
+
+def split_channels(infile, outfile='', channel_files=None):
+    """
+    Splits infile by channel into outfile, a path or a file object, and
+    the channel_files, in a single parse. channel_files is a function of
+    the channel, or a path with a %d for the channel. A format 1 file has
+    its tracks merged first. Returns the ChannelSplitter.
+    >>> from mxm.midifile import testdir
+    >>> splitter = split_channels(testdir('midifiles/minimal.mid'))
+    >>> splitter.channels
+    [0]
+    """
+    if isinstance(channel_files, str):
+        channel_files = channel_files.__mod__
+    splitter = ChannelSplitter(outfile, channel_files=channel_files)
+    raw_in = RawInstreamFile(infile)
+    parser = MidiFileParser(raw_in, EventCollector())
+    parser.readMThdChunk()
+    data = raw_in.getData()
+    if len(parser.indexMTrkChunks()) > 1:
+        splitter.header(parser.format, parser.nTracks, parser.division)
+        for track, tick, name, args in merge_events(*track_streams(data)):
+            splitter.update_time(tick, relative=0)
+            getattr(splitter, name)(*args)
+        splitter.eof()
+    else:
+        MidiInFile(splitter, data).read()
+    return splitter
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
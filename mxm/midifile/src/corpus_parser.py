@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parses a whole corpus of midi files in a pool of worker processes.
+
+Each file is parsed with a new event handler from handler_factory. The
+results are streamed back as they are ready. A file that fails to parse
+does not stop the batch. Its error and the byte offset where parsing
+failed is reported in its result instead.
+
+>>> from mxm.midifile import testdir, MidiEvents
+>>> results = parse_corpus(testdir('midifiles'), MidiEvents, collect=count_tracks, processes=0)
+>>> sorted((os.path.basename(r.path), r.result) for r in results)
+[('ableton-glissando.mid', 1), ('ableton-minimal-1note.mid', 1), ('cubase-minimal-type0.mid', 1), ('cubase-minimal-type1.mid', 17), ('minimal.mid', 2)]
+"""
+
+# standard library imports
+import os, os.path, glob
+import multiprocessing
+import traceback
+import pickle
+from collections import namedtuple
+
+# custom import
+from mxm.midifile.src.midi_infile import MidiInFile
+
+
+# The result of parsing a single file. On success error and offset are None.
+# On failure result is None, error is the exception as text, and offset is
+# the position in the file where parsing stopped.
+CorpusResult = namedtuple('CorpusResult', 'path result error offset')
+
+
+def count_tracks(handler):
+    "A collect function that returns the number of tracks seen by the handler"
+    return handler.get_current_track() + 1
+
+
+def corpus_files(source, pattern='**/*.mid'):
+    """
+    Returns the paths of the files in source. source can be a directory,
+    which is searched recursively for files matching pattern, a glob
+    pattern, or an iterable of paths.
+    >>> from mxm.midifile import testdir
+    >>> [os.path.basename(f) for f in corpus_files(testdir('midifiles'), pattern='minimal*.mid')]
+    ['minimal.mid']
+    """
+    if isinstance(source, str):
+        if os.path.isdir(source):
+            source = os.path.join(source, pattern)
+        return sorted(glob.iglob(source, recursive=True))
+    return list(source)
+
+
+def parse_file(job):
+    """
+    Parses a single file. Runs in the worker processes.
+    job is (path, handler_factory, collect, zero_copy).
+    """
+    path, handler_factory, collect, zero_copy = job
+    midi_in = None
+    try:
+        handler = handler_factory()
+        midi_in = MidiInFile(handler, path, zero_copy=zero_copy)
+        midi_in.read()
+        result = collect(handler) if collect is not None else handler
+        return CorpusResult(path, result, None, None)
+    except Exception as e:
+        offset = midi_in.raw_in.getCursor() if midi_in is not None else None
+        return CorpusResult(path, None, _error_text(e), offset)
+    finally:
+        if midi_in is not None:
+            midi_in.close()
+
+
+def _error_text(e):
+    return ''.join(traceback.format_exception_only(type(e), e)).strip()
+
+
+def parse_pickled_file(job):
+    """
+    Parses a single file like parse_file, but returns the result pickled.
+    If the result can not be pickled that is the error of the file, instead
+    of failing the whole chunk of results when the pool sends them back.
+    """
+    result = parse_file(job)
+    if result.error is None:
+        try:
+            return result._replace(result=pickle.dumps(result.result, pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            return CorpusResult(result.path, None, _error_text(e), None)
+    return result
+
+
+def unpickled(result):
+    "The result from parse_pickled_file with the result unpickled"
+    if result.error is None:
+        return result._replace(result=pickle.loads(result.result))
+    return result
+
+
+def parse_corpus(source, handler_factory, collect=None, pattern='**/*.mid',
+                 processes=None, chunksize=16, ordered=False, zero_copy=False, pool=None):
+    """
+    Parses all the midi files in source, and yields a CorpusResult for each
+    file as soon as it is parsed.
+
+    source: a directory, a glob pattern or an iterable of paths.
+    handler_factory: called with no arguments to create the event handler
+        for each file. A MidiEvents subclass works fine. It must be picklable,
+        so a module level class or function.
+    collect: called with the event handler after a file has been parsed. Its
+        return value is the result. If None the handler itself is the result.
+        The result is sent between processes, so it must be picklable. A
+        result that is not picklable is reported as an error for the file.
+    processes: the number of worker processes. None uses all cores. 0 parses
+        the files in this process, which is practical for debugging.
+    chunksize: the number of files sent to a worker at a time. Larger chunks
+        has less overhead for many small files.
+    ordered: if true the results are yielded in the order of the files,
+        otherwise as they are ready.
+    zero_copy: if true the files are memory mapped, and the event data is
+        passed to the handler as memoryviews of the file. They can not be
+        pickled, so the handler or collect must copy what it keeps.
+    pool: a multiprocessing pool to use instead of creating one.
+    """
+    jobs = ((path, handler_factory, collect, zero_copy) for path in corpus_files(source, pattern))
+    if processes == 0 and pool is None:
+        for job in jobs:
+            yield parse_file(job)
+        return
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes)
+    try:
+        imap = pool.imap if ordered else pool.imap_unordered
+        for result in imap(parse_pickled_file, jobs, chunksize):
+            yield unpickled(result)
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from struct import pack, unpack
+from array import array
+
+# optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 """
 This module contains functions for reading and writing the special data types
@@ -11,11 +18,9 @@ http://www.devdungeon.com/content/working-binary-data-python#bytes
 
 """
 
-"""
-nibbles are four bits. A byte consists of two nibles.
-hiBits==0xF0, loBits==0x0F Especially used for setting
-channel and event in 1. byte of musical midi events
-"""
+# nibbles are four bits. A byte consists of two nibles.
+# hiBits==0xF0, loBits==0x0F Especially used for setting
+# channel and event in 1. byte of musical midi events
 
 
 def getNibbles(byte):
@@ -89,12 +94,13 @@ def writeBew(value, length):
     return value.to_bytes(length, byteorder='big', signed=False)
 
 
-"""
-Variable Length Data (varlen) is a data format sprayed liberally throughout
-a midi file. It can be anywhere from 1 to 4 bytes long.
-If the 8'th bit is set in a byte another byte follows. The value is stored
-in the lowest 7 bits of each byte. So max value is 4x7 bits = 28 bits.
-"""
+# Variable Length Data (varlen) is a data format sprayed liberally throughout
+# a midi file. It can be anywhere from 1 to 4 bytes long.
+# If the 8'th bit is set in a byte another byte follows. The value is stored
+# in the lowest 7 bits of each byte. So max value is 4x7 bits = 28 bits.
+
+# the largest value a varlen can hold. 4 x 7 bits.
+MAX_VARLEN = 0x0FFFFFFF
 
 
 def readVar(value):
@@ -124,7 +130,16 @@ def writeVar(value):
     [127]
     >>> writeVar(205042145)
     [225, 226, 227, 97]
+    >>> writeVar(MAX_VARLEN + 1)
+    Traceback (most recent call last):
+    ...
+    ValueError: Values must be in the range 0-268435455
     """
+    if 0 <= value < 0x80:
+        # most delta times
+        return [value]
+    if not 0 <= value <= MAX_VARLEN:
+        raise ValueError('Values must be in the range 0-%s' % MAX_VARLEN)
     sevens = to_n_bits(value)
     for i in range(len(sevens)-1):
         sevens[i] = sevens[i] | 0x80 # set msb to 1
@@ -169,6 +184,163 @@ def to_n_bits(value, length=None, nbits=7):
     return bit7s
 
 
+# Array versions of the converters, that convert a whole column of values at 
+# a time. They take a numpy array, an array.array or any sequence of ints. 
+# With numpy they are vectorized and return numpy arrays. Without numpy they 
+# fall back to the single value converters, and return array.array's.
+
+
+def _checked_values(values, max_value):
+    "values as an int64 numpy array, checked to be in the range 0..max_value"
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) and (values.min() < 0 or values.max() > max_value):
+        raise ValueError('Values must be in the range 0-%s' % max_value)
+    return values
+
+
+def varLenArray(values):
+    """
+    Returns the number of bytes each value takes as varlen
+    >>> varLenArray([0, 127, 128, 16384, 2097152]).tolist()
+    [1, 1, 2, 3, 4]
+    >>> varLenArray([-1])
+    Traceback (most recent call last):
+    ...
+    ValueError: Values must be in the range 0-268435455
+    """
+    if np is None:
+        sizes = array('B')
+        for value in values:
+            if not 0 <= value <= MAX_VARLEN:
+                raise ValueError('Values must be in the range 0-%s' % MAX_VARLEN)
+            sizes.append(varLen(value))
+        return sizes
+    values = _checked_values(values, MAX_VARLEN)
+    return (1 + (values >= 0x80) + (values >= 0x4000) + (values >= 0x200000)).astype(np.int64)
+
+
+def putVarArray(out, positions, values, sizes=None):
+    """
+    Writes each of the values as varlen into the numpy uint8 array out, 
+    starting at positions. sizes is from varLenArray, if it is already known.
+    Needs numpy. It lets bulk encoders place the varlens between other data.
+    >>> out = np.zeros(4, dtype=np.uint8)
+    >>> putVarArray(out, [0, 2], [0x80, 0x7F])
+    >>> out.tolist()
+    [129, 0, 127, 0]
+    >>> putVarArray(out, [0], [MAX_VARLEN + 1])
+    Traceback (most recent call last):
+    ...
+    ValueError: Values must be in the range 0-268435455
+    """
+    values = _checked_values(values, MAX_VARLEN)
+    positions = np.asarray(positions, dtype=np.int64)
+    if sizes is None:
+        sizes = varLenArray(values)
+    for i in range(4):
+        mask = sizes > i
+        last = sizes[mask] - 1
+        shift = 7 * (last - i)
+        more = np.where(last > i, 0x80, 0)
+        out[positions[mask] + i] = ((values[mask] >> shift) & 0x7F) | more
+
+
+def writeVarArray(values):
+    """
+    Encodes all the values as one contiguous buffer of varlens
+    >>> list(writeVarArray([0, 127, 128, 205042145]))
+    [0, 127, 129, 0, 225, 226, 227, 97]
+    >>> writeVarArray([MAX_VARLEN + 1])
+    Traceback (most recent call last):
+    ...
+    ValueError: Values must be in the range 0-268435455
+    """
+    if np is None:
+        out = bytearray()
+        for value in values:
+            if not 0 <= value <= MAX_VARLEN:
+                raise ValueError('Values must be in the range 0-%s' % MAX_VARLEN)
+            out += bytes(writeVar(value))
+        return bytes(out)
+    sizes = varLenArray(values)
+    out = np.empty(int(sizes.sum()), dtype=np.uint8)
+    putVarArray(out, np.cumsum(sizes) - sizes, values, sizes)
+    return out.tobytes()
+
+
+def readVarArray(data):
+    """
+    Decodes a buffer of concatenated varlens into an array of the values
+    >>> readVarArray(bytes([0, 127, 129, 0, 225, 226, 227, 97])).tolist()
+    [0, 127, 128, 205042145]
+
+    It is exact at all the limits of the varlen sizes
+    >>> values = [0, 0x7F, 0x80, 0x3FFF, 0x4000, 0x1FFFFF, 0x200000, MAX_VARLEN]
+    >>> writeVarArray(values) == b''.join(bytes(writeVar(v)) for v in values)
+    True
+    >>> readVarArray(writeVarArray(values)).tolist() == values
+    True
+    >>> readVarArray(bytes([129, 128]))
+    Traceback (most recent call last):
+    ...
+    ValueError: The data ends in the middle of a varlen
+    """
+    if len(data) and data[-1] & 0x80:
+        raise ValueError('The data ends in the middle of a varlen')
+    if np is None:
+        values = array('q')
+        position = 0
+        while position < len(data):
+            size = 1
+            while data[position + size - 1] & 0x80:
+                size += 1
+            if size > 4:
+                raise ValueError('Varlen longer than 4 bytes at position %s' % position)
+            values.append(readVar(data[position:position + size]))
+            position += size
+        return values
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero((data & 0x80) == 0)
+    if not len(ends):
+        return np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    sizes = ends - starts + 1
+    if sizes.max() > 4:
+        raise ValueError('Varlen longer than 4 bytes at position %s' % starts[np.argmax(sizes > 4)])
+    # each byte is shifted by 7 bits for each byte after it in its varlen
+    shifts = 7 * (np.repeat(ends, sizes) - np.arange(len(data)))
+    return np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+
+
+def writeBewArray(values, length):
+    """
+    Encodes all the values as big endian words of length bytes
+    >>> list(writeBewArray([1, 258], 2))
+    [0, 1, 1, 2]
+    """
+    if not length in [1,2,4]:
+        raise ValueError('words must be one of 1,2 or 4')
+    if np is None:
+        return b''.join(writeBew(value, length) for value in values)
+    values = _checked_values(values, (1 << (8 * length)) - 1)
+    return values.astype('>u%s' % length).tobytes()
+
+
+def readBewArray(data, length):
+    """
+    Decodes a buffer of big endian words of length bytes
+    >>> readBewArray(bytes([0, 1, 1, 2]), 2).tolist()
+    [1, 258]
+    """
+    if not length in [1,2,4]:
+        raise ValueError('words must be one of 1,2 or 4')
+    if len(data) % length:
+        raise ValueError('The data is not a whole number of words')
+    if np is None:
+        return array('q', [readBew(data[i:i+length]) for i in range(0, len(data), length)])
+    return np.frombuffer(data, dtype='>u%s' % length).astype(np.int64)
+
+
 def manufacturer_id(man_id):
     """
     man_id is 1 OR 3 bytes long. If the first byte is zero then it MUST be a 3 byte value
@@ -1,11 +1,152 @@
 # -*- coding: utf-8 -*-
 
+# standard library imports
+from functools import partial
+
 # custom
 from mxm.midifile.src.data_type_converters import readBew, readVar, varLen, from_twos_complement, to_twos_complement
 from mxm.midifile.src import constants as c
+from mxm.midifile.src.midi_events import MidiEvents
+
+def _data_sizes():
+    """
+    The number of data bytes following each of the 256 status bytes. None for 
+    data bytes, and for system exclusive and meta events that has a variable length.
+    In files a 0xF7 is a sysex escape, which has a length just like 0xF0.
+    """
+    data_sizes = [None] * 256
+    channel_messages = {
+        c.NOTE_OFF: 2,
+        c.NOTE_ON: 2,
+        c.AFTERTOUCH: 2,
+        c.CONTINUOUS_CONTROLLER: 2,
+        c.PATCH_CHANGE: 1,
+        c.CHANNEL_PRESSURE: 1,
+        c.PITCH_BEND: 2,
+    }
+    for hi_nible, data_size in channel_messages.items():
+        for channel in range(16):
+            data_sizes[(hi_nible<<4) + channel] = data_size
+    # system common and realtime messages
+    for status in range(0xF0, 0x100):
+        data_sizes[status] = 0
+    data_sizes[c.MTC] = 1
+    data_sizes[c.SONG_POSITION_POINTER] = 2
+    data_sizes[c.SONG_SELECT] = 1
+    data_sizes[c.SYSTEM_EXCLUSIVE] = None
+    data_sizes[c.END_OFF_EXCLUSIVE] = None
+    data_sizes[c.META_EVENT] = None
+    return data_sizes
+
+DATA_SIZES = _data_sizes()
+
+
+def _event_names():
+    """
+    The names of the event handler methods for the 256 status bytes and 
+    the 256 meta types. None where there is no event.
+    """
+    status_events = [None] * 256
+    channel_events = {
+        c.NOTE_OFF: 'note_off',
+        c.NOTE_ON: 'note_on',
+        c.AFTERTOUCH: 'aftertouch',
+        c.CONTINUOUS_CONTROLLER: 'continuous_controller',
+        c.PATCH_CHANGE: 'patch_change',
+        c.CHANNEL_PRESSURE: 'channel_pressure',
+        c.PITCH_BEND: 'pitch_bend',
+    }
+    for hi_nible, name in channel_events.items():
+        for channel in range(16):
+            status_events[(hi_nible<<4) + channel] = name
+    status_events[c.SYSTEM_EXCLUSIVE] = 'sysex_event'
+    status_events[c.END_OFF_EXCLUSIVE] = 'sysex_event'
+    status_events[c.MTC] = 'midi_time_code'
+    status_events[c.SONG_POSITION_POINTER] = 'song_position_pointer'
+    status_events[c.SONG_SELECT] = 'song_select'
+    status_events[c.TUNING_REQUEST] = 'tuning_request'
+    status_events[c.TIMING_CLOCK] = 'timing_clock'
+    status_events[c.SONG_START] = 'song_start'
+    status_events[c.SONG_CONTINUE] = 'song_continue'
+    status_events[c.SONG_STOP] = 'song_stop'
+    status_events[c.ACTIVE_SENSING] = 'active_sensing'
+    meta_events = ['meta_event'] * 256
+    meta_events[c.SEQUENCE_NUMBER] = 'sequence_number'
+    meta_events[c.TEXT] = 'text'
+    meta_events[c.COPYRIGHT] = 'copyright'
+    meta_events[c.SEQUENCE_NAME] = 'sequence_name'
+    meta_events[c.INSTRUMENT_NAME] = 'instrument_name'
+    meta_events[c.LYRIC] = 'lyric'
+    meta_events[c.MARKER] = 'marker'
+    meta_events[c.CUEPOINT] = 'cuepoint'
+    meta_events[c.PROGRAM_NAME] = 'program_name'
+    meta_events[c.DEVICE_NAME] = 'device_name'
+    meta_events[c.MIDI_CH_PREFIX] = 'midi_ch_prefix'
+    meta_events[c.MIDI_PORT] = 'midi_port'
+    meta_events[c.END_OF_TRACK] = 'end_of_track'
+    meta_events[c.TEMPO] = 'tempo'
+    meta_events[c.SMTP_OFFSET] = 'smtp_offset'
+    meta_events[c.TIME_SIGNATURE] = 'time_signature'
+    meta_events[c.KEY_SIGNATURE] = 'key_signature'
+    meta_events[c.SEQUENCER_SPECIFIC] = 'sequencer_specific'
+    return status_events, meta_events
+
+STATUS_EVENTS, META_EVENTS = _event_names()
+
+
+# Names for groups of events, that can be used in the event filters along 
+# with the names of the events themselves.
+EVENT_CLASSES = {
+    'channel': ('note_off', 'note_on', 'aftertouch', 'continuous_controller', 
+                'patch_change', 'channel_pressure', 'pitch_bend'),
+    'meta': tuple(sorted(set(META_EVENTS))),
+    'sysex': ('sysex_event',),
+    'system_common': ('midi_time_code', 'song_position_pointer', 'song_select', 
+                      'tuning_request'),
+    'realtime': ('timing_clock', 'song_start', 'song_continue', 'song_stop', 
+                 'active_sensing'),
+}
+
+
+def event_names(names):
+    """
+    Returns the set of event names in names, with the event classes expanded.
+    >>> sorted(event_names(['sysex', 'tempo']))
+    ['sysex_event', 'tempo']
+    >>> event_names(['tempi'])
+    Traceback (most recent call last):
+    ...
+    ValueError: Unknown event or event class: 'tempi'
+    """
+    if isinstance(names, str):
+        names = [names]
+    known = set(name for name in STATUS_EVENTS if name is not None) | set(META_EVENTS)
+    result = set()
+    for name in names:
+        if name in EVENT_CLASSES:
+            result.update(EVENT_CLASSES[name])
+        elif name in known:
+            result.add(name)
+        else:
+            raise ValueError('Unknown event or event class: %r' % (name,))
+    return result
+
 
 class EventDispatcher:
 
+    # The parser only calls set_running_status and reset_running_status
+    # on dispatchers that want them.
+    running_status_events = True
+
+    # Events that the event handler inherits unchanged from base_events 
+    # are left out of the dispatch tables, when skip_unused_events is set.
+    base_events = MidiEvents
+    skip_unused_events = True
+
+    # Events are copied as they are to handlers with a raw_event method, 
+    # when passthrough_raw_events is set. See passthrough_events.
+    passthrough_raw_events = True
+
     def __init__(self, event_handler):
         
         """
@@ -26,15 +167,49 @@ class EventDispatcher:
         self.convert_zero_velocity = False
         
         # If dispatch_continuos_controllers is true, continuos 
-        # controllers gets dispatched to their defined handlers. Else 
+        # controllers gets dispatched through the continuous_controllers 
+        # method of the dispatcher, when a subclass overrides it. Else 
         # they just trigger the "continuous_controller" event handler.
-        self.dispatch_continuos_controllers = 1 # NOT IMPLEMENTED YET
+        self._dispatch_continuos_controllers = 1
         
         # If dispatch_meta_events is true, meta events get's dispatched 
         # to their defined events. Else they all they trigger the 
         # "meta_event" handler.
-        self.dispatch_meta_events = 1
+        self._dispatch_meta_events = 1
+
+        # the include and exclude of filter_events, kept for rebuilding the tables
+        self._filters = None
+        self.build_tables()
+
 
+    # The flags are used when the dispatch tables are built, so the tables 
+    # are rebuilt when they change.
+
+    @property
+    def dispatch_continuos_controllers(self):
+        return self._dispatch_continuos_controllers
+
+    @dispatch_continuos_controllers.setter
+    def dispatch_continuos_controllers(self, value):
+        self._dispatch_continuos_controllers = value
+        self.build_tables()
+
+    @property
+    def dispatch_meta_events(self):
+        """
+        >>> from mxm.midifile import MidiToCode
+        >>> dispatch = EventDispatcher(MidiToCode())
+        >>> dispatch.dispatch_meta_events = 0
+        >>> dispatch.meta_table[c.TEMPO](0, 0, bytes([7, 161, 32]))
+        midi_out.update_time(new_time=0)
+        midi_out.meta_event(meta_type=81, data=[7, 161, 32])
+        """
+        return self._dispatch_meta_events
+
+    @dispatch_meta_events.setter
+    def dispatch_meta_events(self, value):
+        self._dispatch_meta_events = value
+        self.build_tables()
 
 
     def header(self, format, nTracks, division):
@@ -84,52 +259,562 @@ class EventDispatcher:
 
 
 
-    # Event dispatchers for similar types of events
-    
-    
-    def channel_message(self, hi_nible, channel, data, use_running_status=False):
+    # Dispatch tables. They are built once when the dispatcher is created, 
+    # so finding the handler for an event is a list lookup instead of 
+    # a chain of comparisons.
+
+    def build_tables(self):
         """
-        Dispatches channel messages
+        Builds the dispatch tables from the event handler.
+
+        status_table has an entry for all 256 status bytes. Each is a tuple 
+        of (data_size, handler) where handler is called as 
+        handler(delta, tick, status, data, use_running_status). delta is the 
+        relative time of the event and tick the absolute time in the track. 
+        System exclusive and meta events have variable lengths and so have a 
+        data_size of None. The data of a system exclusive event is as it is 
+        in the file, with the terminating 0xF7 if there is one.
+
+        meta_table has an entry for all 256 meta types. Each is a handler 
+        that is called as handler(delta, tick, data).
+
+        Events that nobody uses has None as the handler. They are skipped 
+        by the parser, and their time is added to the delta of the next event.
+
+        The time is part of the event, so the parser does not need a separate 
+        call to update the time. Here the handlers update the time on the 
+        event handler before triggering the event. See _event.
+
+        Call this again if methods are replaced on the event handler after 
+        the dispatcher has been created.
+        >>> from mxm.midifile import MidiToCode
+        >>> dispatch = EventDispatcher(MidiToCode())
+        >>> data_size, handler = dispatch.status_table[0x92]
+        >>> data_size
+        2
+        >>> handler(96, 96, 0x92, bytes([64, 100]), False)
+        midi_out.update_time(new_time=96)
+        midi_out.note_on(channel=2, note=64, velocity=100)
+        >>> dispatch.status_table[c.SYSTEM_EXCLUSIVE][0] is None
+        True
+        >>> dispatch.meta_table[c.TEMPO](0, 96, bytes([7, 161, 32]))
+        midi_out.update_time(new_time=0)
+        midi_out.tempo(value=500000) # bpm: ~120.00
         """
-        events = self.event_handler
-        if (c.NOTE_ON) == hi_nible:
+        self.status_table, self.meta_table = self.decode_tables(self._event)
+        self._untimed = None
+        if self.passthrough_raw_events:
+            self.passthrough_events()
+        if self.skip_unused_events:
+            self.skip_events()
+        if self._filters is not None:
+            self.filter_events(*self._filters)
+
+
+    def decode_tables(self, event):
+        """
+        Returns a status_table and a meta_table, as described in build_tables, 
+        that decodes the events. Each decoded event is triggered with the 
+        function that event(name) returns for it, as 
+        
+            trigger(delta, tick, *args)
+        
+        where args are the arguments of the event handler method. Dispatchers 
+        only differ in how they trigger the events, so they share the decoding 
+        by passing their own event function. event(None) returns a trigger 
+        for events that only moves the time.
+        """
+        status_table = [(None, self._illegal_status)] * 256
+
+        # channel voice messages
+        note_on = event('note_on')
+        note_off = event('note_off')
+        aftertouch = event('aftertouch')
+        continuous_controller = event('continuous_controller')
+        patch_change = event('patch_change')
+        channel_pressure = event('channel_pressure')
+        pitch_bend = event('pitch_bend')
+        time_only = event(None)
+
+        def _note_on(delta, tick, status, data, use_running_status):
             note, velocity = data
             # note_on with velocity 0x00 are same as note 
             # off with velocity 0x40 according to spec!
             if velocity==0 and self.convert_zero_velocity:
-                events.note_off(channel, note, 0x40, use_running_status)
+                note_off(delta, tick, status & 0x0F, note, 0x40, use_running_status)
             else:
-                events.note_on(channel, note, velocity, use_running_status)
-        elif (c.NOTE_OFF) == hi_nible:
+                note_on(delta, tick, status & 0x0F, note, velocity, use_running_status)
+
+        def _note_off(delta, tick, status, data, use_running_status):
             note, velocity = data
-            events.note_off(channel, note, velocity, use_running_status)
-        elif (c.AFTERTOUCH) == hi_nible:
+            note_off(delta, tick, status & 0x0F, note, velocity, use_running_status)
+
+        def _aftertouch(delta, tick, status, data, use_running_status):
             note, velocity = data
-            events.aftertouch(channel, note, velocity, use_running_status)
-        elif (c.CONTINUOUS_CONTROLLER) == hi_nible:
+            aftertouch(delta, tick, status & 0x0F, note, velocity, use_running_status)
+
+        def _continuous_controller(delta, tick, status, data, use_running_status):
             controller, value = data
-            # A lot of the cc's are defined, so we trigger those directly
-            if self.dispatch_continuos_controllers:
-                self.continuous_controllers(channel, controller, value, use_running_status)
-            else:
-                events.continuous_controller(channel, controller, value, use_running_status)
-        elif (c.PATCH_CHANGE) == hi_nible:
-            program = data[0]
-            events.patch_change(channel, program, use_running_status)
-        elif (c.CHANNEL_PRESSURE) == hi_nible:
-            pressure = data[0]
-            events.channel_pressure(channel, pressure, use_running_status)
-        elif (c.PITCH_BEND) == hi_nible:
+            continuous_controller(delta, tick, status & 0x0F, controller, value, use_running_status)
+
+        def _continuous_controllers(delta, tick, status, data, use_running_status):
+            # through the continuous_controllers of a dispatcher subclass
+            time_only(delta, tick)
+            controller, value = data
+            self.continuous_controllers(status & 0x0F, controller, value, use_running_status)
+
+        def _patch_change(delta, tick, status, data, use_running_status):
+            patch_change(delta, tick, status & 0x0F, data[0], use_running_status)
+
+        def _channel_pressure(delta, tick, status, data, use_running_status):
+            channel_pressure(delta, tick, status & 0x0F, data[0], use_running_status)
+
+        def _pitch_bend(delta, tick, status, data, use_running_status):
             hibyte, lobyte = data
-            value = (hibyte<<7) + lobyte
-            events.pitch_bend(channel, value, use_running_status)
-        else:
+            pitch_bend(delta, tick, status & 0x0F, (hibyte<<7) + lobyte, use_running_status)
+
+        # system exclusive, common and realtime messages
+        sysex_event = event('sysex_event')
+        midi_time_code = event('midi_time_code')
+        song_position_pointer = event('song_position_pointer')
+        song_select = event('song_select')
+        tuning_request = event('tuning_request')
+
+        def _sysex(delta, tick, status, data, use_running_status):
+            # don't pass on the sysex terminator
+            if data and data[-1] == c.END_OFF_EXCLUSIVE:
+                data = data[:-1]
+            sysex_event(delta, tick, data)
+
+        def _midi_time_code(delta, tick, status, data, use_running_status):
+            # MTC Midi time code Quarter value
+            value = data[0]
+            midi_time_code(delta, tick, (value & 0x70) >> 4, value & 0x0F)
+
+        def _song_position_pointer(delta, tick, status, data, use_running_status):
+            lobyte, hibyte = data
+            song_position_pointer(delta, tick, (hibyte<<7) + lobyte)
+
+        def _song_select(delta, tick, status, data, use_running_status):
+            song_select(delta, tick, data[0])
+
+        def _tuning_request(delta, tick, status, data, use_running_status):
+            # no data then
+            tuning_request(delta, tick)
+
+        def _realtime(name):
+            realtime_event = event(name)
+            def _realtime(delta, tick, status, data, use_running_status):
+                realtime_event(delta, tick)
+            return _realtime
+
+        def _ignore(delta, tick, status, data, use_running_status):
+            time_only(delta, tick)
+
+        handlers = {
+            c.NOTE_OFF: _note_off,
+            c.NOTE_ON: _note_on,
+            c.AFTERTOUCH: _aftertouch,
+            c.CONTINUOUS_CONTROLLER: _continuous_controller,
+            c.PATCH_CHANGE: _patch_change,
+            c.CHANNEL_PRESSURE: _channel_pressure,
+            c.PITCH_BEND: _pitch_bend,
+        }
+        if (self.dispatch_continuos_controllers and 
+                type(self).continuous_controllers is not EventDispatcher.continuous_controllers):
+            handlers[c.CONTINUOUS_CONTROLLER] = _continuous_controllers
+        system_handlers = {
+            c.SYSTEM_EXCLUSIVE: _sysex,
+            c.END_OFF_EXCLUSIVE: _sysex,
+            c.MTC: _midi_time_code,
+            c.SONG_POSITION_POINTER: _song_position_pointer,
+            c.SONG_SELECT: _song_select,
+            c.TUNING_REQUEST: _tuning_request,
+            c.TIMING_CLOCK: _realtime('timing_clock'),
+            c.SONG_START: _realtime('song_start'),
+            c.SONG_CONTINUE: _realtime('song_continue'),
+            c.SONG_STOP: _realtime('song_stop'),
+            c.ACTIVE_SENSING: _realtime('active_sensing'),
+            # meta events are dispatched through the meta_table
+            c.META_EVENT: None,
+        }
+        for status in range(0x80, 0x100):
+            hi_nible = status >> 4
+            if hi_nible in handlers:
+                handler = handlers[hi_nible]
+            else:
+                handler = system_handlers.get(status, _ignore)
+            status_table[status] = (DATA_SIZES[status], handler)
+
+        # meta events
+        meta_event = event('meta_event')
+        sequence_number = event('sequence_number')
+        midi_ch_prefix = event('midi_ch_prefix')
+        midi_port = event('midi_port')
+        end_of_track = event('end_of_track')
+        tempo = event('tempo')
+        smtp_offset = event('smtp_offset')
+        time_signature = event('time_signature')
+        key_signature = event('key_signature')
+        sequencer_specific = event('sequencer_specific')
+
+        def _undefined_meta(meta_type):
+            # Handles any undefined meta events
+            def _meta_event(delta, tick, data):
+                meta_event(delta, tick, meta_type, data)
+            return _meta_event
+
+        def _sequence_number(delta, tick, data):
+            # SEQUENCE_NUMBER = 0x00 (00 02 ss ss (seq-number))
+            sequence_number(delta, tick, readBew(data))
+
+        def _midi_ch_prefix(delta, tick, data):
+            # MIDI_CH_PREFIX = 0x20 (20 01 channel)
+            midi_ch_prefix(delta, tick, readBew(data))
+
+        def _midi_port(delta, tick, data):
+            # MIDI_PORT  = 0x21 (21 01 port (legacy stuff))
+            midi_port(delta, tick, readBew(data))
+
+        def _end_of_track(delta, tick, data):
+            # END_OFF_TRACK = 0x2F (2F 00)
+            end_of_track(delta, tick)
+
+        def _tempo(delta, tick, data):
+            # TEMPO = 0x51 (51 03 tt tt tt (tempo in us/quarternote))
+            b1, b2, b3 = data
+            # uses 3 bytes to represent time between quarter 
+            # notes in microseconds
+            tempo(delta, tick, (b1<<16) + (b2<<8) + b3)
+
+        def _smtp_offset(delta, tick, data):
+            # SMTP_OFFSET = 0x54 (0x54 05 hh mm ss ff xx)
+            hour, minute, second, frame, framePart = data
+            smtp_offset(delta, tick, hour, minute, second, frame, framePart)
+
+        def _time_signature(delta, tick, data):
+            # TIME_SIGNATURE = 0x58 (58 04 nn dd cc bb)
+            nn, dd, cc, bb = data
+            time_signature(delta, tick, nn, dd, cc, bb)
+
+        def _key_signature(delta, tick, data):
+            # KEY_SIGNATURE = 0x59 (59 02 sf mi)
+            sf, mi = data
+            key_signature(delta, tick, from_twos_complement(sf), mi)
+
+        def _sequencer_specific(delta, tick, data):
+            # SPECIFIC = 0x7F (Sequencer specific event)
+            if data[0] == 0:
+                id, meta_data = data[:3], data[3:]
+            else:
+                id, meta_data = data[0:1], data[1:]
+            sequencer_specific(delta, tick, id, meta_data)
+
+        def _text_event(name):
+            # the text events get the data as is
+            text_event = event(name)
+            def _text(delta, tick, data):
+                text_event(delta, tick, data)
+            return _text
+
+        meta_table = [_undefined_meta(meta_type) for meta_type in range(256)]
+        if not self.dispatch_meta_events:
+            return status_table, meta_table
+        meta_table[c.SEQUENCE_NUMBER] = _sequence_number
+        meta_table[c.TEXT] = _text_event('text')
+        meta_table[c.COPYRIGHT] = _text_event('copyright')
+        meta_table[c.SEQUENCE_NAME] = _text_event('sequence_name')
+        meta_table[c.INSTRUMENT_NAME] = _text_event('instrument_name')
+        meta_table[c.LYRIC] = _text_event('lyric')
+        meta_table[c.MARKER] = _text_event('marker')
+        meta_table[c.CUEPOINT] = _text_event('cuepoint')
+        meta_table[c.PROGRAM_NAME] = _text_event('program_name')
+        meta_table[c.DEVICE_NAME] = _text_event('device_name')
+        meta_table[c.MIDI_CH_PREFIX] = _midi_ch_prefix
+        meta_table[c.MIDI_PORT] = _midi_port
+        meta_table[c.END_OF_TRACK] = _end_of_track
+        meta_table[c.TEMPO] = _tempo
+        meta_table[c.SMTP_OFFSET] = _smtp_offset
+        meta_table[c.TIME_SIGNATURE] = _time_signature
+        meta_table[c.KEY_SIGNATURE] = _key_signature
+        meta_table[c.SEQUENCER_SPECIFIC] = _sequencer_specific
+        return status_table, meta_table
+
+
+    def _event(self, name):
+        """
+        Returns the trigger for the event name, for decode_tables. The time of 
+        the event handler is updated with the delta, and then the event 
+        handler method is called with the rest of the arguments.
+        """
+        update_time = self._bind('update_time')
+        if name is None:
+            def time_only(delta, tick):
+                update_time(delta)
+            return time_only
+        method = self._bind(name)
+        def trigger(delta, tick, *args):
+            update_time(delta)
+            method(*args)
+        return trigger
+
+
+    def _untimed_event(self, name):
+        """
+        Returns a trigger for the event name that leaves the time alone. 
+        Used by the public dispatch methods, that has no time.
+        """
+        if name is None:
+            return lambda delta, tick: None
+        method = self._bind(name)
+        return lambda delta, tick, *args: method(*args)
+
+
+    def _overrides(self, name, base=None):
+        """
+        True if the event handler has its own version of the method name, 
+        compared to the class base, that defaults to base_events. Handlers 
+        that are not subclasses of base are assumed to override everything.
+        Methods of the handler that it has set on itself does not count.
+        """
+        handler = self.event_handler
+        if base is None:
+            base = self.base_events
+        if not isinstance(handler, base):
+            return True
+        method = getattr(handler, '__dict__', {}).get(name)
+        if method is not None and getattr(method, '__self__', None) is not handler:
+            return True
+        return getattr(type(handler), name, None) is not getattr(base, name, None)
+
+
+    def passthrough_events(self):
+        """
+        Event handlers with a raw_event method, like MidiOutFile, gets the 
+        events they do not change as they are in the file, instead of 
+        decoded. That is the events that the handler inherits unchanged from 
+        the class that defines raw_event, and which that class does handle. 
+        The handler gets:
+
+            raw_event(status, data, use_running_status) for channel and 
+                system common events. data is the bytes after the status.
+            raw_meta_event(meta_type, data) for meta events
+            raw_sysex_event(status, data) for system exclusive events and 
+                escapes. data is all the bytes after the length, so it 
+                includes the terminating 0xF7 if there is one.
+
+        >>> from mxm.midifile import MidiOutFile
+        >>> class Transposer(MidiOutFile):
+        ...     def note_on(self, channel, note, velocity, use_running_status=False):
+        ...         MidiOutFile.note_on(self, channel, note + 12, velocity, use_running_status)
+        >>> dispatch = EventDispatcher(Transposer())
+        >>> dispatch.status_table[0x90][1].__name__, dispatch.status_table[0xB0][1].__name__
+        ('_note_on', '_raw')
+        >>> dispatch.meta_table[c.TEMPO].__name__, dispatch.meta_table[c.END_OF_TRACK].__name__
+        ('_raw_meta', '_end_of_track')
+        """
+        handler = self.event_handler
+        raw_class = None
+        for cls in type(handler).__mro__:
+            if 'raw_event' in vars(cls):
+                raw_class = cls
+                break
+        if raw_class is None:
+            return
+
+        def passes(name):
+            # unchanged from raw_class, which does something with it
+            return not self._overrides(name, raw_class) and self._overrides(name)
+
+        update_time = self._bind('update_time')
+        raw_event = self._bind('raw_event')
+        raw_meta_event = self._bind('raw_meta_event')
+        raw_sysex_event = self._bind('raw_sysex_event')
+
+        def _raw(delta, tick, status, data, use_running_status):
+            update_time(delta)
+            raw_event(status, data, use_running_status)
+
+        def _raw_sysex(delta, tick, status, data, use_running_status):
+            update_time(delta)
+            raw_sysex_event(status, data)
+
+        def _raw_meta_event(meta_type):
+            def _raw_meta(delta, tick, data):
+                update_time(delta)
+                raw_meta_event(meta_type, data)
+            return _raw_meta
+
+        status_table = self.status_table
+        meta_table = self.meta_table
+        for status, name in enumerate(STATUS_EVENTS):
+            if name is None:
+                continue
+            if name == 'note_on':
+                # note_on can be converted to note_off
+                copy = passes('note_on') and passes('note_off')
+            else:
+                copy = passes(name)
+            if copy:
+                handler = _raw_sysex if DATA_SIZES[status] is None else _raw
+                status_table[status] = (DATA_SIZES[status], handler)
+        for meta_type, name in enumerate(META_EVENTS):
+            # the end of track is where the track is written
+            if meta_type != c.END_OF_TRACK and passes(name):
+                meta_table[meta_type] = _raw_meta_event(meta_type)
+
+
+    def skip_events(self):
+        """
+        Removes the events from the dispatch tables that the event handler 
+        does not override. The base methods only validates the values, so 
+        there is no reason to decode and trigger those events.
+        >>> from mxm.midifile import MidiEvents
+        >>> class NoteHandler(MidiEvents):
+        ...     def note_on(self, channel, note, velocity, use_running_status=False):
+        ...         pass
+        >>> dispatch = EventDispatcher(NoteHandler())
+        >>> dispatch.status_table[0x90][1] is None, dispatch.status_table[0xB0][1] is None
+        (False, True)
+        >>> dispatch.meta_table[c.TEMPO] is None
+        True
+
+        The running status is only needed if the handler looks at it
+        >>> dispatch.running_status_events
+        False
+
+        If the time is used for more than the events, nothing is skipped
+        >>> class Counter(MidiEvents):
+        ...     def update_time(self, new_time=0, relative=1):
+        ...         pass
+        >>> EventDispatcher(Counter()).meta_table[c.TEMPO] is None
+        False
+        """
+        overrides = self._overrides
+        if overrides('update_time') or overrides('reset_time'):
+            return
+        status_table = self.status_table
+        meta_table = self.meta_table
+        for status, name in enumerate(STATUS_EVENTS):
+            data_size, handler = status_table[status]
+            if name is None:
+                # undefined system messages only updates the time
+                if handler is not None and status >= 0xF0 and status != c.META_EVENT:
+                    status_table[status] = (data_size, None)
+            elif name == 'note_on':
+                # note_on can be converted to note_off
+                if not (overrides('note_on') or overrides('note_off')):
+                    status_table[status] = (data_size, None)
+            elif not overrides(name):
+                status_table[status] = (data_size, None)
+        for meta_type, name in enumerate(META_EVENTS):
+            if not overrides(name):
+                meta_table[meta_type] = None
+        running_status_methods = ('set_running_status', 'reset_running_status', 
+                                  'get_running_status', '_check_run_stat')
+        self.running_status_events = type(self).running_status_events and any(
+            overrides(name) for name in running_status_methods)
+
+
+    def filter_events(self, include=None, exclude=None):
+        """
+        Removes events from the dispatch tables. include and exclude are 
+        lists of event names, like 'tempo' or 'note_on', or of the event 
+        classes in EVENT_CLASSES: 'channel', 'meta', 'sysex', 'system_common' 
+        and 'realtime'. If include is given only those events are kept. The 
+        events in exclude are removed. The parser skips removed events by 
+        their length, without slicing or decoding them.
+        The events that give the structure of the file, header, 
+        start_of_track, end_of_track and eof, are never removed. Otherwise 
+        a MidiOutFile would write no tracks.
+        >>> from mxm.midifile import MidiToCode
+        >>> dispatch = EventDispatcher(MidiToCode())
+        >>> dispatch.filter_events(include=['channel'], exclude=['note_on'])
+        >>> dispatch.status_table[0x90][1] is None, dispatch.status_table[0x80][1] is None
+        (True, False)
+        >>> dispatch.meta_table[c.TEMPO] is None, dispatch.meta_table[c.END_OF_TRACK] is None
+        (True, False)
+        """
+        self._filters = (include, exclude)
+        if include is not None:
+            include = event_names(include)
+        exclude = event_names(exclude) if exclude is not None else set()
+        def removed(name):
+            if include is not None and name not in include:
+                return True
+            return name in exclude
+        status_table = self.status_table
+        meta_table = self.meta_table
+        for status, name in enumerate(STATUS_EVENTS):
+            data_size, handler = status_table[status]
+            if handler is None or status == c.META_EVENT:
+                continue
+            # undefined system messages are only kept if all events are
+            if name is None and include is not None or name is not None and removed(name):
+                status_table[status] = (data_size, None)
+        for meta_type, name in enumerate(META_EVENTS):
+            if removed(name) and meta_type != c.END_OF_TRACK:
+                meta_table[meta_type] = None
+
+
+    def _bind(self, name):
+        """
+        Returns the bound handler method. Event handlers does not have to
+        implement all the methods, as long as the events never occur.
+        """
+        method = getattr(self.event_handler, name, None)
+        if method is None:
+            method = partial(self._missing_handler, name)
+        return method
+
+    def _missing_handler(self, name, *args):
+        # raises the AttributeError
+        getattr(self.event_handler, name)(*args)
+
+    def _illegal_status(self, delta, tick, status, data, use_running_status=False):
+        raise ValueError('Illegal status byte! %.x' % status)
+
+    def _untimed_tables(self):
+        "The decode tables of the public dispatch methods, made when first used"
+        tables = getattr(self, '_untimed', None)
+        if tables is None:
+            tables = self._untimed = self.decode_tables(self._untimed_event)
+        return tables
+
+
+    # Event dispatchers for similar types of events. They only trigger the 
+    # events, the time is left as it is.
+    
+    
+    def channel_message(self, hi_nible, channel, data, use_running_status=False):
+        """
+        Dispatches channel messages. The time of the event handler is left 
+        as it is.
+        >>> from mxm.midifile import MidiEvents
+        >>> class Printer(MidiEvents):
+        ...     def update_time(self, new_time=0, relative=1):
+        ...         print('update_time', new_time)
+        ...     def pitch_bend(self, channel, value, use_running_status=False):
+        ...         print('pitch_bend', channel, value)
+        >>> EventDispatcher(Printer()).channel_message(c.PITCH_BEND, 1, bytes([64, 0]))
+        pitch_bend 1 8192
+        >>> EventDispatcher(Printer()).channel_message(c.META_EVENT, 0, bytes([64, 0]))
+        Traceback (most recent call last):
+        ...
+        ValueError: Illegal channel message! ff
+        """
+        if not c.NOTE_OFF <= hi_nible <= c.PITCH_BEND:
             raise ValueError('Illegal channel message! %.x' % hi_nible)
+        status = (hi_nible<<4) + channel
+        data_size, handler = self._untimed_tables()[0][status]
+        handler(0, 0, status, data, use_running_status)
 
 
     def continuous_controllers(self, channel, controller, value, use_running_status):
         """
-        Dispatches continuous_controllers messages
+        Dispatches continuous_controllers messages. The parser calls this 
+        instead of the continuous_controller event, when a subclass overrides 
+        it and dispatch_continuos_controllers is set.
         """
         events = self.event_handler
         # I am not really shure if I ought to dispatch continuous controllers
@@ -141,128 +826,33 @@ class EventDispatcher:
 
 
     def system_commons(self, common_type, common_data):
-    
-        "Dispatches system common messages"
-        
-        events = self.event_handler
-        
-        # MTC Midi time code Quarter value
-        if common_type == c.MTC:
-            data = readBew(common_data)
-            msg_type = (data & 0x07) >> 4
-            values = (data & 0x0F)
-            events.midi_time_code(msg_type, values)
-        elif common_type == c.SONG_POSITION_POINTER:
-            hibyte, lobyte = common_data
-            value = (hibyte<<7) + lobyte
-            events.song_position_pointer(value)
-        elif common_type == c.SONG_SELECT:
-            data = readBew(common_data)
-            events.song_select(data)
-        elif common_type == c.TUNING_REQUEST:
-            # no data then
-            events.tuning_request(time=None)
+        """
+        Dispatches system common messages
+        >>> from mxm.midifile import MidiEvents
+        >>> class Printer(MidiEvents):
+        ...     def song_position_pointer(self, song_position):
+        ...         print('song_position_pointer', song_position)
+        >>> EventDispatcher(Printer()).system_commons(c.SONG_POSITION_POINTER, bytes([1, 2]))
+        song_position_pointer 257
+        """
+        data_size, handler = self._untimed_tables()[0][common_type]
+        if handler is not None:
+            handler(0, 0, common_type, common_data, False)
 
 
 
     def meta_event(self, meta_type, data):
-        "Dispatches meta events"
-        events = self.event_handler
-        
-        # SEQUENCE_NUMBER = 0x00 (00 02 ss ss (seq-number))
-        if meta_type == c.SEQUENCE_NUMBER:
-            number = readBew(data)
-            events.sequence_number(number)
-        
-        # TEXT = 0x01 (01 len text...)
-        elif meta_type == c.TEXT:
-            events.text(data)
-        
-        # COPYRIGHT = 0x02 (02 len text...)
-        elif meta_type == c.COPYRIGHT:
-            events.copyright(data)
-        
-        # SEQUENCE_NAME = 0x03 (03 len text...)
-        elif meta_type == c.SEQUENCE_NAME:
-            events.sequence_name(data)
-        
-        # INSTRUMENT_NAME = 0x04 (04 len text...)
-        elif meta_type == c.INSTRUMENT_NAME:
-            events.instrument_name(data)
-        
-        # LYRIC = 0x05 (05 len text...)
-        elif meta_type == c.LYRIC:
-            events.lyric(data)
-        
-        # MARKER = 0x06 (06 len text...)
-        elif meta_type == c.MARKER:
-            events.marker(data)
-        
-        # CUEPOINT = 0x07 (07 len text...)
-        elif meta_type == c.CUEPOINT:
-            events.cuepoint(data)
-        
-        # PROGRAM_NAME = 0x08 (05 len text...)
-        elif meta_type == c.PROGRAM_NAME:
-            events.program_name(data)
-        
-        # DEVICE_NAME = 0x09 (09 len text...)
-        elif meta_type == c.DEVICE_NAME:
-            events.device_name(data)
-        
-        # MIDI_CH_PREFIX = 0x20 (20 01 channel)
-        elif meta_type == c.MIDI_CH_PREFIX:
-            channel = readBew(data)
-            events.midi_ch_prefix(channel)
-        
-        # MIDI_PORT  = 0x21 (21 01 port (legacy stuff))
-        elif meta_type == c.MIDI_PORT:
-            port = readBew(data)
-            events.midi_port(port)
-        
-        # END_OFF_TRACK = 0x2F (2F 00)
-        elif meta_type == c.END_OF_TRACK:
-            events.end_of_track()
-        
-        # TEMPO = 0x51 (51 03 tt tt tt (tempo in us/quarternote))
-        elif meta_type == c.TEMPO:
-            b1, b2, b3 = data
-            # uses 3 bytes to represent time between quarter 
-            # notes in microseconds
-            events.tempo((b1<<16) + (b2<<8) + b3)
-        
-        # SMTP_OFFSET = 0x54 (0x54 05 hh mm ss ff xx)
-        elif meta_type == c.SMTP_OFFSET:
-            hour, minute, second, frame, framePart = data
-            events.smtp_offset(
-                    hour, minute, second, frame, framePart)
-        
-        # TIME_SIGNATURE = 0x58 (58 04 nn dd cc bb)
-        elif meta_type == c.TIME_SIGNATURE:
-            nn, dd, cc, bb = data
-            events.time_signature(nn, dd, cc, bb)
-        
-        # KEY_SIGNATURE = 0x59 (59 02 sf mi)
-        elif meta_type == c.KEY_SIGNATURE:
-            sf, mi = data
-            sf = from_twos_complement(sf)
-            events.key_signature(sf, mi)
-        
-        # SPECIFIC = 0x7F (Sequencer specific event)
-        elif meta_type == c.SEQUENCER_SPECIFIC:
-            meta_data = data
-            if meta_data[0] == 0:
-                id = meta_data[:3]
-                meta_data = meta_data[3:]
-            else:
-                id = meta_data[0:1]
-                meta_data = meta_data[1:]
-            events.sequencer_specific(id, meta_data)
-        
-        # Handles any undefined meta events
-        else: # undefined meta type
-            meta_data = data
-            events.meta_event(meta_type, meta_data)
+        """
+        Dispatches meta events
+        >>> from mxm.midifile import MidiToCode
+        >>> EventDispatcher(MidiToCode()).meta_event(c.KEY_SIGNATURE, bytes([255, 1]))
+        midi_out.update_time(new_time=0)
+        midi_out.key_signature(sf=-1, mi=1)
+        >>> EventDispatcher(MidiToCode()).meta_event(0x60, bytes([42]))
+        midi_out.update_time(new_time=0)
+        midi_out.meta_event(meta_type=96, data=[42])
+        """
+        self._untimed_tables()[1][meta_type](0, 0, data)
 
 
 
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+"""
+A pull based alternative to the event handlers. Instead of subclassing
+MidiEvents, you iterate over the events in a file. The file is parsed
+lazily, a small batch of events at a time, so breaking out of the loop
+early stops the parsing too.
+
+Each event is a tuple of (track, tick, type, data). tick is the absolute
+time in the track. type is the name of the MidiEvents method for the event,
+and data is a tuple of its arguments, without use_running_status. So an
+event can be passed on to a MidiOutFile with getattr(midi_out, type)(*data).
+
+>>> from mxm.midifile import testdir
+>>> for event in iter_events(testdir('midifiles/minimal.mid')):
+...     print(event)
+(0, 0, 'time_signature', (4, 2, 24, 8))
+(0, 0, 'tempo', (500000,))
+(0, 6144000, 'end_of_track', ())
+(1, 0, 'sequence_name', (b'Synth 1',))
+(1, 0, 'instrument_name', (b'Synth 1',))
+(1, 0, 'midi_port', (4,))
+(1, 0, 'note_on', (0, 36, 127))
+(1, 61440, 'note_off', (0, 36, 0))
+(1, 6144000, 'end_of_track', ())
+
+Find the first tempo without parsing the rest of the file
+>>> next(e for e in iter_events(testdir('midifiles/minimal.mid')) if e[2] == 'tempo')
+(0, 0, 'tempo', (500000,))
+"""
+
+# custom import
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+
+
+# the number of bytes of track data parsed at a time. The events are parsed
+# in batches, as each call to the parser has some overhead. A few hundred 
+# events is little enough to keep the parsing lazy.
+BATCH_SIZE = 1024
+
+
+class EventCollector:
+
+    """
+    An event handler that collects the events as (track, tick, type, data)
+    tuples in the 'events' list. It uses the timed event protocol, so the
+    tick comes with each event.
+    >>> collector = EventCollector()
+    >>> collector.set_current_track(2)
+    >>> collector.note_on(96, 0, 64, 100)
+    >>> collector.lyric(192, b'la')
+    >>> collector.events
+    [(2, 96, 'note_on', (0, 64, 100)), (2, 192, 'lyric', (b'la',))]
+    """
+
+    timed_events = True
+
+    def __init__(self):
+        self.events = []
+        self._track = 0
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        append = self.events.append
+        def collect(tick, *args):
+            append((self._track, tick, name, args))
+        return collect
+
+    # the events without a tick
+
+    def set_current_track(self, new_track):
+        self._track = new_track
+
+    def start_of_track(self, n_track=0):
+        pass
+
+    def header(self, format=0, nTracks=1, division=96):
+        pass
+
+    def eof(self):
+        pass
+
+
+def iter_parser_events(parser, tracks=None, batch_size=BATCH_SIZE):
+    """
+    Generator that parses the tracks lazily, and yields the events as
+    (track, tick, type, data). The event handler of the parser must be
+    an EventCollector. The events are parsed batch_size bytes at a time.
+    """
+    collector = parser.dispatch.event_handler
+    events = collector.events
+    raw_in = parser.raw_in
+    chunks = parser.indexMTrkChunks()
+    if tracks is not None:
+        for t in tracks:
+            if not 0 <= t < len(chunks):
+                raise ValueError('No track number %s in file. There are %s tracks.' % (t, len(chunks)))
+        chunks = [chunk for chunk in chunks if chunk.track in tracks]
+    parse_events = parser.parseMTrkEvents
+    for chunk in chunks:
+        raw_in.setCursor(chunk.offset)
+        parser._current_track = chunk.track
+        track_endposition = parser.startMTrkChunk()
+        cursor = raw_in.getCursor()
+        while cursor < track_endposition:
+            # the parser stops at the first event that ends past the batch
+            try:
+                parse_events(min(cursor + batch_size, track_endposition), track_endposition)
+            except Exception:
+                # the events before the error are still yielded
+                yield from events
+                del events[:]
+                raise
+            cursor = raw_in.getCursor()
+            if events:
+                yield from events
+                del events[:]
+
+
+def iter_events(infile, tracks=None, zero_copy=False, include=None, exclude=None):
+    """
+    Generator that yields the events in infile as (track, tick, type, data).
+    infile can be a path, a file object or a buffer. If tracks is a list of
+    track numbers, only those tracks are parsed. include and exclude are
+    lists of event names or classes, see EventDispatcher.filter_events. 
+    The end_of_track events are never filtered.
+    >>> from mxm.midifile import testdir
+    >>> for event in iter_events(testdir('midifiles/minimal.mid'), include=['sequence_name', 'channel']):
+    ...     print(event)
+    (0, 6144000, 'end_of_track', ())
+    (1, 0, 'sequence_name', (b'Synth 1',))
+    (1, 0, 'note_on', (0, 36, 127))
+    (1, 61440, 'note_off', (0, 36, 0))
+    (1, 6144000, 'end_of_track', ())
+    """
+    raw_in = RawInstreamFile(infile, zero_copy=zero_copy)
+    try:
+        parser = MidiFileParser(raw_in, EventCollector(), include=include, exclude=exclude)
+        parser.readMThdChunk()
+        yield from iter_parser_events(parser, tracks=tracks)
+    finally:
+        # unmaps a memory mapped file, also when the iteration is stopped early
+        raw_in.close()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
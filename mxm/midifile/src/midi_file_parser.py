@@ -8,8 +8,30 @@
 # http://midi.teragonaudio.com/tech/midispec/run.htm
 # http://www.recordingblogs.com/sa/Wiki/topic/Musical-Instrument-Digital-Interface-MIDI
 
+from collections import namedtuple
+
 from mxm.midifile.src import constants as c
 from mxm.midifile.src.event_dispatcher import EventDispatcher
+from mxm.midifile.src.timed_events import TimedEventDispatcher
+
+# An entry in the index of track chunks. offset is the position of the chunk header.
+TrackChunk = namedtuple('TrackChunk', 'track offset length')
+
+
+def default_dispatcher(event_handler):
+    """
+    Returns the dispatcher for event_handler. Event handler classes with an 
+    event_dispatcher attribute gets that. Those with the timed_events 
+    attribute gets a TimedEventDispatcher, and the rest an EventDispatcher.
+    """
+    # looked up on the class, as some handlers answers any attribute
+    dispatcher_class = getattr(type(event_handler), 'event_dispatcher', None)
+    if dispatcher_class is not None:
+        return dispatcher_class(event_handler)
+    if getattr(type(event_handler), 'timed_events', False):
+        return TimedEventDispatcher(event_handler)
+    return EventDispatcher(event_handler)
+
 
 class OutTest:
     def header(self, format, nTracks, division):
@@ -82,34 +104,52 @@ class MidiFileParser:
     eof
     """
 
-    def __init__(self, raw_in, event_handler):
+    def __init__(self, raw_in, event_handler, dispatch=None, include=None, exclude=None):
         """
         raw_data is the raw content of a midi file as bytes.
+        Event handler classes with the timed_events attribute set, like 
+        subclasses of TimedMidiEvents, gets the time with each event. 
+        See default_dispatcher.
+        dispatch is an optional EventDispatcher to use instead of the 
+        default one for event_handler.
+        include and exclude are event filters. See EventDispatcher.filter_events
         """
         # internal values, don't mess with 'em directly
         self.raw_in = raw_in
-        self.dispatch = EventDispatcher(event_handler)
+        if dispatch is None:
+            dispatch = default_dispatcher(event_handler)
+        if include is not None or exclude is not None:
+            dispatch.filter_events(include=include, exclude=exclude)
+        self.dispatch = dispatch
         # running status is only implemented for Voice Category messages (ie, Status is 0x80 to 0xEF).
         self.reset_running_status()
+        # the absolute time in the current track, and of the last event 
+        # that was dispatched
+        self._tick = 0
+        self._dispatched_tick = 0
 
     def reset_running_status(self):
         self._running_status = None
         self._use_running_status = False
-        self.dispatch.reset_running_status()
+        if self.dispatch.running_status_events:
+            self.dispatch.reset_running_status()
         
     def set_running_status(self, status):
         self._running_status = status
-        self.dispatch.set_running_status(status)
+        if self.dispatch.running_status_events:
+            self.dispatch.set_running_status(status)
 
     def get_running_status(self):
         return self._running_status
 
 
-    def parseMThdChunk(self):
+    def readMThdChunk(self):
         """
-        Parses the header chunk
+        Reads the header chunk, without triggering any events. Leaves the 
+        cursor at the first chunk after the header.
         """
         raw_in = self.raw_in
+        raw_in.setCursor(0)
         header_chunk_type = raw_in.nextSlice(4)
         header_chunk_size = raw_in.readBew(4)
         # check if it is a proper midi file
@@ -124,125 +164,256 @@ class MidiFileParser:
         # But correctly ignore unknown data if it is though
         if header_chunk_size > 6:
             raw_in.moveCursor(header_chunk_size-6)
+        self._chunks_position = raw_in.getCursor()
+
+
+    def parseMThdChunk(self):
+        """
+        Parses the header chunk
+        """
+        self.readMThdChunk()
         # call the header event handler on the stream
         self.dispatch.header(self.format, self.nTracks, self.division)
 
 
-    def parseMTrkChunks(self):
-        "Parses all track chunks."
-        for t in range(self.nTracks):
-            self._current_track = t
-            self.parseMTrkChunk() # this is where it's at!
+    def indexMTrkChunks(self):
+        """
+        Returns a list of TrackChunk(track, offset, length) for the track 
+        chunks in the file. offset is the absolute position of the chunk 
+        header and length is the length of the track data. Only the chunk 
+        headers are read, so it is cheap. Unknown chunk types are skipped, 
+        as the spec says they should be. The cursor is left untouched.
+        >>> from mxm.midifile import RawInstreamFile, testdir
+        >>> p = MidiFileParser(RawInstreamFile(testdir('midifiles/minimal.mid')), OutTest())
+        >>> p.indexMTrkChunks()
+        [TrackChunk(track=0, offset=14, length=22), TrackChunk(track=1, offset=44, length=44)]
+        """
+        raw_in = self.raw_in
+        cursor = raw_in.getCursor()
+        if not hasattr(self, '_chunks_position'):
+            self.readMThdChunk()
+        data = raw_in.getData()
+        position = self._chunks_position
+        chunks = []
+        try:
+            # A chunk header is 4 bytes of type and 4 bytes of length
+            while position + 8 <= len(data):
+                raw_in.setCursor(position + 4)
+                length = raw_in.readBew(4)
+                if data[position:position+4] == c.TRACK_HEADER:
+                    chunks.append(TrackChunk(len(chunks), position, length))
+                position += 8 + length
+        finally:
+            raw_in.setCursor(cursor)
+        return chunks
+
+
+    def parseMTrkChunks(self, tracks=None):
+        """
+        Parses all track chunks. If tracks is a list of track numbers, only those 
+        tracks are parsed. The chunk index is used to jump directly to them.
+        >>> from mxm.midifile import RawInstreamFile, MidiToCode, testdir
+        >>> p = MidiFileParser(RawInstreamFile(testdir('midifiles/minimal.mid')), MidiToCode())
+        >>> p.parseMThdChunk()
+        from mxm.midifile import MidiOutFile
+        <BLANKLINE>
+        midi_out = MidiOutFile('file.mid')
+        midi_out.header(format=1, nTracks=2, division=15360)
+        <BLANKLINE>
+        >>> p.parseMTrkChunks(tracks=[1])
+        midi_out.start_of_track(n_track=1)
+        midi_out.update_time(new_time=0)
+        midi_out.sequence_name(text=b'Synth 1')
+        midi_out.update_time(new_time=0)
+        midi_out.instrument_name(text=b'Synth 1')
+        midi_out.update_time(new_time=0)
+        midi_out.midi_port(value=4)
+        midi_out.update_time(new_time=0)
+        midi_out.note_on(channel=0, note=36, velocity=127)
+        midi_out.update_time(new_time=61440)
+        midi_out.note_off(channel=0, note=36, velocity=0)
+        midi_out.end_of_track()
+        <BLANKLINE>
+        <BLANKLINE>
+        >>> p.parseMTrkChunks(tracks=[2])
+        Traceback (most recent call last):
+        ...
+        ValueError: No track number 2 in file. There are 2 tracks.
+        """
+        if tracks is None:
+            for t in range(self.nTracks):
+                self._current_track = t
+                self.parseMTrkChunk() # this is where it's at!
+        else:
+            chunks = self.indexMTrkChunks()
+            for t in tracks:
+                if not 0 <= t < len(chunks):
+                    raise ValueError('No track number %s in file. There are %s tracks.' % (t, len(chunks)))
+            for chunk in chunks:
+                if chunk.track in tracks:
+                    self.raw_in.setCursor(chunk.offset)
+                    self._current_track = chunk.track
+                    self.parseMTrkChunk()
         self.dispatch.eof()
 
 
     def parseMTrkChunk(self):
         "Parses a track chunk. This is the most important part of the parser."
+        track_endposition = self.startMTrkChunk()
+        self.parseMTrkEvents(track_endposition)
+
+
+    def startMTrkChunk(self):
+        """
+        Starts a track chunk. Triggers the start of track, and reads the track 
+        header. Returns the absolute end position of the track.
+        """
         # set time to 0 at start of a track
         self.dispatch.reset_time()
+        self._tick = 0
+        self._dispatched_tick = 0
         dispatch = self.dispatch
         raw_in = self.raw_in
-#        print('raw_in.data[raw_in.getCursor():raw_in.getCursor()+20] %s' % raw_in.data[raw_in.getCursor():raw_in.getCursor()+20] )
-#        print('raw_in.data[raw_in.getCursor():raw_in.getCursor()+20] %s' % list(raw_in.data[raw_in.getCursor():raw_in.getCursor()+20]) )
         # Trigger event at the start of a track
         dispatch.start_of_track(self._current_track)
         # position cursor after track header
         raw_in.moveCursor(4)
         # unsigned long is 4 bytes
         tracklength = raw_in.readBew(4)
-#        print ('tracklength: %s' % tracklength)
-        track_endposition = raw_in.getCursor() + tracklength # absolute position!
-
-#        print(raw_in.data[raw_in.getCursor():raw_in.getCursor()+20]) 
-#        print(list(raw_in.data[raw_in.getCursor():raw_in.getCursor()+20]))
-
-        while raw_in.getCursor() < track_endposition:
-            
-            # find relative time of the event
-            time = raw_in.readVarLen()
-            dispatch.update_time(time)
-            
-            # running status is only implemented for Voice Category
-            # messages (ie, Status is 0x80 to 0xEF).
-            peak_ahead = raw_in.readBew(move_cursor=0)
-#            print('peak_ahead: %s' % peak_ahead)
-            if (peak_ahead & 0b10000000): 
-                # the status byte has the high bit set, so it
-                # was not running data but proper status byte
-                status = raw_in.readBew()
-                self.set_running_status(status)
-                self._use_running_status = False
-            else:
-                # use that darn running status
-                status = self.get_running_status()
-                self._use_running_status = True
-
-                # while I am almost certain that no realtime 
-                # messages will pop up in a midi file, I might need to 
-                # change my mind later.
-
-            # we need to look at nibbles here
-#            print('='*80)
-#            print (status)
-            hi_nible, lo_nible = (status & 0xF0) >> 4, status & 0x0F
-            if hi_nible == 0xF:
-                self.reset_running_status()
-            
-            # match up with events
-
-            # Is it a meta_event ??
-            # these only exists in midi files, not in transmitted midi data
-            # In transmitted data META_EVENT (0xFF) is a system reset
-            if status == c.META_EVENT:
-                meta_type = raw_in.readBew()
-                meta_length = raw_in.readVarLen()
-                meta_data = raw_in.nextSlice(meta_length)
-                dispatch.meta_event(meta_type, meta_data)
-
-
-            # Is it a sysex_event ??
-            elif status == c.SYSTEM_EXCLUSIVE:
-                # ignore sysex events
-                sysex_length = raw_in.readVarLen()
-                # don't read sysex terminator
-                sysex_data = raw_in.nextSlice(sysex_length-1)
-                # only read last data byte if it is a sysex terminator
-                # It should allways be there, but better safe than sorry
-                if raw_in.readBew(move_cursor=0) == c.END_OFF_EXCLUSIVE:
-                    eo_sysex = raw_in.readBew()
-                dispatch.sysex_event(sysex_data)
-                # the sysex code has not been properly tested, and might be fishy!
-
-
-            # is it a system common event?
-            elif hi_nible == 0xF0: # Hi bits are set then
-                data_sizes = {
-                    c.MTC:1,
-                    c.SONG_POSITION_POINTER:2,
-                    c.SONG_SELECT:1,
-                }
-                data_size = data_sizes.get(hi_nible, 0)
-                common_data = raw_in.nextSlice(data_size)
-                common_type = lo_nible
-                dispatch.system_common(common_type, common_data)
-            
-
-            # Oh! Then it must be a midi event (channel voice message)
-            else:
-                data_sizes = {
-                    c.PATCH_CHANGE:1,
-                    c.CHANNEL_PRESSURE:1,
-                    c.NOTE_OFF:2,
-                    c.NOTE_ON:2,
-                    c.AFTERTOUCH:2,
-                    c.CONTINUOUS_CONTROLLER:2,
-                    c.PITCH_BEND:2,
-                }
-                data_size = data_sizes.get(hi_nible, 0)
-                channel_data = raw_in.nextSlice(data_size)
-                event_type, channel = hi_nible, lo_nible
-#                print ((event_type, channel, channel_data, self._use_running_status))
-                dispatch.channel_message(event_type, channel, channel_data, self._use_running_status)
+        return raw_in.getCursor() + tracklength # absolute position!
+
+
+    def parseMTrkEvents(self, end_position, track_end=None):
+        """
+        Parses the events from the cursor up to end_position. This is the hot loop 
+        of the parser, so the data is read directly by index from the raw data 
+        without creating intermediate bytes objects. Only event payloads are sliced.
+        track_end is the end of the track chunk, if it is not end_position.
+        """
+        dispatch = self.dispatch
+        raw_in = self.raw_in
+        data = raw_in.getData()
+        cursor = raw_in.getCursor()
+        status_table = dispatch.status_table
+        meta_table = dispatch.meta_table
+        running_status_events = dispatch.running_status_events
+        set_running_status = dispatch.set_running_status
+        reset_running_status = dispatch.reset_running_status
+        # the time and running status are kept locally, and stored when done
+        tick = self._tick
+        dispatched_tick = self._dispatched_tick
+        running_status = self._running_status
+        # the file might be truncated
+        if track_end is None:
+            track_end = end_position
+        data_end = min(track_end, len(data))
+        event_start = cursor
+        try:
+            while cursor < end_position:
+                event_start = cursor
+                
+                # find relative time of the event. Inlined varlen, max 4 bytes
+                byte = data[cursor]
+                cursor += 1
+                time = byte & 0x7F
+                if byte & 0x80:
+                    for i in range(3):
+                        byte = data[cursor]
+                        cursor += 1
+                        time = (time << 7) | (byte & 0x7F)
+                        if not byte & 0x80:
+                            break
+                # the time is passed on with the event, instead of updating 
+                # the time in a separate call
+                tick += time
+                
+                # running status is only implemented for Voice Category
+                # messages (ie, Status is 0x80 to 0xEF).
+                status = data[cursor]
+                if status & 0b10000000:
+                    # the status byte has the high bit set, so it
+                    # was not running data but proper status byte
+                    cursor += 1
+                    running_status = status
+                    if running_status_events:
+                        set_running_status(status)
+                    use_running_status = False
+                else:
+                    # use that darn running status
+                    status = running_status
+                    use_running_status = True
+                    if status is None:
+                        raise ValueError('Running status data without a status byte at position %s' % cursor)
+
+                    # while I am almost certain that no realtime 
+                    # messages will pop up in a midi file, I might need to 
+                    # change my mind later.
+
+                # system messages cancel the running status
+                if status >= 0xF0:
+                    running_status = None
+                    if running_status_events:
+                        reset_running_status()
+                
+                # match up with events. The status table gives the data size 
+                # and the handler, so no need to compare with each event type.
+                # Events that are not used has no handler, and are skipped.
+                # Their time is added to the delta of the next event.
+                data_size, handler = status_table[status]
+
+                # Is it a channel message or a system common message?
+                # They have a fixed size.
+                if data_size is not None:
+                    if cursor + data_size > data_end:
+                        raise ValueError('Event runs past the end of the track')
+                    if handler is not None:
+                        handler(tick - dispatched_tick, tick, status, 
+                                data[cursor:cursor+data_size], use_running_status)
+                        dispatched_tick = tick
+                    cursor += data_size
+
+                # Is it a meta_event ??
+                # these only exists in midi files, not in transmitted midi data
+                # In transmitted data META_EVENT (0xFF) is a system reset
+                elif status == c.META_EVENT:
+                    meta_type = data[cursor]
+                    raw_in.setCursor(cursor + 1)
+                    meta_length = raw_in.readVarLen()
+                    cursor = raw_in.getCursor() + meta_length
+                    if cursor > data_end:
+                        raise ValueError('Meta event runs past the end of the track')
+                    meta_handler = meta_table[meta_type]
+                    if meta_handler is not None:
+                        meta_handler(tick - dispatched_tick, tick, data[cursor-meta_length:cursor])
+                        dispatched_tick = tick
+
+                # Then it must be a sysex_event
+                else:
+                    raw_in.setCursor(cursor)
+                    sysex_length = raw_in.readVarLen()
+                    cursor = raw_in.getCursor() + sysex_length
+                    if cursor > data_end:
+                        raise ValueError('Sysex event runs past the end of the track')
+                    if handler is not None:
+                        # the data is passed on as it is, with the terminator 
+                        # if there is one. A split sysex or an escape has none.
+                        handler(tick - dispatched_tick, tick, status, 
+                                data[cursor-sysex_length:cursor], False)
+                        dispatched_tick = tick
+                    # the sysex code has not been properly tested, and might be fishy!
+        except Exception as error:
+            # leave the cursor at the start of the event that failed
+            raw_in.setCursor(event_start)
+            if isinstance(error, IndexError) and cursor >= len(data):
+                # reading past the end of the data, not an error in a handler
+                raise ValueError('The data ends in the middle of the event at position %s' % event_start) from None
+            raise
+        finally:
+            self._tick = tick
+            self._dispatched_tick = dispatched_tick
+            self._running_status = running_status
+        # keep the cursor of raw_in in sync
+        raw_in.setCursor(cursor)
 
 
 
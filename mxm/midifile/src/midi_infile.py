@@ -2,6 +2,8 @@
 
 from mxm.midifile.src.raw_instream_file import RawInstreamFile
 from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.parallel_parser import parse_tracks_parallel
+from mxm.midifile.src.event_iterator import EventCollector, iter_parser_events
 
 
 class MidiInFile:
@@ -48,17 +50,106 @@ class MidiInFile:
     <BLANKLINE>
     """
 
-    def __init__(self, event_handler, infile):
+    def __init__(self, event_handler, infile, zero_copy=False, include=None, exclude=None):
+        """
+        infile can be a path, a file object or a buffer like bytes, bytearray, 
+        memoryview or mmap. With zero_copy=True paths are memory mapped and 
+        the handlers get memoryview slices of the data instead of copies.
+        Call close() when done to release the mapping.
+
+        include and exclude are lists of event names, like 'lyric', or event 
+        classes: 'channel', 'meta', 'sysex', 'system_common' or 'realtime'. 
+        Only the included events are triggered, and the excluded are not. 
+        The other events are skipped without being decoded. The header, 
+        start_of_track, end_of_track and eof events are always triggered.
+        >>> from mxm.midifile import testdir, MidiToCode
+        >>> midi_in = MidiInFile(MidiToCode(), testdir('midifiles/minimal.mid'), include=['tempo'])
+        >>> midi_in.read(tracks=[0])
+        from mxm.midifile import MidiOutFile
+        <BLANKLINE>
+        midi_out = MidiOutFile('file.mid')
+        midi_out.header(format=1, nTracks=2, division=15360)
+        <BLANKLINE>
+        midi_out.start_of_track(n_track=0)
+        midi_out.update_time(new_time=0)
+        midi_out.tempo(value=500000) # bpm: ~120.00
+        midi_out.end_of_track()
+        <BLANKLINE>
+        <BLANKLINE>
+        """
         # these could also have been mixins, would that be better? Nah!
-        self.raw_in = RawInstreamFile(infile)
-        self.parser = MidiFileParser(self.raw_in, event_handler)
+        self.raw_in = RawInstreamFile(infile, zero_copy=zero_copy)
+        self.parser = MidiFileParser(self.raw_in, event_handler, include=include, exclude=exclude)
+
+
+    def read(self, tracks=None):
+        """
+        Start parsing the file. If tracks is a list of track numbers only those 
+        tracks are parsed. The rest of the file is skipped without being decoded.
+        >>> from mxm.midifile import testdir, MidiToCode
+        >>> midi_in = MidiInFile(MidiToCode(), testdir('midifiles/minimal.mid'))
+        >>> midi_in.read(tracks=[0])
+        from mxm.midifile import MidiOutFile
+        <BLANKLINE>
+        midi_out = MidiOutFile('file.mid')
+        midi_out.header(format=1, nTracks=2, division=15360)
+        <BLANKLINE>
+        midi_out.start_of_track(n_track=0)
+        midi_out.update_time(new_time=0)
+        midi_out.time_signature(nn=4, dd=2, cc=24, bb=8)
+        midi_out.update_time(new_time=0)
+        midi_out.tempo(value=500000) # bpm: ~120.00
+        midi_out.end_of_track()
+        <BLANKLINE>
+        <BLANKLINE>
+        """
+        p = self.parser
+        p.parseMThdChunk()
+        p.parseMTrkChunks(tracks=tracks)
 
 
-    def read(self):
-        "Start parsing the file"
+    def read_parallel(self, tracks=None, processes=None, pool=None):
+        """
+        Parses the tracks in parallel in a pool of worker processes. The 
+        events are passed to the event handler in track order, exactly as 
+        with read(). Use 'processes' to set the number of workers, or pass 
+        a multiprocessing 'pool' to reuse it for several files.
+        It pays off for large files with many tracks, where the time is 
+        spent in parsing rather than in the event handler. Events that are 
+        filtered or skipped are skipped in the workers too. Use map_tracks 
+        to run an event handler in each of the workers instead.
+        """
         p = self.parser
         p.parseMThdChunk()
-        p.parseMTrkChunks()
+        parse_tracks_parallel(p, tracks=tracks, processes=processes, pool=pool)
+
+
+    def iter_events(self, tracks=None, include=None, exclude=None):
+        """
+        Generator that parses the file lazily and yields the events as 
+        (track, tick, type, data) tuples. The event handler is not used.
+        Stopping the iteration early also stops the parsing. include and 
+        exclude are event filters, as for the MidiInFile.
+        >>> from mxm.midifile import testdir, MidiEvents
+        >>> midi_in = MidiInFile(MidiEvents(), testdir('midifiles/minimal.mid'))
+        >>> [e for e in midi_in.iter_events(tracks=[1]) if e[2] in ('note_on', 'note_off')]
+        [(1, 0, 'note_on', (0, 36, 127)), (1, 61440, 'note_off', (0, 36, 0))]
+        """
+        parser = MidiFileParser(self.raw_in, EventCollector(), include=include, exclude=exclude)
+        parser.readMThdChunk()
+        return iter_parser_events(parser, tracks=tracks)
+
+
+    def chunk_index(self):
+        """
+        Returns the index of the track chunks in the file as a list of 
+        TrackChunk(track, offset, length). Only the header and the chunk 
+        headers are read.
+        >>> from mxm.midifile import testdir, MidiEvents
+        >>> MidiInFile(MidiEvents(), testdir('midifiles/minimal.mid')).chunk_index()
+        [TrackChunk(track=0, offset=14, length=22), TrackChunk(track=1, offset=44, length=44)]
+        """
+        return self.parser.indexMTrkChunks()
 
 
     def setData(self, data=''):
@@ -1,10 +1,159 @@
 # -*- coding: utf-8 -*-
 
+# standard library imports
+import shutil, sys, tempfile
+
+# optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# custom import
 from mxm.midifile.src import constants as c
 from mxm.midifile.src.midi_events import MidiEvents
 from mxm.midifile.src.raw_outstream_file import RawOutstreamFile
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.event_dispatcher import EventDispatcher
+from mxm.midifile.src.midi_to_arrays import MidiToArrays
 from mxm.midifile.src.data_type_converters import writeVar, writeBew, to_twos_complement
 
+
+_END_OF_TRACK = bytes([c.META_EVENT, c.END_OF_TRACK, 0])
+
+# the status bytes of the channel events on channel 0
+_NOTE_OFF = c.NOTE_OFF << 4
+_NOTE_ON = c.NOTE_ON << 4
+_AFTERTOUCH = c.AFTERTOUCH << 4
+_CONTINUOUS_CONTROLLER = c.CONTINUOUS_CONTROLLER << 4
+_PATCH_CHANGE = c.PATCH_CHANGE << 4
+_CHANNEL_PRESSURE = c.CHANNEL_PRESSURE << 4
+_PITCH_BEND = c.PITCH_BEND << 4
+
+# the channel events with an unchecked method in trusted mode
+_TRUSTED_EVENTS = ('note_on', 'note_off', 'aftertouch', 'continuous_controller', 
+                   'patch_change', 'channel_pressure', 'pitch_bend')
+
+# when streaming, the track buffer is flushed when it is larger than this
+FLUSH_SIZE = 1 << 16
+# and tracks that can not be written directly to the file are kept in 
+# memory up to this size, and then spilled to a temporary file
+SPILL_SIZE = 1 << 24
+# the length of a chunk is 4 bytes
+MAX_CHUNK_SIZE = 0xFFFFFFFF
+
+
+class ValidatingDispatcher(EventDispatcher):
+
+    "Dispatches every event, so all the checks in MidiEvents are run"
+
+    skip_unused_events = False
+
+
+class _EventChecks(MidiEvents):
+
+    "The checks of MidiEvents, with sysex events checked as system_exclusive"
+
+    def sysex_event(self, data):
+        self.system_exclusive(data)
+
+
+def _check_chunk_size(length):
+    "Raises a ValueError if a track chunk of length bytes can not be written"
+    if length > MAX_CHUNK_SIZE:
+        raise ValueError('A track can be at most %s bytes. It was %s' % (MAX_CHUNK_SIZE, length))
+
+
+def validate_track(track_data):
+    """
+    Checks all the events in the data of a track in one pass, with the 
+    same checks as MidiEvents does for each event. Raises an AssertionError 
+    or a ValueError for the first illegal event.
+    >>> validate_track(bytes([0, 0x90, 64, 100, 96, 0x80, 64, 0]))
+    >>> validate_track(bytes([0, 0x90, 64, 100, 96, 0xFF, 0x59, 2, 200, 0]))
+    Traceback (most recent call last):
+    ...
+    AssertionError: sf must be in -7..7 range. Was -56
+    >>> validate_track(bytes([0, 0x90, 64, 100, 96, 0x80, 200, 0]))
+    Traceback (most recent call last):
+    ...
+    AssertionError: Illegal note value: 200
+    """
+    chunk = c.TRACK_HEADER + writeBew(len(track_data), 4) + bytes(track_data)
+    if np is not None:
+        # the track is parsed into the columnar event table, where the data 
+        # bytes of all the channel and system common events are checked at 
+        # once. Only the few meta and sysex events are checked one by one.
+        arrays = MidiToArrays()
+        parser = MidiFileParser(RawInstreamFile(chunk), arrays)
+        parser._current_track = 0
+        parser.parseMTrkChunk()
+        table = arrays.eof()
+        status = table['status']
+        data_events = (status != c.META_EVENT) & (status != c.SYSTEM_EXCLUSIVE) & (status != c.END_OFF_EXCLUSIVE)
+        if not ((table['data1'] | table['data2']) > 0x7F)[data_events].any():
+            dispatch = ValidatingDispatcher(_EventChecks())
+            payload = arrays.payload
+            for event in table[~data_events].tolist():
+                data = payload[event[6]:event[6] + event[7]]
+                if event[2] == c.META_EVENT:
+                    dispatch.meta_table[event[4]](0, event[1], data)
+                else:
+                    dispatch.status_table[event[2]][1](0, event[1], event[2], data, False)
+            return
+    # the events are checked one by one, which also finds the first illegal 
+    # event when there are any.
+    events = _EventChecks()
+    parser = MidiFileParser(RawInstreamFile(chunk), events, dispatch=ValidatingDispatcher(events))
+    parser._current_track = 0
+    parser.parseMTrkChunk()
+
+
+class _DirectTrack:
+
+    """
+    A track that is written directly to a seekable file. The chunk header is 
+    written with a length of 0, which is patched when the track ends.
+    """
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self.position = outfile.tell()
+        outfile.write(c.TRACK_HEADER + writeBew(0, 4))
+        self.write = outfile.write
+
+    def close(self, raw_out):
+        outfile = self.outfile
+        end = outfile.tell()
+        _check_chunk_size(end - self.position - 8)
+        outfile.seek(self.position + 4)
+        outfile.write(writeBew(end - self.position - 8, 4))
+        outfile.seek(end)
+
+
+class _SpooledTrack:
+
+    """
+    A track that is kept in memory up to spill_size, and then in a temporary 
+    file. The chunk is copied to the output when the track ends.
+    """
+
+    def __init__(self, spill_size):
+        self.spool = tempfile.SpooledTemporaryFile(max_size=spill_size)
+        self.write = self.spool.write
+
+    def close(self, raw_out):
+        spool = self.spool
+        length = spool.tell()
+        _check_chunk_size(length)
+        raw_out.writeSlice(c.TRACK_HEADER)
+        raw_out.writeBew(length, 4)
+        spool.seek(0)
+        shutil.copyfileobj(spool, raw_out.outfile)
+        spool.close()
+
+
 class MidiOutFile(MidiEvents):
 
     """
@@ -17,16 +166,79 @@ class MidiOutFile(MidiEvents):
     AttributeError: '_current_track_buffer' is not found. Did you forget to call 'start_of_track()'
     >>> midi_out.start_of_track()
     >>> midi_out.note_on(0,64,127)
-    >>> list(midi_out._current_track_buffer.read_all())
+    >>> list(midi_out._current_track_buffer)
     [0, 144, 64, 127]
     >>> midi_out.close()
+
+    When the events are known to be good, eg. when they are parsed from a 
+    file, 'trusted' swaps in channel event methods that does no checking 
+    at all. Channel events that a subclass overrides are not swapped. With 
+    'validate' too, each track is checked in a single pass when it ends, 
+    instead of event by event.
+    >>> midi_out = MidiOutFile(trusted=True, validate=True)
+    >>> midi_out.start_of_track()
+    >>> midi_out.note_on(0, 64, 127)
+    >>> midi_out.note_on(0, 200, 127)
+    >>> midi_out.end_of_track()
+    Traceback (most recent call last):
+    ...
+    AssertionError: Illegal note value: 200
+
+    Normally a track is kept in memory until it ends, as the length of the 
+    track comes before its events in the file. With 'streaming' the events 
+    are written to the file as the track grows, and the length is patched 
+    in when the track ends. If the file can not seek, or other tracks are 
+    open, the track is kept in memory up to spill_size bytes, and then in a 
+    temporary file. So memory use is bounded for any length of track.
+    >>> import io
+    >>> midi_out = MidiOutFile(io.BytesIO(), streaming=True)
+    >>> midi_out.header()
+    >>> midi_out.start_of_track()
+    >>> midi_out.note_on(0, 64, 127)
+    >>> midi_out.end_of_track()
+    >>> list(midi_out.read_all()[14:])
+    [77, 84, 114, 107, 0, 0, 0, 8, 0, 144, 64, 127, 0, 255, 47, 0]
+
+    With 'auto_running_status' the status byte of a channel event is left 
+    out whenever it is the same as that of the previous event in the track, 
+    which the file format allows. Meta, sysex and system common events 
+    cancel the running status.
+    >>> midi_out = MidiOutFile(auto_running_status=True)
+    >>> midi_out.start_of_track()
+    >>> midi_out.note_on(0, 64, 127)
+    >>> midi_out.note_on(0, 67, 127)
+    >>> midi_out.text(b'')
+    >>> midi_out.note_on(0, 64, 0)
+    >>> list(midi_out._current_track_buffer)
+    [0, 144, 64, 127, 0, 67, 127, 0, 255, 1, 0, 0, 144, 64, 0]
     """
 
-    def __init__(self, f=''):
+    def __init__(self, f='', trusted=False, validate=False, streaming=False, spill_size=SPILL_SIZE,
+                 auto_running_status=False):
         if f and isinstance(f, str):
             f = open(f, 'wb')
         self.raw_out = RawOutstreamFile(f)
         MidiEvents.__init__(self)
+        self.trusted = trusted
+        self.validate = validate
+        if streaming and validate:
+            raise ValueError('A track can not be validated when it is streamed')
+        self.streaming = streaming
+        self.spill_size = spill_size
+        self.auto_running_status = auto_running_status
+        # the status of the last channel event in the track, when it can be left out
+        self._last_status = None
+        # the size at which the track buffer is flushed to the track sink
+        self._flush_size = FLUSH_SIZE if streaming else sys.maxsize
+        self._track_sink = None
+        # tracks that are open, but not the current track. See select_track
+        self._open_tracks = {}
+        self._selected_track = None
+        if trusted:
+            # only the channel events a subclass does not override are swapped
+            for name in _TRUSTED_EVENTS:
+                if getattr(type(self), name) is getattr(MidiOutFile, name):
+                    setattr(self, name, getattr(self, '_trusted_' + name))
 
     def write(self):
         self.raw_out.write()
@@ -39,7 +251,9 @@ class MidiOutFile(MidiEvents):
         "self"
         self.raw_out.close()
         if hasattr(self, '_current_track_buffer'):
-            self._current_track_buffer.close()
+            del self._current_track_buffer
+        self._open_tracks.clear()
+        self._track_sink = None
 
     def event_slice(self, slc):
         """
@@ -49,9 +263,124 @@ class MidiOutFile(MidiEvents):
         """
         if not hasattr(self, '_current_track_buffer'):
             raise AttributeError("'_current_track_buffer' is not found. Did you forget to call 'start_of_track()'")
-        current = self._current_track_buffer
-        current.writeVarLen(self.rel_time())
-        current.writeSlice(slc)
+        self._trusted_event(slc)
+
+
+    def _trusted_event(self, data):
+        """
+        Appends the time and the data of an event to the track buffer. data 
+        is bytes, or a sequence of byte values.
+        """
+        time = self._relative_time
+        track_buffer = self._current_track_buffer
+        if time < 0x80:
+            # most delta times
+            track_buffer.append(time)
+        elif time < 0x4000:
+            track_buffer.append(0x80 | (time >> 7))
+            track_buffer.append(time & 0x7F)
+        else:
+            track_buffer.extend(writeVar(time))
+        if self.auto_running_status:
+            status = data[0]
+            if status == self._last_status:
+                data = data[1:]
+            elif status >= 0xF0:
+                self._last_status = None
+            elif status >= 0x80:
+                self._last_status = status
+        track_buffer.extend(data)
+        if len(track_buffer) > self._flush_size:
+            self._track_sink.write(track_buffer)
+            del track_buffer[:]
+
+
+    # raw events, that are copied as they are in the file
+
+    def raw_event(self, status, data, use_running_status=False):
+        """
+        Writes a channel or system common event as it is. data is the bytes 
+        after the status byte. The parser uses this for all the events that 
+        a subclass does not change, so they are copied without being decoded.
+        >>> midi_out = MidiOutFile()
+        >>> midi_out.start_of_track()
+        >>> midi_out.raw_event(0xB0, bytes([7, 100]))
+        >>> midi_out.update_time(96)
+        >>> midi_out.raw_event(0xB0, bytes([7, 90]), use_running_status=True)
+        >>> list(midi_out._current_track_buffer)
+        [0, 176, 7, 100, 96, 7, 90]
+        """
+        if use_running_status and not self.auto_running_status:
+            self._trusted_event(bytes(data))
+        else:
+            self._trusted_event(bytes((status,)) + data)
+
+
+    def raw_meta_event(self, meta_type, data):
+        "Writes a meta event as it is"
+        self.meta_slice(meta_type, data)
+
+
+    def raw_sysex_event(self, status, data):
+        """
+        Writes a system exclusive event, or an 0xF7 escape, as it is. data 
+        is the bytes after the length, with the terminating 0xF7 if the 
+        event has one. A sysex split in packets stays split.
+        >>> midi_out = MidiOutFile()
+        >>> midi_out.start_of_track()
+        >>> midi_out.raw_sysex_event(0xF0, bytes([0x43, 0x12]))
+        >>> midi_out.raw_sysex_event(0xF7, bytes([0x00, 0xF7]))
+        >>> list(midi_out._current_track_buffer)
+        [0, 240, 2, 67, 18, 0, 247, 2, 0, 247]
+        """
+        self._trusted_event(bytes([status] + writeVar(len(data))) + data)
+
+
+    # unchecked channel events for trusted mode
+
+    def _trusted_note_on(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
+        if use_running_status:
+            self._trusted_event((note, velocity))
+        else:
+            self._trusted_event((_NOTE_ON | channel, note, velocity))
+
+    def _trusted_note_off(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
+        if use_running_status:
+            self._trusted_event((note, velocity))
+        else:
+            self._trusted_event((_NOTE_OFF | channel, note, velocity))
+
+    def _trusted_aftertouch(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
+        if use_running_status:
+            self._trusted_event((note, velocity))
+        else:
+            self._trusted_event((_AFTERTOUCH | channel, note, velocity))
+
+    def _trusted_continuous_controller(self, channel, controller, value, use_running_status=False):
+        if use_running_status:
+            self._trusted_event((controller, value))
+        else:
+            self._trusted_event((_CONTINUOUS_CONTROLLER | channel, controller, value))
+
+    def _trusted_patch_change(self, channel, patch, use_running_status=False):
+        if use_running_status:
+            self._trusted_event((patch,))
+        else:
+            self._trusted_event((_PATCH_CHANGE | channel, patch))
+
+    def _trusted_channel_pressure(self, channel, pressure, use_running_status=False):
+        if use_running_status:
+            self._trusted_event((pressure,))
+        else:
+            self._trusted_event((_CHANNEL_PRESSURE | channel, pressure))
+
+    def _trusted_pitch_bend(self, channel, value, use_running_status=False):
+        msb = (value>>7) & 0xFF
+        lsb = value & 0xFF
+        if use_running_status:
+            self._trusted_event((msb, lsb))
+        else:
+            self._trusted_event((_PITCH_BEND | channel, msb, lsb))
 
     
     #####################
@@ -65,11 +394,9 @@ class MidiOutFile(MidiEvents):
         """
         super().note_on(channel=channel, note=note, velocity=velocity, use_running_status=use_running_status)
         if use_running_status:
-            slc = [note, velocity]
+            self.event_slice((note, velocity))
         else:
-            status = (c.NOTE_ON<<4) + channel
-            slc = [status, note, velocity]
-        self.event_slice(slc)
+            self.event_slice((_NOTE_ON | channel, note, velocity))
 
 
     def note_off(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
@@ -79,11 +406,9 @@ class MidiOutFile(MidiEvents):
         """
         super().note_off(channel=channel, note=note, velocity=velocity, use_running_status=use_running_status)
         if use_running_status:
-            slc = [note, velocity]
+            self.event_slice((note, velocity))
         else:
-            status = (c.NOTE_OFF<<4) + channel
-            slc = [status, note, velocity]
-        self.event_slice(slc)
+            self.event_slice((_NOTE_OFF | channel, note, velocity))
 
 
     def aftertouch(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
@@ -93,10 +418,9 @@ class MidiOutFile(MidiEvents):
         """
         super().aftertouch(channel, note, velocity, use_running_status=use_running_status)
         if use_running_status:
-            slc = [note, velocity]
+            self.event_slice((note, velocity))
         else:
-            slc = [(c.AFTERTOUCH<<4) + channel, note, velocity]
-        self.event_slice(slc)
+            self.event_slice((_AFTERTOUCH | channel, note, velocity))
 
 
     def continuous_controller(self, channel, controller, value, use_running_status=False):
@@ -106,10 +430,9 @@ class MidiOutFile(MidiEvents):
         """
         super().continuous_controller(channel, controller, value, use_running_status=use_running_status)
         if use_running_status:
-            slc = [controller, value]
+            self.event_slice((controller, value))
         else:
-            slc = [(c.CONTINUOUS_CONTROLLER<<4) + channel, controller, value]
-        self.event_slice(slc)
+            self.event_slice((_CONTINUOUS_CONTROLLER | channel, controller, value))
         # These should probably be implemented
         # http://users.argonet.co.uk/users/lenny/midi/tech/spec.html#ctrlnums
 
@@ -121,10 +444,9 @@ class MidiOutFile(MidiEvents):
         """
         super().patch_change(channel, patch, use_running_status=use_running_status)
         if use_running_status:
-            slc = [patch]
+            self.event_slice((patch,))
         else:
-            slc = [(c.PATCH_CHANGE<<4) + channel, patch]
-        self.event_slice(slc)
+            self.event_slice((_PATCH_CHANGE | channel, patch))
 
 
     def channel_pressure(self, channel, pressure, use_running_status=False):
@@ -135,10 +457,9 @@ class MidiOutFile(MidiEvents):
         """
         super().channel_pressure(channel, pressure, use_running_status=use_running_status)
         if use_running_status:
-            slc = [pressure]
+            self.event_slice((pressure,))
         else:
-            slc = [(c.CHANNEL_PRESSURE<<4) + channel, pressure]
-        self.event_slice(slc)
+            self.event_slice((_CHANNEL_PRESSURE | channel, pressure))
 
 
     def pitch_bend(self, channel, value, use_running_status=False):
@@ -151,10 +472,9 @@ class MidiOutFile(MidiEvents):
         msb = (value>>7) & 0xFF
         lsb = value & 0xFF
         if use_running_status:
-            slc = [msb, lsb]
+            self.event_slice((msb, lsb))
         else:
-            slc = [(c.PITCH_BEND<<4) + channel, msb, lsb]
-        self.event_slice(slc)
+            self.event_slice((_PITCH_BEND | channel, msb, lsb))
 
 
 
@@ -210,7 +530,7 @@ class MidiOutFile(MidiEvents):
         No values passed
         """
         super().tuning_request()
-        self.event_slice(chr(c.TUNING_REQUEST))
+        self.event_slice([c.TUNING_REQUEST])
 
             
     #########################
@@ -234,6 +554,7 @@ class MidiOutFile(MidiEvents):
         >>> header, size, format, nTracks, division
         ([77, 84, 104, 100], [0, 0, 0, 6], [0, 0], [0, 1], [0, 96])
         """        
+        self._check_direct_track()
         raw = self.raw_out
         raw.writeSlice(c.FILE_HEADER)
         bew = raw.writeBew
@@ -286,9 +607,82 @@ class MidiOutFile(MidiEvents):
         n_track: number of track
         """
         super().start_of_track(n_track)
-        self._current_track_buffer = RawOutstreamFile()
-        self.reset_time()
+        # the events of the track are encoded directly into a bytearray
+        self._current_track_buffer = bytearray()
+        self._last_status = None
+        self._track_sink = None
+        if self.streaming:
+            outfile = self.raw_out.outfile
+            seekable = getattr(outfile, 'seekable', None)
+            if seekable is not None and seekable() and not self._open_tracks:
+                self._track_sink = _DirectTrack(outfile)
+            else:
+                self._track_sink = _SpooledTrack(self.spill_size)
+        # the time of the new track, also for subclasses with their own clock
+        MidiEvents.reset_time(self)
         self._current_track += 1
+        self._selected_track = n_track
+
+
+    def select_track(self, n_track):
+        """
+        Makes n_track the current track, and starts it if it is not open. 
+        The track that was current is kept open, so several tracks can be 
+        written at the same time. Each open track has its own time. The 
+        tracks are written to the file in the order their end_of_track is 
+        called.
+        >>> midi_out = MidiOutFile()
+        >>> midi_out.select_track(1)
+        >>> midi_out.update_time(96)
+        >>> midi_out.note_on(0, 64, 100)
+        >>> midi_out.select_track(2)
+        >>> midi_out.update_time(48)
+        >>> midi_out.note_on(1, 60, 100)
+        >>> midi_out.select_track(1)
+        >>> midi_out.update_time(144, relative=False)
+        >>> midi_out.note_off(0, 64, 0)
+        >>> list(midi_out._current_track_buffer)
+        [96, 144, 64, 100, 48, 128, 64, 0]
+        """
+        if n_track == self._selected_track:
+            return
+        open_tracks = self._open_tracks
+        if self._selected_track is not None:
+            open_tracks[self._selected_track] = (self._current_track_buffer,
+                self._absolute_time, self._track_sink, self._last_status)
+            del self._current_track_buffer
+        if n_track in open_tracks:
+            (self._current_track_buffer, self._absolute_time,
+             self._track_sink, self._last_status) = open_tracks.pop(n_track)
+            self._relative_time = 0
+            self._selected_track = n_track
+        else:
+            MidiOutFile.start_of_track(self, n_track)
+
+
+    def _open_sinks(self):
+        "The track sinks of the tracks that are open but not current"
+        return [track[2] for track in self._open_tracks.values()]
+
+
+    def _check_direct_track(self):
+        """
+        Raises a ValueError if a track is being written directly to the file, 
+        as nothing else can be written to it until that track ends.
+        """
+        if isinstance(self._track_sink, _DirectTrack) or any(
+                isinstance(sink, _DirectTrack) for sink in self._open_sinks()):
+            raise ValueError('A track that is written directly to the file must end first')
+
+
+    def _end_track(self):
+        "Ends the current track. Returns its data, with the end of track event."
+        track_data = self._current_track_buffer
+        track_data += bytes(writeVar(self.rel_time()))
+        track_data += _END_OF_TRACK
+        del self._current_track_buffer
+        self._selected_track = None
+        return track_data
 
 
     def end_of_track(self):
@@ -305,19 +699,34 @@ class MidiOutFile(MidiEvents):
         >>> bytes(r[:4]), readBew(r[4:8]), r[8:12], r[12:16]
         (b'MTrk', 8, [0, 144, 64, 64], [0, 255, 47, 0])
         """
+        sink = self._track_sink
+        if not isinstance(sink, _DirectTrack):
+            self._check_direct_track()
+        if sink is None:
+            self.write_track_chunk(self._end_track())
+            return
+        self._track_sink = None
+        sink.write(self._end_track())
+        sink.close(self.raw_out)
+
+
+    def write_track_chunk(self, track_data):
+        """
+        Writes a track chunk with events that are already encoded, eg. in 
+        bulk. track_data must end with an end of track event.
+        >>> midi_out = MidiOutFile()
+        >>> midi_out.write_track_chunk(bytes([0, 0x90, 64, 64, 0, 0xFF, 0x2F, 0]))
+        >>> list(midi_out.read_all())
+        [77, 84, 114, 107, 0, 0, 0, 8, 0, 144, 64, 64, 0, 255, 47, 0]
+        """
+        self._check_direct_track()
+        _check_chunk_size(len(track_data))
+        if self.validate:
+            validate_track(track_data)
         raw = self.raw_out
         raw.writeSlice(c.TRACK_HEADER)
-        # track_data = self._current_track_buffer.getvalue()
-        track_data = self._current_track_buffer.read_all()
-        eot_slice = bytes(writeVar(self.rel_time())) + bytes([c.META_EVENT, c.END_OF_TRACK, 0])
-        # wee need to know size of track data.
-        track_length = len(track_data)+len(eot_slice)
-        raw.writeBew(track_length, 4)
-        # then write
+        raw.writeBew(len(track_data), 4)
         raw.writeSlice(track_data)
-        raw.writeSlice(eot_slice)
-        self._current_track_buffer.close()
-        del self._current_track_buffer
         
 
 
@@ -344,7 +753,7 @@ class MidiOutFile(MidiEvents):
         >>> midi_out = MidiOutFile()
         >>> midi_out.start_of_track()
         >>> midi_out.text(b'1234')
-        >>> r = midi_out._current_track_buffer.read_all()
+        >>> r = midi_out._current_track_buffer
         >>> list(r)
         [0, 255, 1, 4, 49, 50, 51, 52]
         """
@@ -441,9 +850,9 @@ class MidiOutFile(MidiEvents):
         >>> midi_out.midi_port(4)
         >>> midi_out.end_of_track()
         >>> list(midi_out.read_all())
-        [77, 84, 114, 107, 0, 0, 0, 9, 0, 255, 32, 1, 4, 0, 255, 47, 0]
+        [77, 84, 114, 107, 0, 0, 0, 9, 0, 255, 33, 1, 4, 0, 255, 47, 0]
         """
-        self.meta_slice(c.MIDI_CH_PREFIX, bytes([value]))
+        self.meta_slice(c.MIDI_PORT, bytes([value]))
 
 
     def tempo(self, value):
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+
+"""
+An in-memory model of a midi file. A MidiSequence is an event handler that
+the parser fills with the events of a file, and it can be iterated, sliced
+by time and written back through a MidiOutFile.
+
+The events are stored packed in a few arrays per track, instead of an
+object per event. That is 11 bytes for a channel event, plus the data of
+meta and sysex events, so many files can be held in memory at once.
+
+>>> from mxm.midifile import testdir
+>>> sequence = MidiSequence.from_file(testdir('midifiles/minimal.mid'))
+>>> sequence.format, sequence.division, len(sequence.tracks), len(sequence)
+(1, 15360, 2, 9)
+>>> for event in sequence.tracks[1]:
+...     print(event)
+(1, 0, 'sequence_name', (b'Synth 1',))
+(1, 0, 'instrument_name', (b'Synth 1',))
+(1, 0, 'midi_port', (4,))
+(1, 0, 'note_on', (0, 36, 127))
+(1, 61440, 'note_off', (0, 36, 0))
+(1, 6144000, 'end_of_track', ())
+
+Only the events in a range of ticks
+>>> [event[2] for event in sequence.slice(1, 100000)]
+['end_of_track', 'note_off', 'end_of_track']
+
+Written back to a file
+>>> from mxm.midifile import MidiOutFile
+>>> midi_out = MidiOutFile()
+>>> sequence.replay(midi_out)
+>>> with open(testdir('midifiles/minimal.mid'), 'rb') as f:
+...     midi_out.read_all() == f.read()
+True
+"""
+
+# standard library imports
+from array import array
+from bisect import bisect_left
+
+# custom import
+from mxm.midifile.src import constants as c
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser, default_dispatcher
+from mxm.midifile.src.event_dispatcher import EventDispatcher, DATA_SIZES
+from mxm.midifile.src.event_iterator import EventCollector
+
+
+# the status as bytes, to save creating them for each event
+_STATUS_BYTES = [bytes((status,)) for status in range(256)]
+
+# the events with their data in the payload: meta, sysex and sysex escapes
+_PAYLOAD_STATUS = frozenset((c.META_EVENT, c.SYSTEM_EXCLUSIVE, c.END_OFF_EXCLUSIVE))
+
+
+class MidiTrack:
+
+    """
+    The events of a track. Each event is stored as its absolute tick in
+    'ticks', and 3 bytes in 'events': the status and 2 data bytes. Channel
+    events with one data byte are padded with a 0. Meta events has the
+    meta type as the first data byte. The data of meta and sysex events
+    is stored in 'payload', with the index of the event in
+    'payload_events' and the end of its data in 'payload_ends'. Sysex
+    events keep their status, 0xF0 or 0xF7 for an escape, and their data
+    as it is in the file, with the terminating 0xF7 if there is one.
+    Iterating gives the events as (track, tick, type, data), like iter_events.
+    """
+
+    __slots__ = ('number', 'ticks', 'events', 'payload', 'payload_events', 'payload_ends')
+
+    def __init__(self, number=0):
+        self.number = number
+        self.ticks = array('q')
+        self.events = bytearray()
+        self.payload = bytearray()
+        self.payload_events = array('I')
+        self.payload_ends = array('I')
+
+
+    def __len__(self):
+        return len(self.ticks)
+
+
+    def __iter__(self):
+        collector = EventCollector()
+        events = collector.events
+        for _ in self._replay(default_dispatcher(collector)):
+            if events:
+                yield from events
+                del events[:]
+
+
+    def raw_event(self, index):
+        """
+        Returns the event at index as (tick, status, data). data is the
+        data bytes after the status, or the data of meta and sysex events.
+        Meta events has the meta type first.
+        """
+        status, data1, data2 = self.events[3*index:3*index+3]
+        if status == c.META_EVENT:
+            return self.ticks[index], status, bytes((data1,)) + self.event_data(index)
+        if status in _PAYLOAD_STATUS:
+            return self.ticks[index], status, self.event_data(index)
+        return self.ticks[index], status, bytes((data1, data2))[:DATA_SIZES[status]]
+
+
+    def event_data(self, index):
+        "Returns the data of the meta or sysex event at index"
+        k = bisect_left(self.payload_events, index)
+        if k == len(self.payload_events) or self.payload_events[k] != index:
+            raise ValueError('The event at %s is not a meta or sysex event' % index)
+        start = self.payload_ends[k-1] if k else 0
+        return bytes(self.payload[start:self.payload_ends[k]])
+
+
+    def append_raw(self, tick, status, data):
+        "Appends an event as returned by raw_event"
+        ticks = self.ticks
+        if status in _PAYLOAD_STATUS:
+            self.payload_events.append(len(ticks))
+            if status == c.META_EVENT:
+                self.events += bytes((status, data[0], 0))
+                data = data[1:]
+            else:
+                self.events += bytes((status, 0, 0))
+            self.payload += data
+            self.payload_ends.append(len(self.payload))
+        else:
+            self.events += bytes((status,)) + bytes(data) + bytes(2 - len(data))
+        ticks.append(tick)
+
+
+    def slice(self, start=0, end=None):
+        """
+        Returns a new track with the events from tick start and up to, but
+        not including, tick end. The ticks are not changed. If the end of
+        track is cut off, a new one is added at the end of the range.
+        """
+        ticks = self.ticks
+        first = bisect_left(ticks, start)
+        last = len(ticks) if end is None else bisect_left(ticks, end)
+        # the columns are sliced as they are, without decoding the events
+        track = MidiTrack(self.number)
+        track.ticks = ticks[first:last]
+        track.events = self.events[3*first:3*last]
+        payload_events = self.payload_events
+        payload_ends = self.payload_ends
+        k_first = bisect_left(payload_events, first)
+        k_last = bisect_left(payload_events, last)
+        payload_start = payload_ends[k_first-1] if k_first else 0
+        payload_end = payload_ends[k_last-1] if k_last else 0
+        track.payload = self.payload[payload_start:payload_end]
+        track.payload_events = array('I', [i - first for i in payload_events[k_first:k_last]])
+        track.payload_ends = array('I', [end - payload_start for end in payload_ends[k_first:k_last]])
+        if track.events[-3:-1] != bytes((c.META_EVENT, c.END_OF_TRACK)):
+            end_tick = ticks[-1] if ticks else 0
+            if end is not None:
+                end_tick = min(end, end_tick)
+            track.append_raw(max(end_tick, start), c.META_EVENT, bytes([c.END_OF_TRACK]))
+        return track
+
+
+    def replay(self, dispatch):
+        "Triggers the events of the track on dispatch, like the parser does"
+        for _ in self._replay(dispatch):
+            pass
+
+
+    def _replay(self, dispatch):
+        "Generator that triggers the events one at a time"
+        dispatch.reset_time()
+        dispatch.start_of_track(self.number)
+        running_status_events = dispatch.running_status_events
+        status_table = dispatch.status_table
+        meta_table = dispatch.meta_table
+        events = self.events
+        payload = self.payload
+        payload_ends = self.payload_ends
+        k = 0 # the next meta or sysex event
+        payload_start = 0
+        dispatched_tick = 0
+        for i, tick in enumerate(self.ticks):
+            position = 3*i
+            status = events[position]
+            if running_status_events:
+                dispatch.set_running_status(status)
+                if status >= 0xF0:
+                    dispatch.reset_running_status()
+            if status in _PAYLOAD_STATUS:
+                payload_end = payload_ends[k]
+                data = bytes(payload[payload_start:payload_end])
+                payload_start = payload_end
+                k += 1
+                if status == c.META_EVENT:
+                    handler = meta_table[events[position+1]]
+                    if handler is not None:
+                        handler(tick - dispatched_tick, tick, data)
+                        dispatched_tick = tick
+                else:
+                    handler = status_table[status][1]
+                    if handler is not None:
+                        handler(tick - dispatched_tick, tick, status, data, False)
+                        dispatched_tick = tick
+            else:
+                data_size, handler = status_table[status]
+                if handler is not None:
+                    handler(tick - dispatched_tick, tick, status,
+                            bytes(events[position+1:position+1+data_size]), False)
+                    dispatched_tick = tick
+            yield
+
+
+class SequenceDispatcher(EventDispatcher):
+
+    """
+    Stores the raw events directly in the current track of a MidiSequence,
+    without decoding them.
+    """
+
+    running_status_events = False
+    skip_unused_events = False
+    passthrough_raw_events = False
+
+    def build_tables(self):
+        # the columns of the current track
+        self._current = current = [None] * 5
+        status_bytes = _STATUS_BYTES
+
+        def _event_0(delta, tick, status, data, use_running_status):
+            current[0].append(tick)
+            current[1].extend(status_bytes[status] + b'\x00\x00')
+
+        def _event_1(delta, tick, status, data, use_running_status):
+            current[0].append(tick)
+            current[1].extend(status_bytes[status] + data + b'\x00')
+
+        def _event_2(delta, tick, status, data, use_running_status):
+            current[0].append(tick)
+            current[1].extend(status_bytes[status] + data)
+
+        def _payload_event(tick, event, data):
+            ticks, events, payload, payload_events, payload_ends = current
+            payload_events.append(len(ticks))
+            ticks.append(tick)
+            events.extend(event)
+            payload.extend(data)
+            payload_ends.append(len(payload))
+
+        def _sysex(delta, tick, status, data, use_running_status):
+            _payload_event(tick, status_bytes[status] + b'\x00\x00', data)
+
+        def _meta_event(meta_type):
+            event = bytes((c.META_EVENT, meta_type, 0))
+            def _meta(delta, tick, data):
+                _payload_event(tick, event, data)
+            return _meta
+
+        events = {0: _event_0, 1: _event_1, 2: _event_2}
+        self.status_table = [(data_size, events.get(data_size)) for data_size in DATA_SIZES]
+        # sysex, and sysex escapes
+        self.status_table[c.SYSTEM_EXCLUSIVE] = (None, _sysex)
+        self.status_table[c.END_OFF_EXCLUSIVE] = (None, _sysex)
+        self.meta_table = [_meta_event(meta_type) for meta_type in range(256)]
+
+
+    def start_of_track(self, current_track):
+        "Starts a new track in the sequence"
+        EventDispatcher.start_of_track(self, current_track)
+        track = self.event_handler.tracks[-1]
+        self._current[:] = (track.ticks, track.events, track.payload,
+                            track.payload_events, track.payload_ends)
+
+    # the time is given with each event
+
+    def update_time(self, new_time=0, relative=1):
+        pass
+
+    def reset_time(self):
+        pass
+
+
+class MidiSequence:
+
+    """
+    A parsed midi file in memory. Use it as the event handler for a
+    MidiInFile, or MidiSequence.from_file(). 'tracks' is a list of
+    MidiTrack's. Iterating gives the events of all the tracks as
+    (track, tick, type, data), like iter_events. replay() triggers the
+    events on another event handler, like a MidiOutFile.
+    The running status is not kept, so a file that uses it is written
+    back a bit larger.
+    """
+
+    __slots__ = ('format', 'division', 'tracks')
+
+    event_dispatcher = SequenceDispatcher
+
+    def __init__(self, format=1, division=96):
+        self.format = format
+        self.division = division
+        self.tracks = []
+
+
+    @classmethod
+    def from_file(cls, infile, tracks=None, include=None, exclude=None):
+        """
+        Reads infile, a path, a file object or a buffer, into a new sequence.
+        tracks, include and exclude works as for MidiInFile.
+        """
+        sequence = cls()
+        parser = MidiFileParser(RawInstreamFile(infile), sequence, include=include, exclude=exclude)
+        parser.parseMThdChunk()
+        parser.parseMTrkChunks(tracks=tracks)
+        return sequence
+
+
+    # the event handler methods that the parser calls
+
+    def header(self, format=0, nTracks=1, division=96):
+        self.format = format
+        self.division = division
+
+    def set_current_track(self, new_track):
+        pass
+
+    def start_of_track(self, n_track=0):
+        self.tracks.append(MidiTrack(n_track))
+
+    def eof(self):
+        pass
+
+
+    def __len__(self):
+        return sum(len(track) for track in self.tracks)
+
+
+    def __iter__(self):
+        for track in self.tracks:
+            yield from track
+
+
+    def slice(self, start=0, end=None):
+        "Returns a new sequence with the events from tick start up to tick end"
+        sequence = MidiSequence(self.format, self.division)
+        sequence.tracks = [track.slice(start, end) for track in self.tracks]
+        return sequence
+
+
+    def replay(self, event_handler):
+        """
+        Triggers the events on event_handler, exactly as parsing the file
+        would. The header first, then the tracks, and eof.
+        """
+        dispatch = default_dispatcher(event_handler)
+        dispatch.header(self.format, len(self.tracks), self.division)
+        for track in self.tracks:
+            track.replay(dispatch)
+        dispatch.eof()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
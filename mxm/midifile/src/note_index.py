@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+An index over the Notes from note pairing, for finding the notes that sound
+at a time, or in a window of time, without scanning all the notes.
+
+A note sounds from its start and up to, but not including, its end. The
+notes are sorted by start, and a tree over them holds the latest end in
+each subtree. A query only visits the subtrees that can hold a matching
+note, so it takes logarithmic time plus the number of notes found.
+
+>>> from mxm.midifile.src.note_pairing import Note
+>>> notes = [Note(0, 96, 60, 100, 0, 0), Note(48, 96, 64, 100, 0, 0),
+...          Note(96, 192, 67, 100, 0, 0)]
+>>> index = NoteIndex(notes)
+>>> [note.note for note in index.at(50)]
+[60, 64]
+>>> [note.note for note in index.at(96)]
+[67]
+>>> [note.note for note in index.overlapping(90, 100)]
+[60, 64, 67]
+
+Many times at once
+>>> [[note.note for note in found] for found in index.at_many([0, 50, 200])]
+[[60], [60, 64], []]
+>>> index.count_at([0, 50, 200]).tolist()
+[1, 2, 0]
+
+With a TempoMap the queries can be in seconds
+>>> from mxm.midifile.src.tempo_map import TempoMap
+>>> index = NoteIndex(notes, TempoMap(division=96))
+>>> [note.note for note in index.at_seconds(0.75)]
+[67]
+"""
+
+# standard library imports
+from array import array
+from bisect import bisect_left, bisect_right
+from heapq import heappush, heappop
+
+# optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# custom import
+from mxm.midifile.src.note_pairing import Note, NotePairer
+from mxm.midifile.src.midi_infile import MidiInFile
+from mxm.midifile.src.tempo_map import TempoMap
+
+
+class NoteIndex:
+
+    """
+    An index over notes, a sequence of Notes like the notes of a
+    NotePairer, or a NoteColumns. The queries returns the Notes ordered by
+    start. tempo_map is a TempoMap for the queries in seconds.
+    """
+
+    def __init__(self, notes, tempo_map=None):
+        self.notes = notes = sorted(Note(*note) for note in notes)
+        self.tempo_map = tempo_map
+        self._starts = array('q', [note.start for note in notes])
+        self._ends = array('q', [note.end for note in notes])
+        self._sorted_ends = array('q', sorted(self._ends))
+        # the tree is a heap, with the latest end of each subtree. The
+        # leaves are the notes, padded to a power of 2.
+        size = 1
+        while size < len(notes):
+            size *= 2
+        tree = [float('-inf')] * (2 * size)
+        tree[size:size + len(notes)] = self._ends
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2*node], tree[2*node+1])
+        self._size = size
+        self._tree = tree
+
+
+    @classmethod
+    def from_file(cls, infile, policy='fifo', with_tempo_map=True):
+        """
+        Pairs the notes in infile and indexes them. With with_tempo_map,
+        the queries in seconds use the tempo of the file.
+        """
+        if hasattr(infile, 'read'):
+            # it is read twice
+            infile = infile.read()
+        pairer = NotePairer(policy=policy)
+        midi_in = MidiInFile(pairer, infile)
+        try:
+            midi_in.read()
+        finally:
+            midi_in.close()
+        tempo_map = None
+        if with_tempo_map:
+            tempo_map = TempoMap.from_file(infile)
+        return cls(pairer.notes, tempo_map)
+
+
+    def __len__(self):
+        return len(self.notes)
+
+
+    def _search(self, last, after):
+        "Indexes of the notes before last that ends after 'after'"
+        found = []
+        tree = self._tree
+        # (node, first leaf, number of leaves)
+        stack = [(1, 0, self._size)]
+        while stack:
+            node, first, width = stack.pop()
+            if first >= last or tree[node] <= after:
+                continue
+            if width == 1:
+                found.append(first)
+                continue
+            width //= 2
+            # the left subtree is searched first, so the notes stay in order
+            stack.append((2*node+1, first + width, width))
+            stack.append((2*node, first, width))
+        return found
+
+
+    def at(self, tick):
+        "Returns the notes that sound at tick"
+        notes = self.notes
+        return [notes[i] for i in self._search(bisect_right(self._starts, tick), tick)]
+
+
+    def overlapping(self, start, end):
+        "Returns the notes that sound somewhere from start and up to end"
+        notes = self.notes
+        return [notes[i] for i in self._search(bisect_left(self._starts, end), start)]
+
+
+    def at_many(self, ticks):
+        """
+        Returns a list with the notes that sound at each of the ticks. The
+        ticks are sorted and swept over the notes in one pass, which is
+        faster than a query per tick when there are many.
+        """
+        notes = self.notes
+        starts = self._starts
+        order = sorted(range(len(ticks)), key=ticks.__getitem__)
+        result = [None] * len(ticks)
+        sounding = set()
+        # the sounding notes ordered by end, to remove the ended ones
+        by_end = []
+        next_note = 0
+        for k in order:
+            tick = ticks[k]
+            while next_note < len(notes) and starts[next_note] <= tick:
+                heappush(by_end, (self._ends[next_note], next_note))
+                sounding.add(next_note)
+                next_note += 1
+            while by_end and by_end[0][0] <= tick:
+                sounding.discard(heappop(by_end)[1])
+            result[k] = [notes[i] for i in sorted(sounding)]
+        return result
+
+
+    def count_at(self, ticks):
+        """
+        Returns the number of notes that sound at each of the ticks, as a
+        numpy array, or an array.array without numpy.
+        """
+        if np is None:
+            return array('q', [bisect_right(self._starts, tick) - bisect_right(self._sorted_ends, tick)
+                               for tick in ticks])
+        ticks = np.asarray(ticks)
+        return (np.searchsorted(self._starts, ticks, side='right')
+                - np.searchsorted(self._sorted_ends, ticks, side='right'))
+
+
+    # the same in seconds
+
+    def at_seconds(self, seconds):
+        "Returns the notes that sound at the time in seconds"
+        return self.at(self.tempo_map.ticks(seconds))
+
+
+    def overlapping_seconds(self, start, end):
+        "Returns the notes that sound somewhere from start and up to end seconds"
+        tempo_map = self.tempo_map
+        return self.overlapping(tempo_map.ticks(start), tempo_map.ticks(end))
+
+
+    def at_many_seconds(self, seconds):
+        "Returns a list with the notes that sound at each of the times in seconds"
+        return self.at_many(list(self.tempo_map.ticks_array(seconds)))
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pairs the note_on and note_off events into notes with a duration. It is done
+in a single pass, and only the notes that are sounding are kept, so the
+memory used does not depend on the length of the file.
+
+>>> from mxm.midifile import MidiInFile, testdir
+>>> pairer = NotePairer()
+>>> MidiInFile(pairer, testdir('midifiles/minimal.mid')).read()
+>>> pairer.notes
+[Note(start=0, end=61440, note=36, velocity=127, channel=0, track=1)]
+
+The same from a stream of events, like iter_events or a MidiSequence
+>>> from mxm.midifile import iter_events
+>>> list(iter_notes(iter_events(testdir('midifiles/minimal.mid'))))
+[Note(start=0, end=61440, note=36, velocity=127, channel=0, track=1)]
+
+A note_on with a velocity of 0 is a note_off. When the same note is played
+again before it has ended, policy says which note_off ends which note_on.
+'fifo' ends the first one, 'lifo' the last one.
+>>> events = [(0, 0, 'note_on', (0, 60, 100)), (0, 10, 'note_on', (0, 60, 90)),
+...           (0, 20, 'note_on', (0, 60, 0)), (0, 30, 'note_off', (0, 60, 0))]
+>>> [(n.start, n.end, n.velocity) for n in iter_notes(events, policy='fifo')]
+[(0, 20, 100), (10, 30, 90)]
+>>> [(n.start, n.end, n.velocity) for n in iter_notes(events, policy='lifo')]
+[(10, 20, 90), (0, 30, 100)]
+
+Notes that are still sounding at the end of the track are ended there, or
+dropped with hanging='drop'
+>>> events = [(0, 0, 'note_on', (0, 60, 100)), (0, 96, 'end_of_track', ())]
+>>> list(iter_notes(events))
+[Note(start=0, end=96, note=60, velocity=100, channel=0, track=0)]
+>>> list(iter_notes(events, hanging='drop'))
+[]
+"""
+
+# standard library imports
+from array import array
+from collections import namedtuple
+
+# optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# custom import
+from mxm.midifile.src.timed_events import TimedMidiEvents
+
+
+# A note with a duration. start and end are ticks.
+Note = namedtuple('Note', 'start end note velocity channel track')
+
+
+class NotePairer(TimedMidiEvents):
+
+    """
+    An event handler that pairs note_on and note_off events into Notes.
+    The notes are passed to emit as they end, so they are ordered by their
+    end. By default they are appended to the 'notes' list.
+
+    policy: 'fifo' or 'lifo', for notes that are played again while they
+        are sounding.
+    hanging: 'close' ends notes that are still sounding at the end of the
+        track, 'drop' leaves them out.
+    emit: called with each Note, eg. the append of a NoteColumns.
+    """
+
+    def __init__(self, policy='fifo', hanging='close', emit=None):
+        TimedMidiEvents.__init__(self)
+        if policy not in ('fifo', 'lifo'):
+            raise ValueError("policy must be 'fifo' or 'lifo'. Was: %r" % (policy,))
+        if hanging not in ('close', 'drop'):
+            raise ValueError("hanging must be 'close' or 'drop'. Was: %r" % (hanging,))
+        self.policy = policy
+        self.hanging = hanging
+        if emit is None:
+            self.notes = []
+            emit = self.notes.append
+        self.emit = emit
+        # (track, channel, note): [(start, velocity), ...] for sounding notes
+        self._sounding = {}
+        # note_offs without a sounding note
+        self.unmatched = 0
+
+
+    def note_on(self, tick, channel, note, velocity):
+        if not velocity:
+            self.note_off(tick, channel, note, velocity)
+            return
+        key = (self._current_track, channel, note)
+        sounding = self._sounding.get(key)
+        if sounding is None:
+            self._sounding[key] = [(tick, velocity)]
+        else:
+            sounding.append((tick, velocity))
+
+
+    def note_off(self, tick, channel, note, velocity):
+        track = self._current_track
+        key = (track, channel, note)
+        sounding = self._sounding.get(key)
+        if not sounding:
+            self.unmatched += 1
+            return
+        start, on_velocity = sounding.pop(0 if self.policy == 'fifo' else -1)
+        if not sounding:
+            del self._sounding[key]
+        self.emit(Note(start, tick, note, on_velocity, channel, track))
+
+
+    def end_of_track(self, tick):
+        "Ends or drops the notes of the track that are still sounding"
+        track = self._current_track
+        hanging = [key for key in self._sounding if key[0] == track]
+        hanging.sort(key=lambda key: self._sounding[key][0])
+        for key in hanging:
+            for start, velocity in self._sounding.pop(key):
+                if self.hanging == 'close':
+                    self.emit(Note(start, tick, key[2], velocity, key[1], track))
+
+
+    def eof(self):
+        "Notes in tracks without an end of track are dropped"
+        self._sounding.clear()
+
+
+def iter_notes(events, policy='fifo', hanging='close'):
+    """
+    Generator that pairs the notes in a stream of (track, tick, type, data)
+    events, like those from iter_events or a MidiSequence, and yields each
+    Note as soon as it ends.
+    """
+    ended = []
+    pairer = NotePairer(policy=policy, hanging=hanging, emit=ended.append)
+    for track, tick, name, data in events:
+        if name in ('note_on', 'note_off', 'end_of_track'):
+            pairer.set_current_track(track)
+            getattr(pairer, name)(tick, *data)
+            if ended:
+                yield from ended
+                del ended[:]
+
+
+class NoteColumns:
+
+    """
+    Collects Notes in array columns instead of a list of tuples. Use its
+    append as the emit of a NotePairer.
+    >>> columns = NoteColumns()
+    >>> pairer = NotePairer(emit=columns.append)
+    >>> pairer.note_on(0, 0, 60, 100)
+    >>> pairer.note_off(96, 0, 60, 0)
+    >>> columns.start, columns.end
+    (array('q', [0]), array('q', [96]))
+    >>> columns[0]
+    Note(start=0, end=96, note=60, velocity=100, channel=0, track=0)
+    """
+
+    fields = Note._fields
+
+    def __init__(self):
+        self.start = array('q')
+        self.end = array('q')
+        self.note = array('B')
+        self.velocity = array('B')
+        self.channel = array('B')
+        self.track = array('H')
+
+
+    def append(self, note):
+        self.start.append(note.start)
+        self.end.append(note.end)
+        self.note.append(note.note)
+        self.velocity.append(note.velocity)
+        self.channel.append(note.channel)
+        self.track.append(note.track)
+
+
+    def __len__(self):
+        return len(self.start)
+
+
+    def __getitem__(self, index):
+        return Note(*[getattr(self, field)[index] for field in self.fields])
+
+
+    def to_numpy(self):
+        "Returns the notes as a numpy structured array"
+        table = np.zeros(len(self), dtype=[
+            ('start', '<i8'), ('end', '<i8'), ('note', 'u1'),
+            ('velocity', 'u1'), ('channel', 'u1'), ('track', '<u2')])
+        for field in self.fields:
+            table[field] = getattr(self, field)
+        return table
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parses the tracks of a midi file in parallel in a pool of worker processes.
+
+There are two ways to use the workers.
+
+With read_parallel the events goes to a single event handler in the main
+process. Event handlers can not be shared between processes, so each worker
+parses its track chunk into a compact list of the raw events, with the delta
+time, status byte and data already decoded. Only the events the handler
+uses are recorded, the rest are skipped in the worker, just as the
+sequential parser skips them. The events are then dispatched to the real
+event handler in track order by the main process. The handler gets exactly
+the same calls, in the same order, as it would have from the sequential
+parser. The calls to the event handler still happen one at a time in the
+main process, so the gain is largest when the handler uses few of the events.
+
+With map_tracks each worker gets its own event handler from a factory, and
+parses its tracks into it. Only the results come back to the main process,
+so all the work is done in the workers, and it scales with the number of
+cores.
+
+>>> from mxm.midifile import testdir
+>>> map_tracks(testdir('midifiles/minimal.mid'), NoteCounter, collect=notes_counted, processes=0)
+[0, 1]
+"""
+
+# standard library imports
+import multiprocessing
+
+# custom import
+from mxm.midifile.src import constants as c
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.event_dispatcher import EventDispatcher, DATA_SIZES
+from mxm.midifile.src.midi_events import MidiEvents
+
+
+class EventRecorder:
+
+    """
+    An event handler that records every call made to it. Mainly useful for
+    comparing event streams and for debugging.
+    >>> from mxm.midifile import MidiToCode
+    >>> recorder = EventRecorder()
+    >>> recorder.update_time(new_time=96)
+    >>> recorder.note_on(0, 64, 100, False)
+    >>> recorder.events
+    [('update_time', (), {'new_time': 96}), ('note_on', (0, 64, 100, False), None)]
+    >>> recorder.replay(MidiToCode())
+    midi_out.update_time(new_time=96)
+    midi_out.note_on(channel=0, note=64, velocity=100)
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        append = self.events.append
+        def record(*args, **kwargs):
+            append((name, args, kwargs or None))
+        return record
+
+    def replay(self, event_handler):
+        "Calls the recorded events on event_handler"
+        for name, args, kwargs in self.events:
+            if kwargs:
+                getattr(event_handler, name)(*args, **kwargs)
+            else:
+                getattr(event_handler, name)(*args)
+
+
+class TrackRecordingDispatcher(EventDispatcher):
+
+    """
+    A dispatcher that does not trigger any events, but records the raw
+    events of a track in a flat list, that is cheap to send between processes:
+
+        delta_time, status, use_running_status, data
+
+    and for meta events:
+
+        delta_time, 0xFF, False, meta_type, data
+
+    status_mask and meta_mask are bytes with a 0 for each status byte and 
+    meta type that should not be recorded. The time of a skipped event is 
+    added to the delta time of the next recorded event.
+    """
+
+    # the running status is given by the recorded events
+    running_status_events = False
+
+    def __init__(self, status_mask=None, meta_mask=None):
+        self.events = []
+        self.status_mask = status_mask
+        self.meta_mask = meta_mask
+        EventDispatcher.__init__(self, None)
+
+    def build_tables(self):
+        extend = self.events.extend
+        def record(delta, tick, status, data, use_running_status=False):
+            extend((delta, status, use_running_status, bytes(data)))
+        def record_meta(meta_type):
+            def _record_meta(delta, tick, data):
+                extend((delta, c.META_EVENT, False, meta_type, bytes(data)))
+            return _record_meta
+        status_mask = self.status_mask or bytes([1]) * 256
+        meta_mask = self.meta_mask or bytes([1]) * 256
+        self.status_table = [(data_size, record if status_mask[status] else None)
+                             for status, data_size in enumerate(DATA_SIZES)]
+        self.meta_table = [record_meta(meta_type) if meta_mask[meta_type] else None
+                           for meta_type in range(256)]
+
+    # the time and track events are given by the recorded events too, so
+    # they are triggered when the events are dispatched.
+
+    def reset_time(self):
+        pass
+
+    def start_of_track(self, current_track):
+        pass
+
+
+def dispatch_masks(dispatch):
+    """
+    Returns (status_mask, meta_mask) for a TrackRecordingDispatcher, so it 
+    only records the events that dispatch does something with. If dispatch 
+    follows the running status, all the channel events are needed for it.
+    """
+    if dispatch.running_status_events:
+        return None, None
+    status_mask = bytes(handler is not None for data_size, handler in dispatch.status_table)
+    meta_mask = bytes(handler is not None for handler in dispatch.meta_table)
+    return status_mask, meta_mask
+
+
+def parse_track_chunk(job):
+    """
+    Parses a single track chunk. Runs in the worker processes.
+    job is (chunk_data, status_mask, meta_mask). chunk_data is the complete 
+    chunk including the header, and the masks are from dispatch_masks.
+    Returns (events, exception). If parsing fails, the events up to the
+    error are returned along with the exception.
+    """
+    chunk_data, status_mask, meta_mask = job
+    dispatch = TrackRecordingDispatcher(status_mask, meta_mask)
+    parser = MidiFileParser(RawInstreamFile(chunk_data), None, dispatch=dispatch)
+    parser._current_track = 0
+    try:
+        parser.parseMTrkChunk()
+    except Exception as e:
+        return dispatch.events, e
+    return dispatch.events, None
+
+
+def dispatch_track_events(dispatch, track, events):
+    """
+    Triggers the events recorded by TrackRecordingDispatcher on the
+    dispatcher, in the same order as the parser does.
+    """
+    dispatch.reset_time()
+    dispatch.start_of_track(track)
+    running_status_events = dispatch.running_status_events
+    set_running_status = dispatch.set_running_status
+    reset_running_status = dispatch.reset_running_status
+    status_table = dispatch.status_table
+    meta_table = dispatch.meta_table
+    tick = 0
+    dispatched_tick = 0
+    events = iter(events)
+    for delta_time in events:
+        status = next(events)
+        use_running_status = next(events)
+        tick += delta_time
+        if running_status_events:
+            if not use_running_status:
+                set_running_status(status)
+            if status >= 0xF0:
+                reset_running_status()
+        if status == c.META_EVENT:
+            handler = meta_table[next(events)]
+            if handler is not None:
+                handler(tick - dispatched_tick, tick, next(events))
+                dispatched_tick = tick
+            else:
+                next(events)
+        else:
+            handler = status_table[status][1]
+            if handler is not None:
+                handler(tick - dispatched_tick, tick, status, next(events), use_running_status)
+                dispatched_tick = tick
+            else:
+                next(events)
+
+
+def _track_jobs(parser, tracks):
+    "The chunks of the tracks, and the data of each chunk for the workers"
+    data = parser.raw_in.getData()
+    chunks = parser.indexMTrkChunks()
+    if tracks is not None:
+        for t in tracks:
+            if not 0 <= t < len(chunks):
+                raise ValueError('No track number %s in file. There are %s tracks.' % (t, len(chunks)))
+        chunks = [chunk for chunk in chunks if chunk.track in tracks]
+    # only the chunk itself is sent to the worker
+    return chunks, [bytes(data[chunk.offset:chunk.offset + 8 + chunk.length]) for chunk in chunks]
+
+
+def _imap(function, jobs, processes, pool):
+    """
+    Generator of function(job) for the jobs, in order, from the pool. A new 
+    pool with 'processes' workers is made if pool is None, and with 
+    processes=0 the jobs are done in this process.
+    """
+    if processes == 0 and pool is None:
+        for job in jobs:
+            yield function(job)
+        return
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes)
+    try:
+        # imap returns the results in order, so they can be used as soon as
+        # the first track is parsed
+        yield from pool.imap(function, jobs)
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+
+def parse_tracks_parallel(parser, tracks=None, processes=None, pool=None):
+    """
+    Parses the track chunks of a file in a pool of processes and dispatches
+    the events to the parser's event handler in track order.
+    The header must have been parsed already. If tracks is a list of track
+    numbers only those are parsed. Uses pool if given, otherwise a new
+    pool with 'processes' workers is created for the file.
+    """
+    chunks, chunk_data = _track_jobs(parser, tracks)
+    dispatch = parser.dispatch
+    status_mask, meta_mask = dispatch_masks(dispatch)
+    jobs = [(data, status_mask, meta_mask) for data in chunk_data]
+    for chunk, (events, exception) in zip(chunks, _imap(parse_track_chunk, jobs, processes, pool)):
+        dispatch_track_events(dispatch, chunk.track, events)
+        if exception is not None:
+            raise exception
+    dispatch.eof()
+
+
+def map_track_chunk(job):
+    """
+    Parses a single track chunk into a new event handler. Runs in the 
+    worker processes. job is (chunk_data, track, header, handler_factory, 
+    collect, include, exclude). Returns (result, exception).
+    """
+    chunk_data, track, header, handler_factory, collect, include, exclude = job
+    try:
+        handler = handler_factory()
+        parser = MidiFileParser(RawInstreamFile(chunk_data), handler, include=include, exclude=exclude)
+        parser.dispatch.header(*header)
+        parser._current_track = track
+        parser.parseMTrkChunk()
+        parser.dispatch.eof()
+        return (collect(handler) if collect is not None else handler), None
+    except Exception as e:
+        return None, e
+
+
+def map_tracks(infile, handler_factory, collect=None, tracks=None, processes=None, pool=None,
+               include=None, exclude=None):
+    """
+    Parses each track of infile in a worker process, into a new event 
+    handler from handler_factory, and returns a list with the result of 
+    each track, in track order. The handler gets the header, the track and 
+    the eof, as if the file had only that track.
+
+    collect is called with the handler when the track is parsed, and its 
+    return value is the result. If None the handler itself is the result. 
+    handler_factory and collect are sent to the workers, and the results 
+    back, so they must be picklable. See parse_corpus.
+
+    tracks, processes and pool are as for parse_tracks_parallel, but 
+    processes=0 parses the tracks in this process. include and exclude 
+    are event filters, as for MidiInFile.
+    """
+    parser = MidiFileParser(RawInstreamFile(infile), None, dispatch=TrackRecordingDispatcher())
+    parser.readMThdChunk()
+    header = (parser.format, parser.nTracks, parser.division)
+    chunks, chunk_data = _track_jobs(parser, tracks)
+    jobs = [(data, chunk.track, header, handler_factory, collect, include, exclude)
+            for chunk, data in zip(chunks, chunk_data)]
+    results = []
+    for result, exception in _imap(map_track_chunk, jobs, processes, pool):
+        if exception is not None:
+            raise exception
+        results.append(result)
+    return results
+
+
+class NoteCounter(MidiEvents):
+
+    "Counts the note_on events with a velocity. An example handler for map_tracks."
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.notes = 0
+
+    def note_on(self, channel, note, velocity, use_running_status=False):
+        if velocity:
+            self.notes += 1
+
+
+def notes_counted(handler):
+    "A collect function for map_tracks, that returns the number of notes of a NoteCounter"
+    return handler.notes
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
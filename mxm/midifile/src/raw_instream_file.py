@@ -1,9 +1,9 @@
 # -*- coding: utf-8 -*-
 
 # standard library imports
-from mxm.midifile.src.data_type_converters import readBew, readVar, varLen
-
 import os, os.path, sys
+import io, mmap, stat
+
 
 class RawInstreamFile:
 
@@ -21,35 +21,127 @@ class RawInstreamFile:
     b'0123'
     >>> raw_in.nextSlice(length=4)
     b'4567'
+
+    Anything supporting the buffer protocol can be used directly as input
+    >>> RawInstreamFile(bytearray(b'0123456789')).nextSlice(length=4)
+    b'0123'
+
+    With zero_copy the data is never copied. Slices are returned as memoryviews 
+    into the original buffer. A path is memory mapped instead of being read.
+    >>> data = bytearray(b'0123456789')
+    >>> raw_in = RawInstreamFile(data, zero_copy=True)
+    >>> slc = raw_in.nextSlice(length=4)
+    >>> type(slc)
+    <class 'memoryview'>
+    >>> data[0:1] = b'X'
+    >>> bytes(slc)
+    b'X123'
+    >>> slc.release()
+    >>> raw_in.close()
     """
 
-    def __init__(self, infile=''):
+    def __init__(self, infile='', zero_copy=False):
         """
         If 'file' is a string we assume it is a path and read from that file.
         If it is a file descriptor we read from the file, but we don't close it.
+        If it supports the buffer protocol (bytes, bytearray, memoryview, mmap) it 
+        is used as the data.
         Midi files are usually pretty small <50KB, so it should be safe to copy
         them into memory.
+        For the cases where it is not, 'zero_copy' memory maps paths and wraps 
+        buffers in a memoryview. Then all slices are memoryviews too, so neither 
+        the file nor the event data is ever copied.
         """
-        if infile:
-            if isinstance(infile, str):
-                infile = open(infile, 'rb')
-                self.data = infile.read()
-                infile.close()
+        self.zero_copy = zero_copy
+        self._mmap = None
+        if zero_copy:
+            self.data = self._open_zero_copy(infile)
+        elif isinstance(infile, str):
+            if infile:
+                with open(infile, 'rb') as f:
+                    self.data = f.read()
             else:
-                # don't close the f
+                self.data = b''
+        elif infile is None:
+            self.data = b''
+        elif hasattr(infile, 'read'):
+            # don't close the f. Pipes and sockets can not seek
+            if not hasattr(infile, 'seekable') or infile.seekable():
                 infile.seek(0)
-                self.data = infile.read()
+            self.data = infile.read()
         else:
-            self.data = b''
+            self.data = bytes(infile)
         # start at beginning ;-)
         self.setCursor(0)
 
 
-    # # setting up data manually
+    def _open_zero_copy(self, infile):
+        "Returns a byte memoryview of infile without copying it"
+        if isinstance(infile, str) and infile:
+            with open(infile, 'rb') as f:
+                infile = self._map_or_read(f)
+        elif hasattr(infile, 'read'):
+            infile = self._map_or_read(infile)
+        elif not infile:
+            infile = b''
+        return memoryview(infile).cast('B')
+
+
+    def _map_or_read(self, f):
+        "Memory maps f if it is a regular file, otherwise reads it once"
+        if hasattr(f, 'fileno'):
+            try:
+                return self._map_file(f)
+            except (io.UnsupportedOperation, OSError):
+                # not a real file, like a BytesIO, or one that can not be 
+                # mapped, like a pipe
+                pass
+        # Pipes and sockets can not seek
+        if not hasattr(f, 'seekable') or f.seekable():
+            f.seek(0)
+        return f.read()
+
+
+    def _map_file(self, f):
+        "Memory maps a file read only. Empty files cannot be mapped."
+        status = os.fstat(f.fileno())
+        if not stat.S_ISREG(status.st_mode):
+            raise OSError('Only regular files can be memory mapped')
+        if status.st_size == 0:
+            return b''
+        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+
+    def close(self):
+        """
+        Releases the data. If a file was memory mapped it is unmapped, unless
+        there are still memoryview slices alive, then it is unmapped when they are.
+        """
+        data = self.data
+        self.data = b''
+        if isinstance(data, memoryview):
+            data.release()
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+
+    # setting up data manually
     
-    # def setData(self, data=''):
-    #     "Sets the data from a string."
-    #     self.data = data
+    def setData(self, data=b''):
+        """
+        Replaces the data and moves the cursor to the start of it.
+        >>> raw_in = RawInstreamFile(b'0123')
+        >>> raw_in.setData(b'4567')
+        >>> raw_in.nextSlice(length=2)
+        b'45'
+        """
+        self.data = data
+        self.setCursor(0)
     
     # cursor operations
 
@@ -122,8 +214,22 @@ class RawInstreamFile:
         >>> raw_in = RawInstreamFile(f)
         >>> [raw_in.readBew(4) for i in range(4)] + [raw_in.readBew(2)] + [raw_in.readBew(1)]
         [42, 256, 65536, 16777216, 256, 42]
+        >>> raw_in.readBew(2)
+        Traceback (most recent call last):
+        ...
+        ValueError: The data ends in the middle of a 2 byte value at position 19
         """
-        return readBew(self.nextSlice(n_bytes, move_cursor))
+        data = self.data
+        c = self.cursor
+        value = 0
+        try:
+            for i in range(c, c+n_bytes):
+                value = (value << 8) | data[i]
+        except IndexError:
+            raise ValueError('The data ends in the middle of a %s byte value at position %s' % (n_bytes, c)) from None
+        if move_cursor:
+            self.cursor = c + n_bytes
+        return value
 
 
     def readVarLen(self):
@@ -138,12 +244,67 @@ class RawInstreamFile:
         >>> raw_in = RawInstreamFile(f)
         >>> [raw_in.readVarLen() for i in range(4)]
         [268418602, 2080298, 15914, 42]
+
+        A varlen that is not written in the shortest form is still read to the end
+        >>> raw_in = RawInstreamFile(bytes([0x80, 0x00, 42]))
+        >>> raw_in.readVarLen(), raw_in.getCursor()
+        (0, 2)
+
+        Truncated data is an error
+        >>> RawInstreamFile(bytes([0x81, 0x80])).readVarLen()
+        Traceback (most recent call last):
+        ...
+        ValueError: The data ends in the middle of a varlen at position 0
         """
         MAX_VARLEN = 4 # Max value varlen can be
-        var = readVar(self.nextSlice(MAX_VARLEN, 0))
-        # only move cursor the actual bytes in varlen
-        self.moveCursor(varLen(var))
-        return var
+        data = self.data
+        c = self.cursor
+        end = c + MAX_VARLEN
+        value = 0
+        # the value is read directly from the data. No slicing.
+        try:
+            while True:
+                byte = data[c]
+                c += 1
+                value = (value << 7) | (byte & 0x7F)
+                if not byte & 0x80 or c == end:
+                    break
+        except IndexError:
+            raise ValueError('The data ends in the middle of a varlen at position %s' % self.cursor) from None
+        self.cursor = c
+        return value
+
+
+    # fast cursor operations. These read integers directly from the data by index
+
+    def readByte(self):
+        """
+        Reads a single byte as an integer and moves the cursor
+        >>> raw_in = RawInstreamFile(bytes([0x90, 64, 100]))
+        >>> raw_in.readByte(), raw_in.readByte(), raw_in.getCursor()
+        (144, 64, 2)
+        """
+        c = self.cursor
+        self.cursor = c + 1
+        return self.data[c]
+
+
+    def peekByte(self):
+        """
+        Returns the byte at the cursor as an integer, without moving the cursor
+        >>> raw_in = RawInstreamFile(bytes([0x90, 64, 100]))
+        >>> raw_in.peekByte(), raw_in.getCursor()
+        (144, 0)
+        """
+        return self.data[self.cursor]
+
+
+    def getData(self):
+        """
+        Returns the raw data. Time critical code, like the midi parser, can read 
+        it directly by index from the cursor position, and then use setCursor().
+        """
+        return self.data
 
 
 if __name__ == '__main__':
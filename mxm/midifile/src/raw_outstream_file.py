@@ -54,7 +54,9 @@ class RawOutstreamFile:
 
     def writeSlice(self, str_slice):
         "Writes the next text slice to the raw data"
-        self.outfile.write(bytes(str_slice))
+        if not isinstance(str_slice, (bytes, bytearray, memoryview)):
+            str_slice = bytes(str_slice)
+        self.outfile.write(str_slice)
 
     def writeBew(self, value, length=1):
         "Writes a value to the file as big endian word"
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+Rewrites midi files with running status wherever the file format allows
+it, which makes files with many channel events up to a third smaller. The
+events are copied as they are, without being decoded, so the files are
+otherwise unchanged.
+
+>>> from mxm.midifile import MidiOutFile, iter_events
+>>> midi = MidiOutFile()
+>>> midi.header(format=0, nTracks=1, division=96)
+>>> midi.start_of_track()
+>>> for note in range(60, 72):
+...     midi.update_time(10)
+...     midi.note_on(0, note, 100)
+>>> midi.update_time(0)
+>>> midi.end_of_track()
+>>> data = midi.read_all()
+>>> compressed = recompress(data)
+>>> len(data), len(compressed)
+(74, 63)
+>>> list(iter_events(data)) == list(iter_events(compressed))
+True
+"""
+
+# standard library imports
+import io
+
+# custom import
+from mxm.midifile.src.midi_infile import MidiInFile
+from mxm.midifile.src.midi_outfile import MidiOutFile
+
+
+def recompress(infile, outfile=None):
+    """
+    Writes infile, a path, file object or buffer, to outfile with running
+    status. outfile is a path or a file object. Without an outfile the
+    new file is returned as bytes.
+    """
+    out = io.BytesIO() if outfile is None else outfile
+    midi_out = MidiOutFile(out, trusted=True, auto_running_status=True)
+    midi_in = MidiInFile(midi_out, infile)
+    try:
+        midi_in.read()
+    finally:
+        midi_in.close()
+    if outfile is None:
+        return out.getvalue()
+    if isinstance(outfile, str):
+        midi_out.close()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+"""
+A push parser for midi data that arrives in pieces, eg. from a pipe, a
+socket or a decompression stream. The data is fed to the parser as it
+arrives, and the events are triggered on the event handler as soon as they
+are complete. Only the incomplete event at the end of the data is kept
+between calls, so the memory used depends on the size of the pieces and
+not on the size of the file.
+
+>>> from mxm.midifile import testdir, MidiToCode
+>>> with open(testdir('midifiles/minimal.mid'), 'rb') as f:
+...     data = f.read()
+>>> stream = MidiStreamParser(MidiToCode())
+>>> stream.feed(data[:30])
+from mxm.midifile import MidiOutFile
+<BLANKLINE>
+midi_out = MidiOutFile('file.mid')
+midi_out.header(format=1, nTracks=2, division=15360)
+<BLANKLINE>
+midi_out.start_of_track(n_track=0)
+midi_out.update_time(new_time=0)
+midi_out.time_signature(nn=4, dd=2, cc=24, bb=8)
+>>> stream.feed(data[30:40])
+midi_out.update_time(new_time=0)
+midi_out.tempo(value=500000) # bpm: ~120.00
+
+The end of track event is not complete yet, so it is kept until the next piece
+>>> stream.position
+37
+>>> stream.feed(data[40:])
+midi_out.end_of_track()
+<BLANKLINE>
+<BLANKLINE>
+midi_out.start_of_track(n_track=1)
+midi_out.update_time(new_time=0)
+midi_out.sequence_name(text=b'Synth 1')
+midi_out.update_time(new_time=0)
+midi_out.instrument_name(text=b'Synth 1')
+midi_out.update_time(new_time=0)
+midi_out.midi_port(value=4)
+midi_out.update_time(new_time=0)
+midi_out.note_on(channel=0, note=36, velocity=127)
+midi_out.update_time(new_time=61440)
+midi_out.note_off(channel=0, note=36, velocity=0)
+midi_out.end_of_track()
+<BLANKLINE>
+<BLANKLINE>
+>>> stream.close()
+"""
+
+# custom import
+from mxm.midifile.src import constants as c
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.event_dispatcher import DATA_SIZES
+
+
+# parser states
+HEADER, CHUNK, TRACK, SKIP = range(4)
+
+
+def scan_events(data, position, running_status):
+    """
+    Returns the position after the last complete event in data, starting
+    at position, with the running status before the first event. Events
+    with bad data are counted as complete, so the parser can raise the error.
+    >>> scan_events(bytes([0, 0x90, 64, 100, 96, 64]), 0, None)
+    4
+    >>> scan_events(bytes([0, 0x90, 64, 100, 96, 64, 0]), 0, None)
+    7
+    >>> scan_events(bytes([0, 0xFF, 0x51, 3, 7, 0xA1]), 0, None)
+    0
+    """
+    end = len(data)
+    complete = position
+    try:
+        while position < end:
+            # delta time, max 4 bytes
+            for i in range(4):
+                byte = data[position]
+                position += 1
+                if not byte & 0x80:
+                    break
+            status = data[position]
+            if status & 0x80:
+                position += 1
+            elif running_status is None:
+                # the parser raises the error
+                return position
+            else:
+                status = running_status
+            running_status = None if status >= 0xF0 else status
+            data_size = DATA_SIZES[status]
+            if data_size is not None:
+                position += data_size
+            else:
+                if status == c.META_EVENT:
+                    position += 1 # the meta type
+                length = 0
+                for i in range(4):
+                    byte = data[position]
+                    position += 1
+                    length = (length << 7) | (byte & 0x7F)
+                    if not byte & 0x80:
+                        break
+                position += length
+            if position > end:
+                break
+            complete = position
+    except IndexError:
+        pass
+    return complete
+
+
+class MidiStreamParser:
+
+    """
+    Parses midi file data that is fed to it in pieces with feed(). The
+    events are triggered on the event handler as soon as they are complete.
+    Call close() at the end of the data to trigger eof.
+    """
+
+    def __init__(self, event_handler, dispatch=None):
+        self.raw_in = RawInstreamFile(b'')
+        self.parser = MidiFileParser(self.raw_in, event_handler, dispatch=dispatch)
+        self.dispatch = self.parser.dispatch
+        self._buffer = b''
+        self._state = HEADER
+        # bytes left in the current chunk
+        self._remaining = 0
+        self._track = 0
+        # the number of bytes parsed. The position in the file of the buffer.
+        self.position = 0
+
+
+    def feed(self, data):
+        "Parses the data, and triggers the events that are complete"
+        if self._state == SKIP:
+            # unknown chunks are skipped without being buffered
+            skipped = min(self._remaining, len(data))
+            self._remaining -= skipped
+            self.position += skipped
+            data = data[skipped:]
+            if self._remaining:
+                return
+            self._state = CHUNK
+        buffer = self._buffer + data if self._buffer else bytes(data)
+        raw_in = self.raw_in
+        raw_in.setData(buffer)
+        try:
+            self._parse(buffer)
+        finally:
+            consumed = raw_in.getCursor()
+            self._buffer = buffer[consumed:]
+            self.position += consumed
+            raw_in.setData(b'')
+
+
+    def _parse(self, buffer):
+        "Parses as much of the buffer as possible"
+        raw_in = self.raw_in
+        parser = self.parser
+        size = len(buffer)
+        while True:
+            position = raw_in.getCursor()
+            state = self._state
+            if state == TRACK:
+                remaining = self._remaining
+                track_end = position + remaining
+                if size >= track_end:
+                    # the rest of the track is here
+                    end = track_end
+                else:
+                    end = scan_events(buffer, position, parser.get_running_status())
+                parser.parseMTrkEvents(end, track_end)
+                self._remaining = track_end - raw_in.getCursor()
+                if self._remaining:
+                    return
+                self._state = CHUNK
+                self._track += 1
+            elif state == CHUNK:
+                # a chunk header is 4 bytes of type and 4 bytes of length
+                if size < position + 8:
+                    return
+                if buffer[position:position+4] == c.TRACK_HEADER:
+                    parser._current_track = self._track
+                    self._remaining = parser.startMTrkChunk() - raw_in.getCursor()
+                    self._state = TRACK
+                else:
+                    raw_in.moveCursor(4)
+                    length = raw_in.readBew(4)
+                    skipped = min(length, size - raw_in.getCursor())
+                    raw_in.moveCursor(skipped)
+                    if skipped < length:
+                        self._remaining = length - skipped
+                        self._state = SKIP
+                        return
+            elif state == HEADER:
+                if size < 8:
+                    return
+                raw_in.setCursor(4)
+                if size < 8 + raw_in.readBew(4):
+                    raw_in.setCursor(0)
+                    return
+                parser.parseMThdChunk()
+                self._state = CHUNK
+            else:
+                return
+
+
+    def close(self):
+        """
+        Ends the data, and triggers eof. Raises a ValueError if the data
+        ended in the middle of a chunk. Anything after the last track, like 
+        padding, is ignored, as it is by MidiInFile.
+        >>> from mxm.midifile import MidiEvents
+        >>> stream = MidiStreamParser(MidiEvents())
+        >>> stream.feed(b'MThd')
+        >>> stream.close()
+        Traceback (most recent call last):
+        ...
+        ValueError: The data ended in the middle of a chunk at position 0
+        """
+        state = self._state
+        leftover = self._buffer
+        if state == HEADER or state == TRACK:
+            complete = False
+        elif self._track >= self.parser.nTracks:
+            complete = True
+        elif state == SKIP:
+            complete = False
+        else:
+            # less than a chunk header. Padding, unless it starts a track chunk
+            complete = not leftover or not c.TRACK_HEADER.startswith(leftover[:4])
+        if not complete:
+            raise ValueError('The data ended in the middle of a chunk at position %s' % self.position)
+        self.dispatch.eof()
+
+
+def parse_stream(infile, event_handler, chunk_size=65536):
+    """
+    Reads midi data from a file like object, eg. a pipe or a socket file,
+    in pieces of chunk_size, and triggers the events on event_handler as
+    soon as they are complete.
+    >>> import io
+    >>> from mxm.midifile import testdir
+    >>> from mxm.midifile.src.event_iterator import EventCollector
+    >>> collector = EventCollector()
+    >>> with open(testdir('midifiles/minimal.mid'), 'rb') as f:
+    ...     parse_stream(f, collector, chunk_size=5)
+    >>> len(collector.events)
+    9
+    """
+    stream = MidiStreamParser(event_handler)
+    read = infile.read
+    while True:
+        data = read(chunk_size)
+        if not data:
+            break
+        stream.feed(data)
+    stream.close()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""
+Converts between ticks and seconds. The tempo map is built in one pass
+from the tempo events and the division in the header. The time of the start
+of each tempo segment is calculated up front, so a conversion is a binary
+search over the segments, instead of a scan over the tempo events.
+
+>>> tempo_map = TempoMap(division=480, tempos=[(0, 500000), (960, 250000)])
+>>> tempo_map.seconds(480), tempo_map.seconds(960), tempo_map.seconds(1920)
+(0.5, 1.0, 1.5)
+>>> tempo_map.ticks(1.5)
+1920.0
+
+Whole arrays are converted at once, vectorized with numpy if it is installed
+>>> tempo_map.seconds_array([0, 480, 1920]).tolist()
+[0.0, 0.5, 1.5]
+>>> tempo_map.ticks_array([0.5, 1.5]).tolist()
+[480.0, 1920.0]
+
+SMPTE divisions have frames per second and ticks per frame, and no tempo
+>>> smpte = TempoMap(division=TempoMap.smpte_division(25, 40))
+>>> smpte.seconds(1000)
+1.0
+"""
+
+# standard library imports
+from array import array
+from bisect import bisect_right
+
+# optional imports
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# custom import
+from mxm.midifile.src.timed_events import TimedMidiEvents
+from mxm.midifile.src.midi_infile import MidiInFile
+
+
+# the tempo until the first tempo event. 120 bpm.
+DEFAULT_TEMPO = 500000
+
+
+class TempoMap(TimedMidiEvents):
+
+    """
+    A map from ticks to seconds and back. It can be given the division and
+    the tempo events as (tick, microseconds per quarter note), or be used
+    as the event handler when parsing a file. The tempo events of all the
+    tracks are used, though they should only be in the first track.
+    """
+
+    def __init__(self, division=96, tempos=()):
+        TimedMidiEvents.__init__(self)
+        self.division = division
+        self._tempos = list(tempos)
+        self._build()
+
+
+    @classmethod
+    def from_file(cls, infile):
+        """
+        Builds the tempo map of infile. Only the tempo events are decoded.
+        >>> from mxm.midifile import testdir
+        >>> tempo_map = TempoMap.from_file(testdir('midifiles/minimal.mid'))
+        >>> tempo_map.division, tempo_map.tempo_at(0)
+        (15360, 500000)
+        """
+        tempo_map = cls()
+        midi_in = MidiInFile(tempo_map, infile, include=['tempo'])
+        try:
+            midi_in.read()
+        finally:
+            midi_in.close()
+        return tempo_map
+
+
+    @staticmethod
+    def smpte_division(frames_per_second, ticks_per_frame):
+        """
+        Returns the header division for an SMPTE time base. frames_per_second
+        is 24, 25, 29 (for 29.97 drop frame) or 30.
+        >>> hex(TempoMap.smpte_division(25, 40))
+        '0xe728'
+        """
+        return ((256 - frames_per_second) << 8) | ticks_per_frame
+
+
+    # the events from the parser
+
+    def header(self, format=0, n_tracks=1, division=96):
+        self.division = division
+        self._tempos = []
+
+    def tempo(self, tick, value):
+        self._tempos.append((tick, value))
+
+    def eof(self):
+        self._build()
+
+
+    def _build(self):
+        """
+        Makes the segments. Each starts at a tempo change, and has the start
+        tick, the start time in seconds and the seconds per tick.
+        """
+        division = self.division
+        if not division:
+            raise ValueError('The division can not be 0')
+        # stable, so the last of several tempo events at the same tick wins
+        tempos = sorted(self._tempos, key=lambda tempo: tempo[0])
+        starts = array('q', [0])
+        seconds = array('d', [0.0])
+        if division & 0x8000:
+            # SMPTE. The high byte is the negative frames per second
+            frames_per_second = 256 - (division >> 8)
+            if frames_per_second == 29:
+                frames_per_second = 30000 / 1001
+            per_tick = array('d', [1.0 / (frames_per_second * (division & 0xFF))])
+        else:
+            per_tick = array('d', [DEFAULT_TEMPO / 1e6 / division])
+            for tick, tempo in tempos:
+                if tick != starts[-1]:
+                    seconds.append(seconds[-1] + (tick - starts[-1]) * per_tick[-1])
+                    starts.append(tick)
+                    per_tick.append(0.0)
+                per_tick[-1] = tempo / 1e6 / division
+        self._starts = starts
+        self._start_seconds = seconds
+        self._per_tick = per_tick
+
+
+    def tempo_at(self, tick):
+        "Returns the tempo in microseconds per quarter note at tick"
+        i = bisect_right(self._starts, tick) - 1
+        return round(self._per_tick[i] * self.division * 1e6)
+
+
+    def seconds(self, tick):
+        """
+        Returns the time in seconds at tick
+        >>> TempoMap().seconds(-1)
+        Traceback (most recent call last):
+        ...
+        ValueError: Ticks can not be negative: -1
+        """
+        if tick < 0:
+            raise ValueError('Ticks can not be negative: %s' % tick)
+        i = bisect_right(self._starts, tick) - 1
+        return self._start_seconds[i] + (tick - self._starts[i]) * self._per_tick[i]
+
+
+    def ticks(self, seconds):
+        "Returns the tick at the time in seconds. It is a float, so round as needed."
+        if seconds < 0:
+            raise ValueError('Seconds can not be negative: %s' % seconds)
+        i = bisect_right(self._start_seconds, seconds) - 1
+        return self._starts[i] + (seconds - self._start_seconds[i]) / self._per_tick[i]
+
+
+    def seconds_array(self, ticks):
+        """
+        Converts all the ticks to seconds. Returns a numpy array, or an
+        array.array without numpy.
+        """
+        if np is None:
+            return array('d', [self.seconds(tick) for tick in ticks])
+        ticks = np.asarray(ticks)
+        if len(ticks) and ticks.min() < 0:
+            raise ValueError('Ticks can not be negative: %s' % ticks.min())
+        i = np.searchsorted(self._starts, ticks, side='right') - 1
+        starts = np.asarray(self._starts)
+        return np.asarray(self._start_seconds)[i] + (ticks - starts[i]) * np.asarray(self._per_tick)[i]
+
+
+    def ticks_array(self, seconds):
+        """
+        Converts all the times in seconds to ticks. Returns a numpy array,
+        or an array.array without numpy.
+        """
+        if np is None:
+            return array('d', [self.ticks(s) for s in seconds])
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if len(seconds) and seconds.min() < 0:
+            raise ValueError('Seconds can not be negative: %s' % seconds.min())
+        start_seconds = np.asarray(self._start_seconds)
+        i = np.searchsorted(start_seconds, seconds, side='right') - 1
+        return np.asarray(self._starts)[i] + (seconds - start_seconds[i]) / np.asarray(self._per_tick)[i]
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+
+"""
+An alternative event handler protocol, where the time is part of each event.
+
+With MidiEvents the parser first updates the time, and then triggers the
+event. So there are at least two calls for every event. A TimedMidiEvents
+handler gets the absolute time in the track, the tick, as the first argument
+of each event instead. There are no calls to update_time or to the running
+status methods at all:
+
+    note_on(tick, channel, note, velocity)
+
+The delta time since the previous event is not passed. It is the difference 
+between the ticks, and the handlers that needs it, like MidiEventsAdapter, 
+keep the tick of the previous event. That is cheaper than an extra argument 
+on every event.
+
+The parser uses the protocol for any event handler that subclasses
+TimedMidiEvents. MidiEventsAdapter goes the other way, and passes timed
+events on to an ordinary MidiEvents handler.
+
+>>> from mxm.midifile import MidiInFile, testdir
+>>> class NotePrinter(TimedMidiEvents):
+...     def note_on(self, tick, channel, note, velocity):
+...         print('note_on', tick, channel, note, velocity)
+...     def note_off(self, tick, channel, note, velocity):
+...         print('note_off', tick, channel, note, velocity)
+>>> MidiInFile(NotePrinter(), testdir('midifiles/minimal.mid')).read()
+note_on 0 0 36 127
+note_off 61440 0 36 0
+"""
+
+# custom import
+from mxm.midifile.src import constants as c
+from mxm.midifile.src.event_dispatcher import EventDispatcher
+
+
+class TimedMidiEvents:
+
+    """
+    Base class for event handlers that get the absolute time of each event
+    in the track, the tick, as the first argument. The arguments are
+    otherwise the same as for MidiEvents, except that there is no
+    use_running_status. All the events are ignored by default, so only
+    the interesting ones needs to be implemented.
+    """
+
+    # the parser uses the timed protocol for handlers with this set
+    timed_events = True
+
+    def __init__(self):
+        self._current_track = 0
+
+    # track handling
+
+    def set_current_track(self, new_track):
+        self._current_track = new_track
+
+    def get_current_track(self):
+        return self._current_track
+
+    # events without time
+
+    def header(self, format=0, n_tracks=1, division=96):
+        pass
+
+    def start_of_track(self, n_track=0):
+        pass
+
+    def eof(self):
+        pass
+
+    # channel events
+
+    def note_on(self, tick, channel, note, velocity):
+        pass
+
+    def note_off(self, tick, channel, note, velocity):
+        pass
+
+    def aftertouch(self, tick, channel, note, velocity):
+        pass
+
+    def continuous_controller(self, tick, channel, controller, value):
+        pass
+
+    def patch_change(self, tick, channel, patch):
+        pass
+
+    def channel_pressure(self, tick, channel, pressure):
+        pass
+
+    def pitch_bend(self, tick, channel, value):
+        pass
+
+    # system exclusive, common and realtime events
+
+    def sysex_event(self, tick, data):
+        pass
+
+    def song_position_pointer(self, tick, song_position):
+        pass
+
+    def song_select(self, tick, song_number):
+        pass
+
+    def tuning_request(self, tick):
+        pass
+
+    def midi_time_code(self, tick, msg_type, values):
+        pass
+
+    def timing_clock(self, tick):
+        pass
+
+    def song_start(self, tick):
+        pass
+
+    def song_stop(self, tick):
+        pass
+
+    def song_continue(self, tick):
+        pass
+
+    def active_sensing(self, tick):
+        pass
+
+    # meta events
+
+    def meta_event(self, tick, meta_type, data):
+        pass
+
+    def end_of_track(self, tick):
+        pass
+
+    def sequence_number(self, tick, seq_num):
+        pass
+
+    def text(self, tick, text):
+        pass
+
+    def copyright(self, tick, text):
+        pass
+
+    def sequence_name(self, tick, text):
+        pass
+
+    def instrument_name(self, tick, text):
+        pass
+
+    def lyric(self, tick, text):
+        pass
+
+    def marker(self, tick, text):
+        pass
+
+    def cuepoint(self, tick, text):
+        pass
+
+    def program_name(self, tick, text):
+        pass
+
+    def device_name(self, tick, text):
+        pass
+
+    def midi_ch_prefix(self, tick, channel):
+        pass
+
+    def midi_port(self, tick, value):
+        pass
+
+    def tempo(self, tick, value):
+        pass
+
+    def smtp_offset(self, tick, hour, minute, second, frame, framePart):
+        pass
+
+    def time_signature(self, tick, nn, dd, cc, bb):
+        pass
+
+    def key_signature(self, tick, sf, mi):
+        pass
+
+    def sequencer_specific(self, tick, id, data):
+        pass
+
+
+# the events that has a tick
+TIMED_EVENTS = ('note_on', 'note_off', 'aftertouch', 'continuous_controller',
+    'patch_change', 'channel_pressure', 'pitch_bend', 'sysex_event', 'song_position_pointer',
+    'song_select', 'tuning_request', 'midi_time_code', 'timing_clock',
+    'song_start', 'song_stop', 'song_continue', 'active_sensing', 'meta_event',
+    'end_of_track', 'sequence_number', 'text', 'copyright', 'sequence_name',
+    'instrument_name', 'lyric', 'marker', 'cuepoint', 'program_name',
+    'device_name', 'midi_ch_prefix', 'midi_port', 'tempo', 'smtp_offset',
+    'time_signature', 'key_signature', 'sequencer_specific')
+
+
+class TimedEventDispatcher(EventDispatcher):
+
+    """
+    Dispatches events to a TimedMidiEvents handler. The tick is passed
+    directly to the events, so the time and running status are never
+    updated on the handler.
+    >>> class Printer(TimedMidiEvents):
+    ...     def note_on(self, tick, channel, note, velocity):
+    ...         print('note_on', tick, channel, note, velocity)
+    ...     def tempo(self, tick, value):
+    ...         print('tempo', tick, value)
+    >>> dispatch = TimedEventDispatcher(Printer())
+    >>> dispatch.status_table[0x92][1](96, 480, 0x92, bytes([64, 100]), False)
+    note_on 480 2 64 100
+    >>> dispatch.meta_table[c.TEMPO](0, 480, bytes([7, 161, 32]))
+    tempo 480 500000
+
+    The events are decoded by EventDispatcher.decode_tables, only the 
+    triggering of the decoded events is different.
+    """
+
+    running_status_events = False
+    passthrough_raw_events = False
+    base_events = TimedMidiEvents
+
+    def update_time(self, new_time=0, relative=1):
+        pass
+
+    def reset_time(self):
+        pass
+
+    def _event(self, name):
+        """
+        Returns the trigger for the event name, for decode_tables. The tick 
+        is passed on as the first argument of the event. The delta, and the 
+        use_running_status of the channel events, are dropped.
+        """
+        if name is None:
+            return _time_only
+        method = self._bind(name)
+        if name in _CHANNEL_EVENTS_1:
+            def trigger(delta, tick, channel, value, use_running_status):
+                method(tick, channel, value)
+        elif name in _CHANNEL_EVENTS_2:
+            def trigger(delta, tick, channel, data1, data2, use_running_status):
+                method(tick, channel, data1, data2)
+        else:
+            def trigger(delta, tick, *args):
+                method(tick, *args)
+        return trigger
+
+
+    def _untimed_event(self, name):
+        # There is no time on the handler to leave alone. The public dispatch 
+        # methods triggers the events at tick 0.
+        return self._event(name)
+
+
+def _time_only(delta, tick):
+    pass
+
+
+# the channel events with one and with two data values
+_CHANNEL_EVENTS_1 = ('patch_change', 'channel_pressure', 'pitch_bend')
+_CHANNEL_EVENTS_2 = ('note_on', 'note_off', 'aftertouch', 'continuous_controller')
+
+
+def _adapted_event(name):
+    "Returns a MidiEventsAdapter method that triggers the named event"
+    def event(self, tick, *args):
+        self._update_time(tick)
+        getattr(self.events, name)(*args)
+    event.__name__ = name
+    return event
+
+
+class MidiEventsAdapter(TimedMidiEvents):
+
+    """
+    Passes timed events on to an ordinary MidiEvents handler, by updating
+    its time before each event. So anything that produces timed events can
+    drive the existing MidiEvents handlers, like MidiOutFile.
+    >>> from mxm.midifile import MidiToCode
+    >>> adapter = MidiEventsAdapter(MidiToCode())
+    >>> adapter.note_on(96, 0, 64, 100)
+    midi_out.update_time(new_time=96)
+    midi_out.note_on(channel=0, note=64, velocity=100)
+    >>> adapter.note_off(192, 0, 64, 0)
+    midi_out.update_time(new_time=96)
+    midi_out.note_off(channel=0, note=64, velocity=0)
+    """
+
+    def __init__(self, events):
+        TimedMidiEvents.__init__(self)
+        self.events = events
+        self._tick = 0
+
+    def _update_time(self, tick):
+        self.events.update_time(tick - self._tick)
+        self._tick = tick
+
+    def set_current_track(self, new_track):
+        TimedMidiEvents.set_current_track(self, new_track)
+        self.events.set_current_track(new_track)
+
+    def header(self, format=0, n_tracks=1, division=96):
+        self.events.header(format, n_tracks, division)
+
+    def start_of_track(self, n_track=0):
+        self._tick = 0
+        self.events.reset_time()
+        self.events.start_of_track(n_track)
+
+    def eof(self):
+        self.events.eof()
+
+
+for _name in TIMED_EVENTS:
+    setattr(MidiEventsAdapter, _name, _adapted_event(_name))
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+"""
+Merges the tracks of a format 1 file into a single stream of events ordered
+by tick, and writes it as a format 0 file. The tracks are parsed lazily side
+by side, and merged with a heap of the next event in each track. So only one
+event per track is held in memory, instead of all the events in the file.
+
+Events at the same tick are ordered by kind first: meta, sysex and system
+events, then note_offs (and note_ons with a velocity of 0), then the other
+channel events, and note_ons last. Then by track. The events within a track
+keep their order.
+
+>>> from mxm.midifile import MidiOutFile, iter_events, testdir
+>>> for event in merge_events(*track_streams(testdir('midifiles/minimal.mid'))):
+...     print(event)
+(0, 0, 'time_signature', (4, 2, 24, 8))
+(0, 0, 'tempo', (500000,))
+(1, 0, 'sequence_name', (b'Synth 1',))
+(1, 0, 'instrument_name', (b'Synth 1',))
+(1, 0, 'midi_port', (4,))
+(1, 0, 'note_on', (0, 36, 127))
+(1, 61440, 'note_off', (0, 36, 0))
+(0, 6144000, 'end_of_track', ())
+
+>>> midi_out = MidiOutFile()
+>>> to_format_0(testdir('midifiles/minimal.mid'), midi_out)
+>>> [event[1:3] for event in iter_events(midi_out.read_all(), include=['channel'])]
+[(0, 'note_on'), (61440, 'note_off'), (6144000, 'end_of_track')]
+"""
+
+# standard library imports
+from heapq import merge
+
+# custom import
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.src.event_dispatcher import EVENT_CLASSES
+from mxm.midifile.src.event_iterator import EventCollector, iter_parser_events
+
+
+# the order of events at the same tick
+_NOTE_OFF = 1
+_CHANNEL = 2
+_NOTE_ON = 3
+_ORDER = dict.fromkeys(EVENT_CLASSES['channel'], _CHANNEL)
+_ORDER['note_off'] = _NOTE_OFF
+
+
+def _event_order(event):
+    "The sort key of an event. Everything that is not a channel event is first."
+    track, tick, name, data = event
+    order = _ORDER.get(name, 0)
+    if name == 'note_on':
+        order = _NOTE_ON if data[2] else _NOTE_OFF
+    return tick, order
+
+
+def track_streams(infile, tracks=None, zero_copy=False, include=None, exclude=None):
+    """
+    Returns a list with a lazy event stream for each track in infile, like
+    iter_events for a single track. The file data is read once and shared
+    by all the streams. The arguments works as for iter_events.
+    """
+    raw_in = RawInstreamFile(infile, zero_copy=zero_copy)
+    data = raw_in.getData()
+    parser = MidiFileParser(raw_in, EventCollector())
+    parser.readMThdChunk()
+    if tracks is None:
+        tracks = range(len(parser.indexMTrkChunks()))
+    streams = []
+    for track in tracks:
+        parser = MidiFileParser(RawInstreamFile(data, zero_copy=zero_copy), EventCollector(),
+                                include=include, exclude=exclude)
+        parser.readMThdChunk()
+        streams.append(iter_parser_events(parser, tracks=[track]))
+    return streams
+
+
+def merge_events(*streams):
+    """
+    Generator that merges streams of (track, tick, type, data) events, each
+    ordered by tick, into one stream ordered by tick. Ties are ordered as
+    described above. The end of track events of the streams are replaced
+    by a single one at the latest tick, in the lowest of their tracks.
+    A MidiSequence's tracks can be merged too, with merge_events(*sequence.tracks)
+    >>> a = [(0, 96, 'note_on', (0, 64, 100)), (0, 96, 'end_of_track', ())]
+    >>> b = [(1, 96, 'note_off', (0, 60, 0)), (1, 192, 'end_of_track', ())]
+    >>> c = [(2, 96, 'tempo', (400000,)), (2, 96, 'end_of_track', ())]
+    >>> for event in merge_events(a, b, c):
+    ...     print(event)
+    (2, 96, 'tempo', (400000,))
+    (1, 96, 'note_off', (0, 60, 0))
+    (0, 96, 'note_on', (0, 64, 100))
+    (0, 192, 'end_of_track', ())
+    """
+    ends = []
+    def without_end(stream):
+        for event in stream:
+            if event[2] == 'end_of_track':
+                ends.append(event)
+            else:
+                yield event
+    tick = 0
+    # heapq.merge keeps a heap of the next event of each stream, and is
+    # stable, so ties in the key are ordered by stream and then by position.
+    for event in merge(*[without_end(stream) for stream in streams], key=_event_order):
+        tick = event[1]
+        yield event
+    if ends:
+        tick = max(tick, max(end[1] for end in ends))
+    track = min(end[0] for end in ends) if ends else 0
+    yield (track, tick, 'end_of_track', ())
+
+
+def to_format_0(infile, midi_out, zero_copy=False, include=None, exclude=None):
+    """
+    Writes the tracks in infile merged into a single track to midi_out, a
+    MidiOutFile, as a format 0 file.
+    """
+    raw_in = RawInstreamFile(infile, zero_copy=zero_copy)
+    parser = MidiFileParser(raw_in, EventCollector())
+    parser.readMThdChunk()
+    division = parser.division
+    streams = track_streams(raw_in.getData(), zero_copy=zero_copy, include=include, exclude=exclude)
+    write_events(midi_out, merge_events(*streams), division=division)
+
+
+def write_events(midi_out, events, division=96):
+    """
+    Writes a stream of (track, tick, type, data) events, ordered by tick and
+    ending with an end of track, to midi_out as a format 0 file.
+    """
+    midi_out.header(format=0, nTracks=1, division=division)
+    midi_out.start_of_track(0)
+    update_time = midi_out.update_time
+    for track, tick, name, data in events:
+        update_time(tick, relative=0)
+        getattr(midi_out, name)(*data)
+    midi_out.eof()
+
+
+
+if __name__ == '__main__':
+
+    import doctest
+    doctest.testmod() # run test on inline examples first
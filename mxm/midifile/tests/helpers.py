@@ -0,0 +1,123 @@
+"""
+Midi data shared by the tests
+"""
+
+from mxm.midifile import MidiOutFile, MidiEvents
+from mxm.midifile.src.data_type_converters import writeBew
+# the path of a file in the tests dir. It is not imported as testdir into 
+# the test modules, as pytest would collect that as a test.
+from mxm.midifile.src.helpers import testdir as in_tests
+import io, random
+
+
+def track_file(*tracks, division=96):
+    "A file with the bytes of each of the tracks as a track chunk"
+    header = writeBew(0 if len(tracks) == 1 else 1, 2) + writeBew(len(tracks), 2) + writeBew(division, 2)
+    chunks = [b'MTrk' + writeBew(len(track), 4) + track for track in tracks]
+    return b'MThd' + writeBew(6, 4) + header + b''.join(chunks)
+
+
+def sysex_packets_file():
+    """
+    A file with a sysex split in two packets, where the second is an 0xF7 
+    escape, an escape with a realtime message, and a sysex packet without 
+    a terminator
+    """
+    return track_file(bytes([0, 0xF0, 3, 0x43, 0x12, 0x00, 10, 0xF7, 3, 0x43, 0x12, 0xF7,
+                             0, 0xF7, 1, 0xF8, 5, 0xF0, 2, 0x43, 0x01,
+                             0, 0x90, 60, 100, 0, 0xFF, 0x2F, 0]))
+
+
+def type_1_file(n_tracks=12, n_notes=200):
+    "A format 1 file with a conductor track and n_tracks note tracks"
+    midi = MidiOutFile(io.BytesIO())
+    midi.header(format=1, nTracks=n_tracks+1, division=480)
+    midi.start_of_track()
+    midi.tempo_bpm(100)
+    midi.end_of_track()
+    for t in range(n_tracks):
+        midi.start_of_track()
+        midi.patch_change(t % 16, t)
+        for i in range(n_notes):
+            midi.update_time(0)
+            midi.note_on(t % 16, (t + i) % 128, 100)
+            midi.update_time(120)
+            midi.note_on(t % 16, (t + i) % 128, 0, use_running_status=True)
+        midi.end_of_track()
+    data = midi.read_all()
+    midi.close()
+    return data
+
+
+def random_file(seed=1, n_notes=500):
+    "A file with two tracks of random, overlapping notes on a few pitches"
+    rnd = random.Random(seed)
+    midi = MidiOutFile(io.BytesIO())
+    midi.header(format=1, nTracks=2, division=96)
+    for track in range(2):
+        midi.start_of_track(track)
+        events = []
+        for i in range(n_notes):
+            start = rnd.randrange(0, 10000)
+            note = rnd.randrange(60, 64)
+            events.append((start, 1, note, rnd.randrange(1, 128)))
+            events.append((start + rnd.randrange(1, 300), 0, note, 0))
+        for tick, is_on, note, velocity in sorted(events):
+            midi.update_time(tick, relative=False)
+            if is_on:
+                midi.note_on(track, note, velocity)
+            elif rnd.random() < 0.5:
+                midi.note_on(track, note, 0)
+            else:
+                midi.note_off(track, note, 0)
+        midi.end_of_track()
+    midi.eof()
+    return midi.read_all()
+
+
+def meta_and_sysex_file():
+    "A file with long meta events, a sysex event and large delta times"
+    midi = MidiOutFile(io.BytesIO())
+    midi.header(format=1, nTracks=3, division=96)
+    midi.start_of_track()
+    midi.tempo_bpm(90)
+    midi.sequence_name(b'x' * 200)
+    midi.update_time(20000)
+    midi.lyric(b'la')
+    midi.end_of_track()
+    midi.start_of_track()
+    midi.sysex_event(bytes([0x43, 0x12, 0x00]))
+    midi.update_time(3000000)
+    midi.note_on(9, 36, 100)
+    midi.update_time(10)
+    midi.pitch_bend(0, 8192)
+    midi.end_of_track()
+    midi.start_of_track()
+    midi.end_of_track()
+    data = midi.read_all()
+    midi.close()
+    return data
+
+
+class AbsoluteTimeRecorder(MidiEvents):
+
+    "Records some events with the absolute time from update_time"
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.events = []
+
+    def note_on(self, channel, note, velocity, use_running_status=False):
+        self.events.append((self.abs_time(), 'note_on', channel, note, velocity))
+
+    def note_off(self, channel, note, velocity, use_running_status=False):
+        self.events.append((self.abs_time(), 'note_off', channel, note, velocity))
+
+    def patch_change(self, channel, patch, use_running_status=False):
+        self.events.append((self.abs_time(), 'patch_change', channel, patch))
+
+    def tempo(self, value):
+        self.events.append((self.abs_time(), 'tempo', value))
+
+    def end_of_track(self):
+        self.events.append((self.abs_time(), 'end_of_track'))
@@ -0,0 +1,91 @@
+from mxm.midifile import MidiInFile, MidiOutFile, MidiToArrays
+from mxm.midifile.src.midi_to_arrays import np
+from mxm.midifile.tests.helpers import in_tests, type_1_file, meta_and_sysex_file, sysex_packets_file
+import io, glob, unittest
+
+if np is not None:
+    from mxm.midifile.src import array_transforms as at
+
+
+class Transposer(MidiOutFile):
+
+    "The transposer from the examples, as an event handler"
+
+    def _transp(self, ch, note):
+        if ch != 9 and 0 <= note + 24 <= 127:
+            note += 24
+        return note
+
+    def note_on(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
+        MidiOutFile.note_on(self, channel, self._transp(channel, note), velocity, use_running_status)
+
+    def note_off(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
+        MidiOutFile.note_off(self, channel, self._transp(channel, note), velocity, use_running_status)
+
+
+def to_arrays(data):
+    arrays = MidiToArrays()
+    MidiInFile(arrays, data).read()
+    return arrays
+
+
+@unittest.skipIf(np is None, 'needs numpy')
+class TestArrayTransforms(unittest.TestCase):
+
+    def files(self):
+        yield type_1_file(n_tracks=3, n_notes=20)
+        yield meta_and_sysex_file()
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            with open(path, 'rb') as f:
+                yield f.read()
+
+    def write(self, table, arrays):
+        midi_out = MidiOutFile(io.BytesIO())
+        at.write_table(midi_out, table, arrays.payload, format=arrays.format, division=arrays.division)
+        return midi_out.read_all()
+
+    def test_round_trip(self):
+        for data in self.files():
+            arrays = to_arrays(data)
+            copy = to_arrays(self.write(arrays.table, arrays))
+            self.assertEqual(arrays.table.tolist(), copy.table.tolist())
+            self.assertEqual(arrays.payload, copy.payload)
+
+    def test_sysex_packets(self):
+        "Split sysex events and escapes are written as they were"
+        data = sysex_packets_file()
+        arrays = to_arrays(data)
+        self.assertEqual(arrays.table['status'].tolist()[:4], [0xF0, 0xF7, 0xF7, 0xF0])
+        self.assertEqual(arrays.event_data(1), bytes([0x43, 0x12, 0xF7]))
+        self.assertEqual(self.write(arrays.table, arrays), data)
+
+    def test_same_as_transposer(self):
+        for data in self.files():
+            out = io.BytesIO()
+            MidiInFile(Transposer(out), data).read()
+            expected = to_arrays(out.getvalue()).table
+            arrays = to_arrays(data)
+            table = at.transpose(arrays.table, 24, exclude_channels=(9,), clamp=False)
+            self.assertEqual(expected.tolist(), table.tolist())
+            self.assertEqual(expected.tolist(), to_arrays(self.write(table, arrays)).table.tolist())
+
+    def test_quantize_keeps_end_of_track_last(self):
+        arrays = to_arrays(type_1_file(n_tracks=1, n_notes=3))
+        table = at.quantize(arrays.table, 1000)
+        copy = to_arrays(self.write(table, arrays)).table
+        self.assertEqual(copy[-1]['data1'], 0x2F)
+        self.assertEqual(copy['tick'][at.note_events(copy)].tolist(), [0, 0, 0, 0, 0, 0])
+
+    def test_select_and_remap(self):
+        arrays = to_arrays(type_1_file(n_tracks=3, n_notes=5))
+        table = at.select_events(arrays.table, ~at.events_of_kind(arrays.table, 0x9))
+        table = at.remap_channels(table, [15 - ch for ch in range(16)])
+        copy = to_arrays(self.write(table, arrays)).table
+        patches = copy[at.events_of_kind(copy, 0xC)]
+        self.assertEqual(patches['channel'].tolist(), [15, 14, 13])
+        # the patch changes, the tempo and the ends of the tracks
+        self.assertEqual(len(copy), 3 + 1 + 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
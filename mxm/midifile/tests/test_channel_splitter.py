@@ -0,0 +1,93 @@
+from mxm.midifile import MidiInFile, MidiOutFile, MidiSequence, iter_events
+from mxm.midifile.src.channel_splitter import ChannelSplitter, split_channels
+from mxm.midifile.src.track_merger import to_format_0
+from mxm.midifile.tests.helpers import random_file
+import io, os, tempfile, unittest
+
+
+def channel_events(infile):
+    "The channel events as (tick, type, data), sorted"
+    return sorted(event[1:] for event in iter_events(infile, include=['channel'])
+                  if event[2] != 'end_of_track')
+
+
+class TestChannelSplitter(unittest.TestCase):
+
+    def setUp(self):
+        self.data = random_file(n_notes=200)
+        midi_out = MidiOutFile(io.BytesIO())
+        to_format_0(self.data, midi_out)
+        self.format_0 = midi_out.read_all()
+
+    def test_format_0(self):
+        splitter = split_channels(self.format_0, io.BytesIO())
+        self.assertEqual([0, 1], splitter.channels)
+        split = splitter.read_all()
+        sequence = MidiSequence.from_file(split)
+        self.assertEqual((1, 3), (sequence.format, len(sequence.tracks)))
+        self.assertEqual(channel_events(self.format_0), channel_events(split))
+        for track in (1, 2):
+            channels = set(event[3][0] for event in iter_events(split, tracks=[track], include=['channel'])
+                           if event[2] != 'end_of_track')
+            self.assertEqual({track - 1}, channels)
+        # no channel events in the conductor
+        self.assertEqual(['end_of_track'], [e[2] for e in iter_events(split, tracks=[0])])
+
+    def test_format_1_is_merged(self):
+        split_1 = split_channels(self.data).read_all()
+        split_0 = split_channels(self.format_0).read_all()
+        self.assertEqual(split_0, split_1)
+
+    def test_channel_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pattern = os.path.join(directory, 'channel-%d.mid')
+            split_channels(self.format_0, channel_files=pattern)
+            self.assertEqual(['channel-0.mid', 'channel-1.mid'], sorted(os.listdir(directory)))
+            for channel in (0, 1):
+                path = pattern % channel
+                events = list(iter_events(path))
+                self.assertEqual({0, 1}, set(event[0] for event in events))
+                self.assertEqual({channel}, set(data[0] for track, tick, name, data in events
+                                                if name in ('note_on', 'note_off')))
+
+    def test_running_status(self):
+        midi = MidiOutFile(io.BytesIO())
+        midi.header(format=0, nTracks=1, division=96)
+        midi.start_of_track()
+        midi.note_on(3, 60, 100)
+        midi.update_time(10)
+        midi.note_on(3, 62, 100, use_running_status=True)
+        midi.update_time(0)
+        midi.note_on(4, 62, 100)
+        midi.update_time(10)
+        midi.note_on(4, 62, 0, use_running_status=True)
+        midi.end_of_track()
+        splitter = ChannelSplitter()
+        MidiInFile(splitter, midi.read_all()).read()
+        self.assertEqual([3, 4], splitter.channels)
+        self.assertEqual([(1, 0, 'note_on', (3, 60, 100)), (1, 10, 'note_on', (3, 62, 100)),
+                          (1, 30, 'end_of_track', ()),
+                          (2, 10, 'note_on', (4, 62, 100)), (2, 20, 'note_on', (4, 62, 0)),
+                          (2, 30, 'end_of_track', ())],
+                         list(iter_events(splitter.read_all(), include=['channel', 'tempo'], tracks=[1, 2])))
+
+    def test_select_track(self):
+        midi = MidiOutFile(io.BytesIO())
+        midi.header(format=1, nTracks=2, division=96)
+        for tick in range(0, 960, 96):
+            for track in (0, 1):
+                midi.select_track(track)
+                midi.update_time(tick, relative=False)
+                midi.note_on(track, 60, 100)
+        for track in (0, 1):
+            midi.select_track(track)
+            midi.update_time(960, relative=False)
+            midi.end_of_track()
+        events = [event for event in iter_events(midi.read_all(), include=['note_on'])
+                  if event[2] == 'note_on']
+        self.assertEqual([(track, tick, 'note_on', (track, 60, 100)) for track in (0, 1)
+                          for tick in range(0, 960, 96)], events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+from mxm.midifile import MidiEvents
+from mxm.midifile.src.corpus_parser import parse_corpus, count_tracks
+from mxm.midifile.tests.helpers import in_tests
+import os, os.path, glob, shutil, tempfile, unittest
+
+
+class TestCorpusParser(unittest.TestCase):
+
+    def setUp(self):
+        self.corpus = tempfile.mkdtemp()
+        for midi_in_filename in glob.iglob(in_tests() + 'midifiles/*.mid'):
+            shutil.copy(midi_in_filename, self.corpus)
+        with open(in_tests('midifiles/minimal.mid'), 'rb') as f:
+            data = f.read()
+        os.mkdir(os.path.join(self.corpus, 'bad'))
+        # the file ends in the middle of the second track
+        with open(os.path.join(self.corpus, 'bad', 'truncated.mid'), 'wb') as f:
+            f.write(data[:70])
+        with open(os.path.join(self.corpus, 'bad', 'not-midi.mid'), 'wb') as f:
+            f.write(b'RIFF' + bytes(20))
+
+    def tearDown(self):
+        shutil.rmtree(self.corpus)
+
+    def test_parse_corpus(self):
+        "Bad files are reported, the rest are parsed"
+        results = list(parse_corpus(self.corpus, MidiEvents, collect=count_tracks, processes=2, chunksize=2))
+        self.assertEqual(len(results), 7)
+        errors = {os.path.basename(r.path): r for r in results if r.error}
+        self.assertEqual(sorted(errors), ['not-midi.mid', 'truncated.mid'])
+        self.assertTrue(errors['not-midi.mid'].error.startswith('TypeError'))
+        # the instrument name meta event at 63 is cut off
+        self.assertEqual(errors['truncated.mid'].offset, 63)
+        self.assertTrue(all(r.result for r in results if not r.error))
+
+    def test_ordered(self):
+        "Results come in the order of the files, and the handler is the default result"
+        results = list(parse_corpus(self.corpus, MidiEvents, processes=2, ordered=True))
+        paths = sorted(glob.iglob(os.path.join(self.corpus, '**/*.mid'), recursive=True))
+        self.assertEqual([r.path for r in results], paths)
+        self.assertTrue(all(isinstance(r.result, MidiEvents) for r in results if not r.error))
+
+    def test_unpicklable_results(self):
+        "A result that can not be sent back is an error for that file only"
+        results = list(parse_corpus(self.corpus, SequenceNames, collect=sequence_names, processes=2,
+                                    chunksize=16, zero_copy=True))
+        self.assertEqual(len(results), 7)
+        errors = [r for r in results if r.error and not r.path.endswith(('not-midi.mid', 'truncated.mid'))]
+        self.assertTrue(errors)
+        self.assertTrue(all(r.error.startswith('TypeError') and r.offset is None for r in errors))
+
+    def test_copied_data(self):
+        "Without zero_copy the event data can be kept"
+        results = parse_corpus(self.corpus, SequenceNames, collect=sequence_names, processes=2, ordered=True)
+        names = {os.path.basename(r.path): r.result for r in results}
+        self.assertEqual(names['minimal.mid'], [b'Synth 1'])
+
+
+class SequenceNames(MidiEvents):
+
+    "Keeps the sequence names as they are passed to it"
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.names = []
+
+    def sequence_name(self, text):
+        self.names.append(text)
+
+
+def sequence_names(handler):
+    return handler.names
+
+
+if __name__ == '__main__':
+    
+    unittest.main()
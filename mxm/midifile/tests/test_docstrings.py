@@ -4,28 +4,57 @@ A simple way to make doctests work with unittest and "python3 setup.py test"
 
 import doctest, unittest
 
+import mxm.midifile.src.array_transforms as array_transforms
+import mxm.midifile.src.channel_splitter as channel_splitter
 import mxm.midifile.src.constants as constants
+import mxm.midifile.src.corpus_parser as corpus_parser
 import mxm.midifile.src.data_type_converters as data_type_converters
 import mxm.midifile.src.event_dispatcher as event_dispatcher
+import mxm.midifile.src.event_iterator as event_iterator
 import mxm.midifile.src.midi_events as midi_events
 import mxm.midifile.src.midi_file_parser as midi_file_parser
 import mxm.midifile.src.midi_infile as midi_infile
 import mxm.midifile.src.midi_outfile as midi_outfile
+import mxm.midifile.src.midi_sequence as midi_sequence
+import mxm.midifile.src.midi_to_arrays as midi_to_arrays
 import mxm.midifile.src.midi_to_code as midi_to_code
+import mxm.midifile.src.note_index as note_index
+import mxm.midifile.src.note_pairing as note_pairing
+import mxm.midifile.src.parallel_parser as parallel_parser
 import mxm.midifile.src.raw_instream_file as raw_instream_file
 import mxm.midifile.src.raw_outstream_file as raw_outstream_file
+import mxm.midifile.src.recompress as recompress
+import mxm.midifile.src.stream_parser as stream_parser
+import mxm.midifile.src.tempo_map as tempo_map
+import mxm.midifile.src.timed_events as timed_events
+import mxm.midifile.src.track_merger as track_merger
 
 testSuite = unittest.TestSuite()
 
+testSuite.addTest(doctest.DocTestSuite(channel_splitter))
 testSuite.addTest(doctest.DocTestSuite(constants))
+testSuite.addTest(doctest.DocTestSuite(corpus_parser))
 testSuite.addTest(doctest.DocTestSuite(data_type_converters))
 testSuite.addTest(doctest.DocTestSuite(event_dispatcher))
+testSuite.addTest(doctest.DocTestSuite(event_iterator))
 testSuite.addTest(doctest.DocTestSuite(midi_events))
 testSuite.addTest(doctest.DocTestSuite(midi_file_parser))
 testSuite.addTest(doctest.DocTestSuite(midi_infile))
 testSuite.addTest(doctest.DocTestSuite(midi_outfile))
+testSuite.addTest(doctest.DocTestSuite(midi_sequence))
+if midi_to_arrays.np is not None: # numpy is optional
+    testSuite.addTest(doctest.DocTestSuite(midi_to_arrays))
+    testSuite.addTest(doctest.DocTestSuite(array_transforms))
 testSuite.addTest(doctest.DocTestSuite(midi_to_code))
+testSuite.addTest(doctest.DocTestSuite(note_index))
+testSuite.addTest(doctest.DocTestSuite(note_pairing))
+testSuite.addTest(doctest.DocTestSuite(parallel_parser))
 testSuite.addTest(doctest.DocTestSuite(raw_instream_file))
 testSuite.addTest(doctest.DocTestSuite(raw_outstream_file))
+testSuite.addTest(doctest.DocTestSuite(recompress))
+testSuite.addTest(doctest.DocTestSuite(stream_parser))
+testSuite.addTest(doctest.DocTestSuite(tempo_map))
+testSuite.addTest(doctest.DocTestSuite(timed_events))
+testSuite.addTest(doctest.DocTestSuite(track_merger))
 
 unittest.TextTestRunner(verbosity=1).run(testSuite)
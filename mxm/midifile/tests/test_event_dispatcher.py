@@ -0,0 +1,219 @@
+from mxm.midifile import MidiInFile, MidiOutFile, MidiEvents, iter_events
+from mxm.midifile.src.event_dispatcher import EventDispatcher
+from mxm.midifile.tests.helpers import in_tests, track_file, type_1_file, sysex_packets_file, AbsoluteTimeRecorder
+import io, glob, unittest
+
+
+class AllEventsDispatcher(EventDispatcher):
+
+    skip_unused_events = False
+
+
+class TestSkipUnusedEvents(unittest.TestCase):
+
+    def files(self):
+        yield type_1_file(n_tracks=3, n_notes=20)
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            yield path
+
+    def test_same_events_and_times(self):
+        for infile in self.files():
+            skipping = AbsoluteTimeRecorder()
+            midi_in = MidiInFile(skipping, infile)
+            self.assertIsNone(midi_in.parser.dispatch.meta_table[0x01])
+            midi_in.read()
+            everything = AbsoluteTimeRecorder()
+            midi_in = MidiInFile(everything, infile)
+            midi_in.parser.dispatch = AllEventsDispatcher(everything)
+            midi_in.read()
+            self.assertEqual(everything.events, skipping.events)
+
+    def test_parallel(self):
+        infile = type_1_file(n_tracks=3, n_notes=20)
+        expected = AbsoluteTimeRecorder()
+        MidiInFile(expected, infile).read()
+        parallel = AbsoluteTimeRecorder()
+        MidiInFile(parallel, infile).read_parallel(processes=2)
+        self.assertEqual(expected.events, parallel.events)
+
+    def test_copy(self):
+        # MidiOutFile does not override all events, but copies the file
+        data = type_1_file(n_tracks=2, n_notes=20)
+        out = io.BytesIO()
+        midi_out = MidiOutFile(out)
+        MidiInFile(midi_out, data).read()
+        self.assertEqual(data, out.getvalue())
+
+
+class Transposer(MidiOutFile):
+
+    def note_on(self, channel, note, velocity, use_running_status=False):
+        MidiOutFile.note_on(self, channel, (note + 12) % 128, velocity, use_running_status)
+
+    def note_off(self, channel, note, velocity, use_running_status=False):
+        MidiOutFile.note_off(self, channel, (note + 12) % 128, velocity, use_running_status)
+
+
+class NoPassthroughDispatcher(EventDispatcher):
+
+    passthrough_raw_events = False
+
+
+class TestPassthrough(unittest.TestCase):
+
+    def files(self):
+        yield type_1_file(n_tracks=2, n_notes=20)
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            with open(path, 'rb') as f:
+                yield f.read()
+
+    def transpose(self, data, dispatcher=None):
+        out = io.BytesIO()
+        midi_out = Transposer(out)
+        midi_in = MidiInFile(midi_out, data)
+        if dispatcher is not None:
+            midi_in.parser.dispatch = dispatcher(midi_out)
+        midi_in.read()
+        return out.getvalue()
+
+    def test_copy_verbatim(self):
+        for data in self.files():
+            out = io.BytesIO()
+            midi_out = MidiOutFile(out)
+            dispatch = MidiInFile(midi_out, data).parser.dispatch
+            self.assertEqual(dispatch.status_table[0x90][1].__name__, '_raw')
+            MidiInFile(midi_out, data).read()
+            self.assertEqual(data, out.getvalue())
+
+    def test_transposed_as_without_passthrough(self):
+        for data in self.files():
+            self.assertEqual(self.transpose(data, NoPassthroughDispatcher), self.transpose(data))
+
+    def test_trusted(self):
+        data = type_1_file(n_tracks=2, n_notes=20)
+        out = io.BytesIO()
+        MidiInFile(MidiOutFile(out, trusted=True), data).read()
+        self.assertEqual(data, out.getvalue())
+
+    def test_sysex_packets(self):
+        # split sysex events and escapes are copied byte for byte
+        data = sysex_packets_file()
+        for zero_copy in (False, True):
+            midi_out = MidiOutFile()
+            MidiInFile(midi_out, data, zero_copy=zero_copy).read()
+            self.assertEqual(data, midi_out.read_all())
+
+
+class TestEventFilters(unittest.TestCase):
+
+    def read(self, infile, **filters):
+        recorder = AbsoluteTimeRecorder()
+        MidiInFile(recorder, infile, **filters).read()
+        return recorder.events
+
+    def test_filtered_events_and_times(self):
+        infile = type_1_file(n_tracks=3, n_notes=20)
+        everything = self.read(infile)
+        for filters, names in [
+                (dict(include=['tempo', 'end_of_track']), {'tempo', 'end_of_track'}),
+                (dict(include=['meta']), {'tempo', 'end_of_track'}),
+                (dict(exclude=['channel']), {'tempo', 'end_of_track'}),
+                (dict(include=['channel'], exclude=['note_on']), {'patch_change', 'end_of_track'}),
+                (dict(exclude=['end_of_track', 'note_on']), {'tempo', 'patch_change', 'end_of_track'}),
+            ]:
+            expected = [event for event in everything if event[1] in names]
+            self.assertEqual(expected, self.read(infile, **filters))
+
+    def test_parallel(self):
+        infile = type_1_file(n_tracks=3, n_notes=20)
+        expected = self.read(infile, include=['patch_change', 'end_of_track'])
+        recorder = AbsoluteTimeRecorder()
+        midi_in = MidiInFile(recorder, infile, include=['patch_change', 'end_of_track'])
+        midi_in.read_parallel(processes=2)
+        self.assertEqual(expected, recorder.events)
+
+    def test_filtered_midi_out(self):
+        "A filtered copy has all the tracks, with only the included events"
+        infile = type_1_file(n_tracks=3, n_notes=20)
+        midi_out = MidiOutFile(io.BytesIO())
+        MidiInFile(midi_out, infile, include=['channel'], exclude=['end_of_track']).read()
+        events = list(iter_events(midi_out.read_all()))
+        self.assertEqual(events, [event for event in iter_events(infile) if event[2] != 'tempo'])
+
+    def test_unknown_event(self):
+        with self.assertRaises(ValueError):
+            MidiInFile(AbsoluteTimeRecorder(), type_1_file(1, 1), include=['tempi'])
+
+
+class EventPrinter(MidiEvents):
+
+    "Records the time updates and some of the events"
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.calls = []
+
+    def update_time(self, new_time=0, relative=1):
+        self.calls.append(('update_time', new_time))
+
+    def note_on(self, channel, note, velocity, use_running_status=False):
+        self.calls.append(('note_on', channel, note, velocity))
+
+    def continuous_controller(self, channel, controller, value, use_running_status=False):
+        self.calls.append(('continuous_controller', channel, controller, value))
+
+    def tempo(self, value):
+        self.calls.append(('tempo', value))
+
+    def meta_event(self, meta_type, data):
+        self.calls.append(('meta_event', meta_type, bytes(data)))
+
+    def sysex_event(self, data):
+        self.calls.append(('sysex_event', bytes(data)))
+
+
+class TestDispatchMethods(unittest.TestCase):
+
+    def test_time_is_left_alone(self):
+        printer = EventPrinter()
+        dispatch = EventDispatcher(printer)
+        dispatch.channel_message(0x9, 1, bytes([60, 100]))
+        dispatch.meta_event(0x51, bytes([7, 161, 32]))
+        dispatch.system_commons(0xF3, bytes([2]))
+        self.assertEqual(printer.calls, [('note_on', 1, 60, 100), ('tempo', 500000)])
+
+    def test_dispatch_meta_events(self):
+        printer = EventPrinter()
+        midi_in = MidiInFile(printer, track_file(bytes([0, 0xFF, 0x51, 3, 7, 161, 32, 0, 0xFF, 0x2F, 0])),
+                             exclude=['tempo'])
+        midi_in.parser.dispatch.dispatch_meta_events = 0
+        midi_in.read()
+        # the filter is kept when the tables are rebuilt
+        self.assertEqual(printer.calls, [('update_time', 0), ('meta_event', 0x2F, b'')])
+
+    def test_dispatch_continuos_controllers(self):
+        class ControllerDispatcher(EventDispatcher):
+            def continuous_controllers(self, channel, controller, value, use_running_status):
+                self.event_handler.calls.append(('controller', controller))
+        printer = EventPrinter()
+        dispatch = ControllerDispatcher(printer)
+        dispatch.status_table[0xB0][1](5, 5, 0xB0, bytes([7, 100]), False)
+        dispatch.dispatch_continuos_controllers = 0
+        dispatch.status_table[0xB0][1](5, 10, 0xB0, bytes([7, 100]), False)
+        self.assertEqual(printer.calls, [('update_time', 5), ('controller', 7),
+                                         ('update_time', 5), ('continuous_controller', 0, 7, 100)])
+
+    def test_sysex_escape(self):
+        # a sysex split in two packets, where the second is an F7 escape
+        track = bytes([0, 0xF0, 3, 0x43, 0x12, 0x00, 10, 0xF7, 3, 0x43, 0x12, 0xF7,
+                       0, 0x90, 60, 100, 0, 0xFF, 0x2F, 0])
+        printer = EventPrinter()
+        MidiInFile(printer, track_file(track)).read()
+        self.assertEqual([call for call in printer.calls if call[0] != 'update_time'],
+                         [('sysex_event', bytes([0x43, 0x12, 0x00])),
+                          ('sysex_event', bytes([0x43, 0x12])),
+                          ('note_on', 0, 60, 100)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from mxm.midifile import MidiOutFile, iter_events
+from mxm.midifile.src import event_iterator
+from mxm.midifile.src.event_iterator import EventCollector, iter_parser_events
+from mxm.midifile.src.raw_instream_file import RawInstreamFile
+from mxm.midifile.src.midi_file_parser import MidiFileParser
+from mxm.midifile.tests.helpers import track_file, type_1_file
+import os, tempfile, unittest
+
+
+def parser_events(data, batch_size, tracks=None):
+    parser = MidiFileParser(RawInstreamFile(data), EventCollector())
+    parser.readMThdChunk()
+    return list(iter_parser_events(parser, tracks=tracks, batch_size=batch_size))
+
+
+class TestBatches(unittest.TestCase):
+
+    def test_same_events_for_any_batch_size(self):
+        data = type_1_file(n_tracks=3, n_notes=100)
+        events = parser_events(data, 1)
+        for batch_size in (2, 3, 7, 100, 10**6):
+            self.assertEqual(parser_events(data, batch_size), events)
+        self.assertEqual(list(iter_events(data)), events)
+
+    def test_selected_tracks(self):
+        data = type_1_file(n_tracks=3, n_notes=100)
+        self.assertEqual(parser_events(data, 100, tracks=[2]),
+                         [event for event in parser_events(data, 1) if event[0] == 2])
+
+    def test_lazy(self):
+        "Only a batch is parsed ahead of the events used"
+        raw_in = RawInstreamFile(type_1_file(n_tracks=1, n_notes=10000))
+        parser = MidiFileParser(raw_in, EventCollector())
+        parser.readMThdChunk()
+        events = iter_parser_events(parser, batch_size=100)
+        next(e for e in events if e[2] == 'note_on')
+        self.assertLess(raw_in.getCursor(), 300)
+
+    def test_events_before_error(self):
+        "The events before an error in a batch are yielded before it is raised"
+        track = bytes([0, 0x90, 60, 100, 10, 0x80, 60, 0, 0, 0xFF, 0x51, 3, 7])
+        events = iter_events(track_file(track))
+        self.assertEqual([e[2] for e in (next(events), next(events))], ['note_on', 'note_off'])
+        with self.assertRaises(ValueError):
+            next(events)
+
+
+class TestClose(unittest.TestCase):
+
+    def setUp(self):
+        midi = MidiOutFile()
+        midi.header(format=0, nTracks=1, division=96)
+        midi.start_of_track()
+        midi.note_on(0, 60, 100)
+        midi.update_time(96)
+        midi.note_off(0, 60, 0)
+        midi.end_of_track()
+        fd, self.path = tempfile.mkstemp(suffix='.mid')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(midi.read_all())
+        self.opened = []
+        original = event_iterator.RawInstreamFile
+        def recording(*args, **kwargs):
+            raw_in = original(*args, **kwargs)
+            self.opened.append(raw_in)
+            return raw_in
+        event_iterator.RawInstreamFile = recording
+        self.addCleanup(setattr, event_iterator, 'RawInstreamFile', original)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_closed_when_done(self):
+        events = list(iter_events(self.path, zero_copy=True))
+        self.assertEqual(len(events), 3)
+        self.assertIsNone(self.opened[0]._mmap)
+
+    def test_closed_when_stopped_early(self):
+        events = iter_events(self.path, zero_copy=True)
+        next(events)
+        self.assertIsNotNone(self.opened[0]._mmap)
+        events.close()
+        self.assertIsNone(self.opened[0]._mmap)
+
+    def test_closed_on_error(self):
+        with open(self.path, 'r+b') as f:
+            f.truncate(30)
+        with self.assertRaises(ValueError):
+            list(iter_events(self.path, zero_copy=True))
+        self.assertIsNone(self.opened[0]._mmap)
+
+
+if __name__ == '__main__':
+
+    unittest.main()
@@ -0,0 +1,124 @@
+from mxm.midifile import MidiInFile, MidiEvents, iter_events
+from mxm.midifile.tests.helpers import track_file
+import unittest
+
+
+END_OF_TRACK = bytes([0, 0xFF, 0x2F, 0])
+
+
+def events(*tracks):
+    return [event[1:] for event in iter_events(track_file(*tracks))]
+
+
+class TestRunningStatus(unittest.TestCase):
+
+    def test_channel_events(self):
+        track = bytes([0, 0x90, 60, 100, 10, 62, 100, 0, 0x80, 60, 0, 0, 62, 0]) + END_OF_TRACK
+        self.assertEqual(events(track), [
+            (0, 'note_on', (0, 60, 100)), (10, 'note_on', (0, 62, 100)),
+            (10, 'note_off', (0, 60, 0)), (10, 'note_off', (0, 62, 0)), (10, 'end_of_track', ())])
+
+    def test_cancelled_by_meta_event(self):
+        track = bytes([0, 0x90, 60, 100, 0, 0xFF, 0x51, 3, 7, 161, 32, 0, 62, 100]) + END_OF_TRACK
+        with self.assertRaises(ValueError):
+            events(track)
+
+    def test_cancelled_by_sysex_event(self):
+        track = bytes([0, 0x90, 60, 100, 0, 0xF0, 2, 0x43, 0xF7, 0, 62, 100]) + END_OF_TRACK
+        with self.assertRaises(ValueError):
+            events(track)
+
+    def test_new_status_after_meta_event(self):
+        track = bytes([0, 0x90, 60, 100, 0, 0xFF, 0x51, 3, 7, 161, 32, 0, 0x91, 62, 100, 0, 64, 100]) + END_OF_TRACK
+        self.assertEqual([event[1:] for event in events(track)], [
+            ('note_on', (0, 60, 100)), ('tempo', (500000,)), ('note_on', (1, 62, 100)),
+            ('note_on', (1, 64, 100)), ('end_of_track', ())])
+
+    def test_not_across_tracks(self):
+        first = bytes([0, 0x90, 60, 100]) + END_OF_TRACK
+        second = bytes([0, 62, 100]) + END_OF_TRACK
+        with self.assertRaises(ValueError):
+            events(first, second)
+
+    def test_use_running_status_flag(self):
+        class Recorder(MidiEvents):
+            def __init__(self):
+                MidiEvents.__init__(self)
+                self.flags = []
+            def note_on(self, channel, note, velocity, use_running_status=False):
+                self.flags.append(use_running_status)
+        recorder = Recorder()
+        MidiInFile(recorder, track_file(bytes([0, 0x90, 60, 100, 0, 62, 100]) + END_OF_TRACK)).read()
+        self.assertEqual(recorder.flags, [False, True])
+
+
+class TestSystemCommonEvents(unittest.TestCase):
+
+    def test_events(self):
+        track = bytes([0, 0xF1, 0x35, 1, 0xF2, 1, 2, 1, 0xF3, 5, 1, 0xF6]) + END_OF_TRACK
+        self.assertEqual(events(track), [
+            (0, 'midi_time_code', (3, 5)), (1, 'song_position_pointer', (257,)),
+            (2, 'song_select', (5,)), (3, 'tuning_request', ()), (3, 'end_of_track', ())])
+
+    def test_cancels_running_status(self):
+        track = bytes([0, 0x90, 60, 100, 0, 0xF3, 5, 0, 62, 100]) + END_OF_TRACK
+        with self.assertRaises(ValueError):
+            events(track)
+
+
+class TestSysexLengths(unittest.TestCase):
+
+    def test_sysex(self):
+        track = bytes([0, 0xF0, 4, 0x43, 0x12, 0x00, 0xF7, 0, 0x90, 60, 100]) + END_OF_TRACK
+        self.assertEqual(events(track), [
+            (0, 'sysex_event', (b'\x43\x12\x00',)), (0, 'note_on', (0, 60, 100)), (0, 'end_of_track', ())])
+
+    def test_long_sysex(self):
+        data = bytes(range(100)) * 3
+        # the length is a 2 byte varlen
+        track = bytes([0, 0xF0, 0x82, 0x2D]) + data + bytes([0xF7]) + END_OF_TRACK
+        self.assertEqual(events(track), [(0, 'sysex_event', (data,)), (0, 'end_of_track', ())])
+
+    def test_sysex_without_terminator(self):
+        track = bytes([0, 0xF0, 2, 0x43, 0x12, 0, 0x90, 60, 100]) + END_OF_TRACK
+        self.assertEqual(events(track)[:2], [
+            (0, 'sysex_event', (b'\x43\x12',)), (0, 'note_on', (0, 60, 100))])
+
+    def test_escape(self):
+        track = bytes([0, 0xF7, 3, 0x90, 60, 100, 5, 0x90, 62, 100]) + END_OF_TRACK
+        self.assertEqual(events(track), [
+            (0, 'sysex_event', (b'\x90\x3c\x64',)), (5, 'note_on', (0, 62, 100)), (5, 'end_of_track', ())])
+
+    def test_past_end_of_track(self):
+        with self.assertRaises(ValueError):
+            events(bytes([0, 0xF0, 10, 0x43, 0x12, 0xF7]))
+
+
+class TestTruncatedTracks(unittest.TestCase):
+
+    def assertTruncated(self, track):
+        data = track_file(track)
+        for end in range(22, len(data)):
+            with self.assertRaises(ValueError):
+                list(iter_events(data[:end]))
+
+    def test_channel_events(self):
+        self.assertTruncated(bytes([0x81, 0x00, 0x90, 60, 100, 0, 0xC0, 5]) + END_OF_TRACK)
+
+    def test_meta_and_sysex_events(self):
+        self.assertTruncated(bytes([0, 0xFF, 0x51, 3, 7, 161, 32, 0, 0xF0, 0x81, 0, 0x43]))
+
+    def test_cursor_at_failed_event(self):
+        data = track_file(bytes([0, 0x90, 60, 100, 0, 0x90, 62]))
+        midi_in = MidiInFile(MidiEvents(), data)
+        with self.assertRaises(ValueError):
+            midi_in.read()
+        self.assertEqual(midi_in.raw_in.getCursor(), len(data) - 3)
+
+    def test_truncated_header(self):
+        with self.assertRaises(ValueError):
+            MidiInFile(MidiEvents(), b'MThd\x00\x00\x00\x06\x00').read()
+
+
+if __name__ == '__main__':
+    unittest.main()
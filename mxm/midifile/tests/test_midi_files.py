@@ -1,4 +1,5 @@
-from mxm.midifile import MidiInFile, MidiOutFile, testdir
+from mxm.midifile import MidiInFile, MidiOutFile
+from mxm.midifile.tests.helpers import in_tests
 import io, glob, unittest
 
 
@@ -8,7 +9,7 @@ class TestMidiFiles(unittest.TestCase):
         """
         Testing that the the midi files in 'tests/midifiles' can be parsed without errors.
         """
-        midi_dir = testdir() + 'midifiles/*.mid'
+        midi_dir = in_tests() + 'midifiles/*.mid'
         for i, midi_in_filename in enumerate(glob.iglob(midi_dir, recursive=True)):
             midi_out = MidiOutFile(io.BytesIO())
             midi_in = MidiInFile(midi_out, midi_in_filename)
@@ -16,7 +17,54 @@ class TestMidiFiles(unittest.TestCase):
             midi_out.close()
         self.assertTrue(i == 4) # there are 5 files being tested
 
+    def test_midifiles_zero_copy(self):
+        """
+        Testing that memory mapped, zero copy parsing writes the same files as normal parsing.
+        """
+        midi_dir = in_tests() + 'midifiles/*.mid'
+        for midi_in_filename in glob.iglob(midi_dir, recursive=True):
+            outputs = []
+            for zero_copy in (False, True):
+                midi_out = MidiOutFile(io.BytesIO())
+                midi_in = MidiInFile(midi_out, midi_in_filename, zero_copy=zero_copy)
+                midi_in.read()
+                outputs.append(midi_out.read_all())
+                midi_in.close()
+                midi_out.close()
+            self.assertEqual(outputs[0], outputs[1])
+
+    def test_zero_copy_file_objects(self):
+        """
+        Testing that zero copy reads file objects that can not be memory mapped.
+        """
+        with open(in_tests('midifiles/minimal.mid'), 'rb') as f:
+            data = f.read()
+        outputs = []
+        for infile in (data, io.BytesIO(data)):
+            midi_out = MidiOutFile(io.BytesIO())
+            midi_in = MidiInFile(midi_out, infile, zero_copy=True)
+            midi_in.read()
+            outputs.append(midi_out.read_all())
+            midi_in.close()
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], data)
+
+    def test_midifiles_trusted(self):
+        """
+        Testing that the unchecked, trusted MidiOutFile writes the same files as the checked one.
+        """
+        midi_dir = in_tests() + 'midifiles/*.mid'
+        for midi_in_filename in glob.iglob(midi_dir, recursive=True):
+            outputs = []
+            for out_kw in ({}, {'trusted': True}, {'trusted': True, 'validate': True}):
+                midi_out = MidiOutFile(io.BytesIO(), **out_kw)
+                MidiInFile(midi_out, midi_in_filename).read()
+                outputs.append(midi_out.read_all())
+                midi_out.close()
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertEqual(outputs[0], outputs[2])
+
 
 if __name__ == '__main__':
     
-    unittest.main()
\ No newline at end of file
+    unittest.main()
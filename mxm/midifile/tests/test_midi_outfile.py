@@ -0,0 +1,255 @@
+from mxm.midifile import MidiInFile, MidiOutFile, iter_events, exampledir
+from mxm.midifile.src.midi_outfile import validate_track, _SpooledTrack
+from mxm.midifile.src.raw_outstream_file import RawOutstreamFile
+from mxm.midifile.src.recompress import recompress
+from mxm.midifile.tests.helpers import in_tests, random_file
+import io, tracemalloc, unittest
+
+
+class TestTrackEncoder(unittest.TestCase):
+
+    def write(self, trusted):
+        midi = MidiOutFile(io.BytesIO(), trusted=trusted)
+        midi.header(format=0, nTracks=1, division=96)
+        midi.start_of_track()
+        for delta in self.deltas:
+            midi.update_time(delta)
+            midi.note_on(1, 60, 100)
+            midi.update_time(0)
+            midi.pitch_bend(2, 8192)
+            midi.patch_change(3, 5, use_running_status=False)
+            midi.text(b'x')
+        midi.tuning_request()
+        midi.update_time(0)
+        midi.end_of_track()
+        return midi.read_all()
+
+    def setUp(self):
+        # the edges of the 1, 2, 3 and 4 byte varlens
+        self.deltas = [0, 1, 0x7F, 0x80, 0x3FFF, 0x4000, 0x1FFFFF, 0x200000, 0xFFFFFFF]
+
+    def test_deltas(self):
+        for trusted in (False, True):
+            data = self.write(trusted)
+            ticks = [tick for track, tick, name, args in iter_events(data) if name == 'note_on']
+            expected = []
+            tick = 0
+            for delta in self.deltas:
+                tick += delta
+                expected.append(tick)
+            self.assertEqual(expected, ticks)
+
+    def test_trusted_is_the_same(self):
+        self.assertEqual(self.write(False), self.write(True))
+        events = [event[2:] for event in iter_events(self.write(True))][:4]
+        self.assertEqual([('note_on', (1, 60, 100)), ('pitch_bend', (2, 8192)),
+                          ('patch_change', (3, 5)), ('text', (b'x',))], events)
+
+    def test_trusted_subclass(self):
+        "Trusted mode does not replace the channel events a subclass overrides"
+        transposer = Transposer(io.BytesIO(), trusted=True)
+        MidiInFile(transposer, in_tests('midifiles/minimal.mid')).read()
+        notes = [args for track, tick, name, args in iter_events(transposer.read_all()) if name == 'note_on']
+        self.assertEqual(notes, [(0, 24, 127)])
+        self.assertEqual(transposer.note_off.__func__, MidiOutFile._trusted_note_off)
+
+
+class Transposer(MidiOutFile):
+
+    "Transposes the note_ons an octave down"
+
+    def note_on(self, channel=0, note=0x40, velocity=0x40, use_running_status=False):
+        MidiOutFile.note_on(self, channel, note - 12, velocity, use_running_status)
+
+
+class TestValidateTrack(unittest.TestCase):
+
+    def test_valid_files(self):
+        "Tracks that parse are valid, as far as the checks go"
+        data = random_file()
+        midi_in = MidiInFile(MidiOutFile(), data)
+        midi_in.parser.parseMThdChunk()
+        for chunk in midi_in.parser.indexMTrkChunks():
+            validate_track(data[chunk.offset + 8:chunk.offset + 8 + chunk.length])
+
+    def test_first_error(self):
+        "The error of the first illegal event is raised"
+        track = bytes([0, 0x90, 64, 100, 0, 0xFF, 0x59, 2, 200, 0, 0, 0xB0, 7, 200])
+        with self.assertRaisesRegex(AssertionError, 'sf must be'):
+            validate_track(track)
+        track = bytes([0, 0xB0, 7, 200, 0, 0xFF, 0x59, 2, 200, 0])
+        with self.assertRaisesRegex(AssertionError, 'Illegal value: 200'):
+            validate_track(track)
+
+    def test_sysex(self):
+        validate_track(bytes([0, 0xF0, 3, 0x43, 0x12, 0xF7]))
+        with self.assertRaisesRegex(AssertionError, 'out of range'):
+            validate_track(bytes([0, 0xF0, 3, 0x43, 0x92, 0xF7]))
+
+
+
+class Unseekable(io.RawIOBase):
+
+    "A pipe like file, that can only be written to"
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+class Discard(Unseekable):
+
+    "Forgets what is written"
+
+    def write(self, data):
+        return len(data)
+
+
+def write_tracks(midi_out, n_events=30000, n_tracks=2):
+    midi_out.header(format=1, nTracks=n_tracks, division=96)
+    for track in range(n_tracks):
+        midi_out.start_of_track(track)
+        for i in range(n_events):
+            midi_out.update_time(i % 300)
+            midi_out.note_on(track, i % 128, 100)
+        midi_out.update_time(0)
+        midi_out.end_of_track()
+    midi_out.eof()
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        midi_out = MidiOutFile(io.BytesIO())
+        write_tracks(midi_out)
+        self.expected = midi_out.read_all()
+
+    def test_seekable(self):
+        midi_out = MidiOutFile(io.BytesIO(), streaming=True)
+        write_tracks(midi_out)
+        self.assertEqual(self.expected, midi_out.read_all())
+
+    def test_unseekable_spills(self):
+        out = Unseekable()
+        midi_out = MidiOutFile(out, streaming=True, spill_size=1000)
+        write_tracks(midi_out)
+        self.assertEqual(self.expected, bytes(out.data))
+
+    def test_several_open_tracks(self):
+        midi_out = MidiOutFile(io.BytesIO(), streaming=True)
+        midi_out.header(format=1, nTracks=2, division=96)
+        for i in range(20000):
+            for track in (0, 1):
+                midi_out.select_track(track)
+                midi_out.update_time(i, relative=False)
+                midi_out.note_on(track, 60, 100)
+        for track in (0, 1):
+            midi_out.select_track(track)
+            midi_out.end_of_track()
+        events = list(iter_events(midi_out.read_all()))
+        self.assertEqual(40002, len(events))
+        self.assertEqual((1, 19999, 'note_on', (1, 60, 100)), events[-2])
+
+    def test_direct_track_must_end_first(self):
+        midi_out = MidiOutFile(io.BytesIO(), streaming=True)
+        midi_out.select_track(0)
+        midi_out.select_track(1)
+        self.assertRaises(ValueError, midi_out.end_of_track)
+
+    def test_no_other_writes_during_direct_track(self):
+        "Nothing else can be written to the file while a track is written directly to it"
+        midi_out = MidiOutFile(io.BytesIO(), streaming=True)
+        midi_out.header(format=1, nTracks=2, division=96)
+        midi_out.start_of_track()
+        midi_out.note_on(0, 60, 100)
+        track = bytes([0, 0xFF, 0x2F, 0])
+        self.assertRaises(ValueError, midi_out.write_track_chunk, track)
+        self.assertRaises(ValueError, midi_out.header)
+        # a track that is not streamed can not end either
+        midi_out.streaming = False
+        midi_out.select_track(1)
+        self.assertRaises(ValueError, midi_out.end_of_track)
+        midi_out.select_track(0)
+        midi_out.end_of_track()
+        midi_out.select_track(1)
+        midi_out.end_of_track()
+        midi_out.write_track_chunk(track)
+        events = list(iter_events(midi_out.read_all()))
+        self.assertEqual([(0, 0, 'note_on', (0, 60, 100)), (0, 0, 'end_of_track', ()),
+                          (1, 0, 'end_of_track', ()), (2, 0, 'end_of_track', ())], events)
+
+    def test_chunk_size(self):
+        "Tracks of 4 GiB or more raise instead of wrapping the length"
+        class Huge:
+            def tell(self):
+                return 1 << 32
+        spooled = _SpooledTrack(1000)
+        spooled.spool.close()
+        spooled.spool = Huge()
+        out = io.BytesIO()
+        self.assertRaises(ValueError, spooled.close, RawOutstreamFile(out))
+        self.assertEqual(b'', out.getvalue())
+
+    def test_bounded_memory(self):
+        # a track of about 600 KB, that is spilled to a temporary file
+        tracemalloc.start()
+        midi_out = MidiOutFile(Discard(), streaming=True, spill_size=1 << 17)
+        write_tracks(midi_out, n_events=150000, n_tracks=1)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertLess(peak, 1 << 19)
+
+    def test_no_validate(self):
+        self.assertRaises(ValueError, MidiOutFile, io.BytesIO(), validate=True, streaming=True)
+
+
+
+class TestRunningStatus(unittest.TestCase):
+
+    def test_recompress(self):
+        data = random_file()
+        compressed = recompress(data)
+        self.assertLess(len(compressed), len(data) * 0.85)
+        self.assertEqual(list(iter_events(data)), list(iter_events(compressed)))
+        # nothing more to gain
+        self.assertEqual(compressed, recompress(compressed))
+
+    def test_files_with_running_status(self):
+        for path in (exampledir('midi-in/bach_847.mid'), in_tests('midifiles/ableton-glissando.mid')):
+            with open(path, 'rb') as f:
+                data = f.read()
+            compressed = recompress(data)
+            self.assertLessEqual(len(compressed), len(data))
+            self.assertEqual(list(iter_events(data)), list(iter_events(compressed)))
+
+    def test_open_tracks_keep_their_status(self):
+        midi_out = MidiOutFile(auto_running_status=True)
+        midi_out.header(format=1, nTracks=2, division=96)
+        for i in range(3):
+            for track in (0, 1):
+                midi_out.select_track(track)
+                midi_out.note_on(track, 60 + i, 100)
+        for track in (0, 1):
+            midi_out.select_track(track)
+            midi_out.end_of_track()
+        data = midi_out.read_all()
+        # 3 byte status event and 2 two byte running status events per track
+        self.assertEqual(2 * (8 + 4 + 3 + 3 + 4), len(data) - 14)
+        self.assertEqual(6, len([e for e in iter_events(data, include=['note_on']) if e[2] == 'note_on']))
+
+    def test_streaming(self):
+        expected = MidiOutFile(auto_running_status=True)
+        write_tracks(expected)
+        midi_out = MidiOutFile(io.BytesIO(), auto_running_status=True, streaming=True)
+        write_tracks(midi_out)
+        self.assertEqual(expected.read_all(), midi_out.read_all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from mxm.midifile import MidiInFile, MidiOutFile, iter_events
+from mxm.midifile.src.midi_sequence import MidiSequence
+from mxm.midifile.tests.helpers import in_tests, type_1_file, meta_and_sysex_file, sysex_packets_file, AbsoluteTimeRecorder
+import io, glob, unittest
+
+
+class TestMidiSequence(unittest.TestCase):
+
+    def files(self):
+        yield type_1_file(n_tracks=3, n_notes=20)
+        yield meta_and_sysex_file()
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            with open(path, 'rb') as f:
+                yield f.read()
+
+    def test_same_events_as_iter_events(self):
+        for data in self.files():
+            sequence = MidiSequence.from_file(data)
+            self.assertEqual(list(iter_events(data)), list(sequence))
+
+    def test_replay(self):
+        for data in self.files():
+            expected = AbsoluteTimeRecorder()
+            MidiInFile(expected, data).read()
+            replayed = AbsoluteTimeRecorder()
+            MidiSequence.from_file(data).replay(replayed)
+            self.assertEqual(expected.events, replayed.events)
+
+    def test_write(self):
+        for data in self.files():
+            sequence = MidiSequence.from_file(data)
+            midi_out = MidiOutFile(io.BytesIO())
+            sequence.replay(midi_out)
+            copy = MidiSequence.from_file(midi_out.read_all())
+            self.assertEqual(list(sequence), list(copy))
+
+    def test_write_sysex_packets(self):
+        "Split sysex events and escapes are written as they were in the file"
+        data = sysex_packets_file()
+        sequence = MidiSequence.from_file(data)
+        self.assertEqual(sequence.tracks[0].raw_event(1), (10, 0xF7, bytes([0x43, 0x12, 0xF7])))
+        midi_out = MidiOutFile(io.BytesIO())
+        sequence.replay(midi_out)
+        self.assertEqual(midi_out.read_all(), data)
+
+    def test_read_parallel(self):
+        data = type_1_file(n_tracks=3, n_notes=20)
+        sequence = MidiSequence()
+        MidiInFile(sequence, data).read_parallel(processes=2)
+        self.assertEqual(list(iter_events(data)), list(sequence))
+
+    def test_slice(self):
+        data = type_1_file(n_tracks=2, n_notes=20)
+        sequence = MidiSequence.from_file(data)
+        part = sequence.slice(240, 600)
+        events = [e for e in part if e[2] != 'end_of_track']
+        expected = [e for e in sequence if 240 <= e[1] < 600 and e[2] != 'end_of_track']
+        self.assertEqual(expected, events)
+        self.assertEqual([e[1] for e in part if e[2] == 'end_of_track'], [240, 600, 600])
+        # the raw events are kept too
+        self.assertEqual(part.tracks[1].raw_event(0), (240, 0x90, bytes([1, 0])))
+
+    def test_slice_payloads(self):
+        "Slices in the middle of the meta and sysex events keep their data"
+        sequence = MidiSequence.from_file(meta_and_sysex_file())
+        for start, end in [(0, 1), (0, 20000), (1, 20001), (20000, None), (10, 3000005), (0, None)]:
+            part = sequence.slice(start, end)
+            expected = [e for e in sequence if start <= e[1] and (end is None or e[1] < end)
+                        and e[2] != 'end_of_track']
+            self.assertEqual(expected, [e for e in part if e[2] != 'end_of_track'])
+            for track in part.tracks:
+                for i in range(len(track)):
+                    self.assertEqual(track.raw_event(i)[0], track.ticks[i])
+
+    def test_filters(self):
+        data = type_1_file(n_tracks=2, n_notes=20)
+        sequence = MidiSequence.from_file(data, include=['meta'], tracks=[0, 2])
+        self.assertEqual([e[2] for e in sequence], ['tempo', 'end_of_track', 'end_of_track'])
+
+
+if __name__ == '__main__':
+    unittest.main()
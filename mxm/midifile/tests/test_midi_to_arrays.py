@@ -0,0 +1,86 @@
+from mxm.midifile import MidiInFile, MidiEvents
+from mxm.midifile.src.midi_to_arrays import MidiToArrays, np
+from mxm.midifile.src.parallel_parser import parse_track_chunk
+from mxm.midifile.tests.helpers import in_tests, type_1_file
+import glob, unittest
+
+
+def raw_events(data):
+    "The (track, tick, status, data) of the events, from the parallel parser"
+    midi_in = MidiInFile(MidiEvents(), data)
+    for chunk in midi_in.chunk_index():
+        recorded, exception = parse_track_chunk((data[chunk.offset:chunk.offset + 8 + chunk.length], None, None))
+        events = iter(recorded)
+        tick = 0
+        for delta in events:
+            status = next(events)
+            next(events)
+            tick += delta
+            if status == 0xFF:
+                meta_type = next(events)
+                yield chunk.track, tick, status, bytes([meta_type]) + next(events)
+            else:
+                yield chunk.track, tick, status, next(events)
+
+
+@unittest.skipIf(np is None, 'needs numpy')
+class TestMidiToArrays(unittest.TestCase):
+
+    def files(self):
+        yield type_1_file(n_tracks=3, n_notes=20)
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            with open(path, 'rb') as f:
+                yield f.read()
+
+    def rows(self, arrays):
+        for i, event in enumerate(arrays.table):
+            track, tick, status = int(event['track']), int(event['tick']), int(event['status'])
+            if status == 0xFF:
+                data = bytes([event['data1']]) + arrays.event_data(i)
+            elif status in (0xF0, 0xF7):
+                data = arrays.event_data(i)
+            else:
+                data = bytes([event['data1'], event['data2']])
+            yield track, tick, status, data
+
+    def test_same_events(self):
+        for data in self.files():
+            arrays = MidiToArrays()
+            MidiInFile(arrays, data).read()
+            expected = list(raw_events(data))
+            self.assertEqual(len(expected), len(arrays.table))
+            for (track, tick, status, raw), row in zip(expected, self.rows(arrays)):
+                # the rows of channel events has 2 data bytes
+                self.assertEqual((track, tick, status, raw), row[:3] + (row[3][:len(raw)],))
+
+    def test_channel_column(self):
+        arrays = MidiToArrays()
+        MidiInFile(arrays, type_1_file(n_tracks=3, n_notes=20)).read()
+        table = arrays.table
+        patches = table[table['status'] & 0xF0 == 0xC0]
+        self.assertEqual(patches['channel'].tolist(), [0, 1, 2])
+        self.assertEqual(patches['track'].tolist(), [1, 2, 3])
+        self.assertEqual(patches['data1'].tolist(), [0, 1, 2])
+
+    def test_reused_handler(self):
+        "A handler can parse several files, and the tables are not shared"
+        files = list(self.files())[:2]
+        arrays = MidiToArrays()
+        tables = []
+        for data in files:
+            MidiInFile(arrays, data).read()
+            tables.append(arrays.table)
+        for data, table in zip(files, tables):
+            fresh = MidiToArrays()
+            MidiInFile(fresh, data).read()
+            self.assertEqual(fresh.table.tolist(), table.tolist())
+
+    def test_filters(self):
+        arrays = MidiToArrays()
+        MidiInFile(arrays, type_1_file(n_tracks=3, n_notes=20), include=['meta']).read()
+        self.assertTrue((arrays.table['status'] == 0xFF).all())
+        self.assertEqual(len(arrays.table), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+from mxm.midifile.src.note_pairing import Note, NoteColumns
+from mxm.midifile.src.note_index import NoteIndex
+from mxm.midifile.src.tempo_map import TempoMap
+from mxm.midifile.tests.helpers import random_file
+import io, random, unittest
+
+
+class TestNoteIndex(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(1)
+        self.notes = []
+        for i in range(2000):
+            start = rnd.randrange(0, 100000)
+            end = start + rnd.choice([0, 1, rnd.randrange(1, 500), rnd.randrange(1, 20000)])
+            self.notes.append(Note(start, end, rnd.randrange(128), 100, 0, 0))
+        self.index = NoteIndex(self.notes)
+        self.ticks = [rnd.randrange(-10, 121000) for i in range(300)]
+
+    def scan_at(self, tick):
+        return sorted(note for note in self.notes if note.start <= tick < note.end)
+
+    def test_at(self):
+        for tick in self.ticks:
+            self.assertEqual(self.scan_at(tick), self.index.at(tick))
+
+    def test_overlapping(self):
+        for start in self.ticks:
+            end = start + random.Random(start).randrange(0, 1000)
+            expected = sorted(note for note in self.notes if note.start < end and note.end > start)
+            self.assertEqual(expected, self.index.overlapping(start, end))
+
+    def test_many(self):
+        expected = [self.scan_at(tick) for tick in self.ticks]
+        self.assertEqual(expected, self.index.at_many(self.ticks))
+        self.assertEqual([len(notes) for notes in expected], list(self.index.count_at(self.ticks)))
+
+    def test_empty(self):
+        index = NoteIndex([])
+        self.assertEqual([], index.at(0))
+        self.assertEqual([[]], index.at_many([0]))
+        self.assertEqual([0], list(index.count_at([0])))
+
+    def test_seconds(self):
+        tempo_map = TempoMap(480, [(0, 400000), (5000, 800000)])
+        index = NoteIndex(self.notes, tempo_map)
+        for tick in self.ticks:
+            seconds = tempo_map.seconds(tick)
+            self.assertEqual(index.at(tempo_map.ticks(seconds)), index.at_seconds(seconds))
+        self.assertEqual(index.overlapping(100, 6000),
+                         index.overlapping_seconds(tempo_map.seconds(100), tempo_map.seconds(6000)))
+
+    def test_from_file(self):
+        data = random_file()
+        index = NoteIndex.from_file(io.BytesIO(data))
+        self.assertEqual(1000, len(index))
+        self.assertEqual(0.25, index.tempo_map.seconds(48))
+        columns = NoteColumns()
+        for note in index.notes:
+            columns.append(note)
+        self.assertEqual(index.notes, NoteIndex(columns).notes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+from mxm.midifile import MidiInFile, MidiSequence, iter_events
+from mxm.midifile.src.note_pairing import NotePairer, NoteColumns, Note, iter_notes
+from mxm.midifile.tests.helpers import in_tests, random_file
+import unittest
+
+
+def naive_pairs(infile):
+    "Pairs the notes by searching for the first matching note_on"
+    notes = []
+    sounding = []
+    for track, tick, name, data in iter_events(infile):
+        if name == 'note_on' and data[2]:
+            sounding.append((track, tick, data))
+        elif name in ('note_on', 'note_off'):
+            for i, (on_track, start, (channel, note, velocity)) in enumerate(sounding):
+                if (on_track, channel, note) == (track, data[0], data[1]):
+                    notes.append(Note(start, tick, note, velocity, channel, track))
+                    del sounding[i]
+                    break
+    return notes
+
+
+class TestNotePairing(unittest.TestCase):
+
+    def setUp(self):
+        self.data = random_file()
+
+    def test_same_as_naive(self):
+        pairer = NotePairer()
+        MidiInFile(pairer, self.data).read()
+        self.assertEqual(sorted(naive_pairs(self.data)), sorted(pairer.notes))
+        self.assertEqual(1000, len(pairer.notes))
+        self.assertEqual(0, pairer.unmatched)
+
+    def test_generator_and_handler_agree(self):
+        pairer = NotePairer(policy='lifo')
+        MidiInFile(pairer, self.data).read()
+        self.assertEqual(pairer.notes, list(iter_notes(iter_events(self.data), policy='lifo')))
+        sequence = MidiSequence.from_file(self.data)
+        self.assertEqual(pairer.notes, list(iter_notes(sequence, policy='lifo')))
+
+    def test_columns(self):
+        columns = NoteColumns()
+        MidiInFile(NotePairer(emit=columns.append), self.data).read()
+        pairer = NotePairer()
+        MidiInFile(pairer, self.data).read()
+        self.assertEqual(pairer.notes, [columns[i] for i in range(len(columns))])
+
+    def test_hanging_and_unmatched(self):
+        pairer = NotePairer()
+        pairer.note_off(0, 0, 60, 0)
+        pairer.note_on(10, 0, 60, 100)
+        pairer.note_on(20, 1, 60, 100)
+        pairer.set_current_track(1)
+        pairer.end_of_track(50)
+        self.assertEqual([], pairer.notes)
+        pairer.set_current_track(0)
+        pairer.end_of_track(100)
+        self.assertEqual([Note(10, 100, 60, 100, 0, 0), Note(20, 100, 60, 100, 1, 0)], pairer.notes)
+        self.assertEqual(1, pairer.unmatched)
+
+    def test_bad_policy(self):
+        self.assertRaises(ValueError, NotePairer, policy='random')
+        self.assertRaises(ValueError, NotePairer, hanging='keep')
+
+    def test_minimal(self):
+        pairer = NotePairer()
+        MidiInFile(pairer, in_tests('midifiles/ableton-glissando.mid')).read()
+        self.assertTrue(pairer.notes)
+        self.assertTrue(all(note.start <= note.end for note in pairer.notes))
+
+
+if __name__ == '__main__':
+    unittest.main()
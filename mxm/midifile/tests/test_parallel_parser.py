@@ -0,0 +1,133 @@
+from mxm.midifile import MidiInFile, MidiOutFile, MidiEvents, map_tracks
+from mxm.midifile.src.parallel_parser import EventRecorder, NoteCounter, notes_counted
+from mxm.midifile.src.parallel_parser import dispatch_masks, parse_track_chunk
+from mxm.midifile.tests.helpers import in_tests, type_1_file
+import io, glob, unittest, multiprocessing
+
+
+class TestParallelParser(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = multiprocessing.Pool(2)
+
+    def tearDown(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def assertSameEvents(self, infile, tracks=None, include=None, exclude=None):
+        sequential = EventRecorder()
+        MidiInFile(sequential, infile, include=include, exclude=exclude).read(tracks=tracks)
+        parallel = EventRecorder()
+        MidiInFile(parallel, infile, include=include, exclude=exclude).read_parallel(tracks=tracks, pool=self.pool)
+        self.assertEqual(sequential.events, parallel.events)
+
+    def test_midifiles(self):
+        "The parallel parser triggers exactly the same events as the sequential"
+        for midi_in_filename in glob.iglob(in_tests() + 'midifiles/*.mid'):
+            self.assertSameEvents(midi_in_filename)
+
+    def test_many_tracks(self):
+        self.assertSameEvents(type_1_file())
+
+    def test_selected_tracks(self):
+        self.assertSameEvents(type_1_file(), tracks=[0, 5, 7])
+
+    def test_midi_out(self):
+        "Writing a file parsed in parallel gives the same file"
+        data = type_1_file()
+        midi_out = MidiOutFile(io.BytesIO())
+        MidiInFile(midi_out, data).read_parallel(pool=self.pool)
+        self.assertEqual(midi_out.read_all(), data)
+
+    def test_filtered(self):
+        self.assertSameEvents(type_1_file(), include=['tempo'])
+        self.assertSameEvents(type_1_file(), exclude=['note_on'])
+
+
+class PatchChanges(MidiEvents):
+
+    "Only uses the patch changes"
+
+    def __init__(self):
+        MidiEvents.__init__(self)
+        self.patches = []
+
+    def patch_change(self, channel, patch, use_running_status=False):
+        self.patches.append((self.abs_time(), channel, patch))
+
+
+class TestWorkerMasks(unittest.TestCase):
+
+    def recorded(self, event_handler, include=None, exclude=None):
+        "The events recorded in a worker for the second track"
+        midi_in = MidiInFile(event_handler, type_1_file(n_tracks=2, n_notes=3),
+                             include=include, exclude=exclude)
+        midi_in.parser.parseMThdChunk()
+        chunk = midi_in.parser.indexMTrkChunks()[1]
+        data = midi_in.raw_in.getData()[chunk.offset:chunk.offset + 8 + chunk.length]
+        events, exception = parse_track_chunk((bytes(data), *dispatch_masks(midi_in.parser.dispatch)))
+        self.assertIsNone(exception)
+        return events
+
+    def test_unused_events_are_skipped(self):
+        "Workers only record the events the event handler uses"
+        # delta, status, use_running_status, data
+        self.assertEqual(self.recorded(PatchChanges()), [0, 0xC0, False, bytes([0])])
+
+    def test_filtered_events_are_skipped(self):
+        self.assertEqual(self.recorded(NoteCounter(), include=['meta']), [])
+        events = self.recorded(NoteCounter(), exclude=['patch_change'])
+        self.assertEqual(events[:8], [0, 0x90, False, bytes([0, 100]), 120, 0x90, True, bytes([0, 0])])
+
+    def test_time_of_skipped_events(self):
+        handler = PatchChanges()
+        midi = MidiOutFile(io.BytesIO())
+        midi.header(format=0, nTracks=1, division=96)
+        midi.start_of_track()
+        midi.update_time(10)
+        midi.note_on(0, 60, 100)
+        midi.update_time(20)
+        midi.patch_change(0, 5)
+        midi.end_of_track()
+        MidiInFile(handler, midi.read_all()).read_parallel(processes=1)
+        self.assertEqual(handler.patches, [(30, 0, 5)])
+
+
+class TestMapTracks(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = multiprocessing.Pool(2)
+
+    def tearDown(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def test_collect(self):
+        counts = map_tracks(type_1_file(n_tracks=3, n_notes=10), NoteCounter, collect=notes_counted, pool=self.pool)
+        self.assertEqual(counts, [0, 10, 10, 10])
+
+    def test_handlers(self):
+        "Without collect the handlers are returned, with the track number and header"
+        handlers = map_tracks(type_1_file(n_tracks=3), PatchChanges, tracks=[2, 3], pool=self.pool)
+        self.assertEqual([h.patches for h in handlers], [[(0, 1, 1)], [(0, 2, 2)]])
+        self.assertEqual([h.get_current_track() for h in handlers], [2, 3])
+
+    def test_same_as_sequential(self):
+        infile = in_tests('midifiles/minimal.mid')
+        recorders = map_tracks(infile, EventRecorder, processes=0)
+        for track, recorder in enumerate(recorders):
+            sequential = EventRecorder()
+            MidiInFile(sequential, infile).read(tracks=[track])
+            self.assertEqual(recorder.events[0], sequential.events[0])
+            self.assertEqual(recorder.events[1:-1], [e for e in sequential.events[1:-1]])
+
+    def test_errors(self):
+        data = type_1_file(n_tracks=2)
+        # truncate the last track
+        with self.assertRaises(ValueError):
+            map_tracks(data[:-10], NoteCounter, pool=self.pool)
+
+
+if __name__ == '__main__':
+    
+    unittest.main()
@@ -0,0 +1,83 @@
+from mxm.midifile import MidiInFile
+from mxm.midifile.src.parallel_parser import EventRecorder
+from mxm.midifile.src.stream_parser import MidiStreamParser, parse_stream
+from mxm.midifile.tests.helpers import in_tests, type_1_file
+import os, glob, threading, unittest
+
+
+class TestStreamParser(unittest.TestCase):
+
+    def assertSameEvents(self, data, chunk_size):
+        expected = EventRecorder()
+        MidiInFile(expected, data).read()
+        streamed = EventRecorder()
+        stream = MidiStreamParser(streamed)
+        for i in range(0, len(data), chunk_size):
+            stream.feed(data[i:i+chunk_size])
+        stream.close()
+        self.assertEqual(expected.events, streamed.events)
+
+    def test_chunk_sizes(self):
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            with open(path, 'rb') as f:
+                data = f.read()
+            for chunk_size in (1, 2, 3, 5, 8, 13, 1000):
+                self.assertSameEvents(data, chunk_size)
+
+    def test_running_status(self):
+        data = type_1_file(n_tracks=3, n_notes=20)
+        for chunk_size in (1, 4, 7, 64):
+            self.assertSameEvents(data, chunk_size)
+
+    def test_unknown_chunk_is_skipped(self):
+        data = type_1_file(n_tracks=2, n_notes=5)
+        # insert an unknown chunk after the header
+        unknown = b'XFIH' + (10).to_bytes(4, 'big') + bytes(10)
+        data_with_unknown = data[:14] + unknown + data[14:]
+        expected = EventRecorder()
+        MidiInFile(expected, data).read()
+        for chunk_size in (1, 5, 100):
+            streamed = EventRecorder()
+            stream = MidiStreamParser(streamed)
+            for i in range(0, len(data_with_unknown), chunk_size):
+                stream.feed(data_with_unknown[i:i+chunk_size])
+            stream.close()
+            self.assertEqual(expected.events, streamed.events)
+
+    def test_pipe(self):
+        data = type_1_file(n_tracks=2, n_notes=50)
+        read_fd, write_fd = os.pipe()
+        def write():
+            with os.fdopen(write_fd, 'wb') as w:
+                for i in range(0, len(data), 100):
+                    w.write(data[i:i+100])
+                    w.flush()
+        writer = threading.Thread(target=write)
+        writer.start()
+        streamed = EventRecorder()
+        with os.fdopen(read_fd, 'rb') as r:
+            parse_stream(r, streamed, chunk_size=37)
+        writer.join()
+        expected = EventRecorder()
+        MidiInFile(expected, data).read()
+        self.assertEqual(expected.events, streamed.events)
+
+    def test_truncated(self):
+        data = type_1_file(n_tracks=1, n_notes=5)
+        stream = MidiStreamParser(EventRecorder())
+        stream.feed(data[:-2])
+        self.assertRaises(ValueError, stream.close)
+        # in the middle of the header of the last track chunk
+        stream = MidiStreamParser(EventRecorder())
+        stream.feed(data[:data.rindex(b'MTrk') + 3])
+        self.assertRaises(ValueError, stream.close)
+
+    def test_trailing_padding(self):
+        data = type_1_file(n_tracks=1, n_notes=5)
+        for padding in (bytes(2), bytes(7), b'\r\n', bytes(300)):
+            for chunk_size in (1, 5, 1000):
+                self.assertSameEvents(data + padding, chunk_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from mxm.midifile import MidiOutFile
+from mxm.midifile.src.tempo_map import TempoMap, DEFAULT_TEMPO
+import io, random, unittest
+
+
+def scan_seconds(tick, division, tempos):
+    "Seconds at tick by scanning all the tempo events"
+    seconds = 0.0
+    last_tick, tempo = 0, DEFAULT_TEMPO
+    for tempo_tick, value in sorted(tempos, key=lambda t: t[0]):
+        if tempo_tick > tick:
+            break
+        seconds += (tempo_tick - last_tick) * tempo / 1e6 / division
+        last_tick, tempo = tempo_tick, value
+    return seconds + (tick - last_tick) * tempo / 1e6 / division
+
+
+class TestTempoMap(unittest.TestCase):
+
+    def setUp(self):
+        rnd = random.Random(1)
+        self.division = 480
+        self.tempos = [(rnd.randrange(0, 100000), rnd.randrange(200000, 1500000)) for i in range(50)]
+        self.ticks = [rnd.randrange(0, 120000) for i in range(1000)]
+
+    def test_same_as_scanning(self):
+        tempo_map = TempoMap(self.division, self.tempos)
+        for tick in self.ticks:
+            self.assertAlmostEqual(scan_seconds(tick, self.division, self.tempos), tempo_map.seconds(tick))
+
+    def test_arrays_and_inverse(self):
+        tempo_map = TempoMap(self.division, self.tempos)
+        seconds = tempo_map.seconds_array(self.ticks)
+        self.assertEqual([tempo_map.seconds(tick) for tick in self.ticks], list(seconds))
+        for tick, back in zip(self.ticks, tempo_map.ticks_array(seconds)):
+            self.assertAlmostEqual(tick, back, places=6)
+            self.assertAlmostEqual(tick, tempo_map.ticks(tempo_map.seconds(tick)), places=6)
+
+    def test_negative(self):
+        "Times before the start raise, instead of using the last tempo"
+        tempo_map = TempoMap(self.division, self.tempos)
+        for convert, values in [(tempo_map.seconds, -1), (tempo_map.ticks, -0.5),
+                                (tempo_map.seconds_array, [0, -1]), (tempo_map.ticks_array, [-0.5])]:
+            with self.assertRaises(ValueError):
+                convert(values)
+        self.assertEqual(tempo_map.seconds_array([]).tolist(), [])
+
+    def test_from_file(self):
+        tempos = sorted(self.tempos)
+        midi = MidiOutFile(io.BytesIO())
+        midi.header(format=1, nTracks=2, division=self.division)
+        midi.start_of_track()
+        for tick, tempo in tempos:
+            midi.update_time(tick, relative=False)
+            midi.tempo(tempo)
+        midi.end_of_track()
+        midi.start_of_track()
+        midi.note_on(0, 60, 100)
+        midi.end_of_track()
+        tempo_map = TempoMap.from_file(midi.read_all())
+        self.assertEqual(tempo_map.division, self.division)
+        expected = TempoMap(self.division, tempos)
+        self.assertEqual(list(expected.seconds_array(self.ticks)), list(tempo_map.seconds_array(self.ticks)))
+
+    def test_smpte(self):
+        tempo_map = TempoMap(TempoMap.smpte_division(29, 100), self.tempos)
+        # 29.97 frames per second
+        self.assertAlmostEqual(tempo_map.seconds(2997), 0.999999)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+from mxm.midifile import MidiInFile
+from mxm.midifile.src.timed_events import TimedMidiEvents, MidiEventsAdapter
+from mxm.midifile.tests.helpers import in_tests, type_1_file, AbsoluteTimeRecorder
+import glob, unittest
+
+
+class TimedRecorder(TimedMidiEvents):
+
+    "Records the same events with the tick"
+
+    def __init__(self):
+        TimedMidiEvents.__init__(self)
+        self.events = []
+
+    def note_on(self, tick, channel, note, velocity):
+        self.events.append((tick, 'note_on', channel, note, velocity))
+
+    def note_off(self, tick, channel, note, velocity):
+        self.events.append((tick, 'note_off', channel, note, velocity))
+
+    def patch_change(self, tick, channel, patch):
+        self.events.append((tick, 'patch_change', channel, patch))
+
+    def tempo(self, tick, value):
+        self.events.append((tick, 'tempo', value))
+
+    def end_of_track(self, tick):
+        self.events.append((tick, 'end_of_track'))
+
+
+class TestTimedEvents(unittest.TestCase):
+
+    def files(self):
+        yield type_1_file(n_tracks=3, n_notes=20)
+        for path in glob.glob(in_tests('midifiles/*.mid')):
+            yield path
+
+    def test_same_events(self):
+        for infile in self.files():
+            expected = AbsoluteTimeRecorder()
+            MidiInFile(expected, infile).read()
+            timed = TimedRecorder()
+            MidiInFile(timed, infile).read()
+            self.assertEqual(expected.events, timed.events)
+
+    def test_adapter(self):
+        for infile in self.files():
+            expected = AbsoluteTimeRecorder()
+            MidiInFile(expected, infile).read()
+            adapted = AbsoluteTimeRecorder()
+            MidiInFile(MidiEventsAdapter(adapted), infile).read()
+            self.assertEqual(expected.events, adapted.events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from mxm.midifile import MidiOutFile, MidiSequence, iter_events
+from mxm.midifile.src.track_merger import merge_events, track_streams, to_format_0, _event_order
+from mxm.midifile.tests.helpers import in_tests, random_file
+import io, unittest
+
+
+def sorted_events(infile):
+    "Flattens a file the slow way, by sorting all the events"
+    events = [event for event in iter_events(infile) if event[2] != 'end_of_track']
+    events.sort(key=lambda event: _event_order(event) + (event[0],))
+    return events
+
+
+class TestTrackMerger(unittest.TestCase):
+
+    def setUp(self):
+        self.data = random_file(n_notes=300)
+
+    def test_same_as_sorting(self):
+        merged = list(merge_events(*track_streams(self.data)))
+        self.assertEqual(sorted_events(self.data), merged[:-1])
+        self.assertEqual('end_of_track', merged[-1][2])
+        self.assertEqual(max(event[1] for event in merged), merged[-1][1])
+
+    def test_ties(self):
+        merged = list(merge_events(*track_streams(self.data)))
+        for first, second in zip(merged, merged[1:]):
+            self.assertLessEqual(_event_order(first), _event_order(second))
+
+    def test_sequence_tracks(self):
+        sequence = MidiSequence.from_file(self.data)
+        self.assertEqual(list(merge_events(*track_streams(self.data))),
+                         list(merge_events(*sequence.tracks)))
+
+    def test_some_tracks(self):
+        streams = track_streams(in_tests('midifiles/minimal.mid'), tracks=[1], include=['channel'])
+        self.assertEqual(['note_on', 'note_off', 'end_of_track'],
+                         [event[2] for event in merge_events(*streams)])
+
+    def test_to_format_0(self):
+        for infile in (self.data, in_tests('midifiles/ableton-glissando.mid'),
+                       in_tests('midifiles/cubase-minimal-type1.mid')):
+            midi_out = MidiOutFile(io.BytesIO())
+            to_format_0(infile, midi_out)
+            data = midi_out.read_all()
+            sequence = MidiSequence.from_file(data)
+            self.assertEqual((0, 1), (sequence.format, len(sequence.tracks)))
+            expected = [event[1:] for event in merge_events(*track_streams(infile))]
+            self.assertEqual(expected, [event[1:] for event in iter_events(data)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,6 +18,7 @@ setup(
     ],
     include_package_data=True,
     install_requires=requires,
+    extras_require={'numpy': ['numpy']},
     tests_require=requires+['nose==1.3.7'],
     test_suite = 'nose.collector',
     license='MIT License',